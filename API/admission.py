@@ -0,0 +1,128 @@
+# API/admission.py
+"""
+Admission control for agent endpoints.
+
+- Per-client token buckets (keyed by a known X-API-Key, else client IP) → 429 when empty.
+- A bounded number of concurrent agent runs with a short wait queue → 503 when
+  the queue is full or the wait times out.
+
+Both rejections carry Retry-After so well-behaved clients back off instead of
+piling more work onto upstream APIs.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, FrozenSet, Tuple
+
+from fastapi import HTTPException, Request
+
+from Core.config import (
+    API_KEYS,
+    RANK_MAX_CONCURRENT,
+    RANK_MAX_QUEUE,
+    RANK_QUEUE_TIMEOUT_SEC,
+    RATE_LIMIT_PER_MIN,
+    RATE_LIMIT_BURST,
+)
+
+# Upper bound on tracked clients; least recently seen buckets are dropped
+MAX_TRACKED_CLIENTS = 10_000
+
+
+class RateLimiter:
+    """Token bucket per client key."""
+
+    def __init__(self, per_minute: float, burst: int, max_clients: int = MAX_TRACKED_CLIENTS) -> None:
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def allow(self, key: str) -> Tuple[bool, float]:
+        """Take one token for key. Returns (allowed, seconds until next token)."""
+        if self.rate <= 0:
+            return True, 0.0
+        now = time.monotonic()
+        tokens, last = self._buckets.pop(key, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+        allowed = tokens >= 1.0
+        if allowed:
+            tokens -= 1.0
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1.0 - tokens) / self.rate
+
+
+class AdmissionController:
+    """Bounded concurrency with a bounded, time-limited wait queue."""
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float) -> None:
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.running = 0
+        self.waiting = 0
+        self._sem = asyncio.Semaphore(max_concurrent)
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.queue_timeout))
+
+    async def acquire(self) -> None:
+        if self._sem.locked() and self.waiting >= self.max_queue:
+            raise _reject(503, "Server busy, try again later.", self.retry_after())
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._sem.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise _reject(503, "Server busy, try again later.", self.retry_after())
+        finally:
+            self.waiting -= 1
+        self.running += 1
+
+    def release(self) -> None:
+        self.running -= 1
+        self._sem.release()
+
+
+def _reject(status: int, detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def client_key(request: Request, api_keys: FrozenSet[str] = API_KEYS) -> str:
+    """
+    Identify the caller: a configured API key if sent, otherwise the client IP.
+    Unknown keys are ignored, so random headers cannot mint fresh buckets.
+    """
+    api_key = request.headers.get("x-api-key")
+    if api_key and api_key in api_keys:
+        return f"key:{api_key}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+rate_limiter = RateLimiter(RATE_LIMIT_PER_MIN, RATE_LIMIT_BURST)
+admission = AdmissionController(RANK_MAX_CONCURRENT, RANK_MAX_QUEUE, RANK_QUEUE_TIMEOUT_SEC)
+
+
+async def rate_limit(request: Request) -> None:
+    """Dependency: reject with 429 when the caller's bucket is empty."""
+    allowed, retry_after = rate_limiter.allow(client_key(request))
+    if not allowed:
+        raise _reject(429, "Rate limit exceeded.", retry_after)
+
+
+async def admit(request: Request) -> AsyncIterator[None]:
+    """Dependency: rate-limit, then hold an agent slot for the request's lifetime."""
+    await rate_limit(request)
+    await admission.acquire()
+    try:
+        yield
+    finally:
+        admission.release()
@@ -0,0 +1,21 @@
+# API/auth.py
+from __future__ import annotations
+
+import hmac
+
+from fastapi import Header, HTTPException
+
+from Core.config import ADMIN_TOKEN
+
+
+def is_admin(token: str | None) -> bool:
+    """True if token matches ADMIN_TOKEN (always False when no token is configured)."""
+    return bool(ADMIN_TOKEN and token and hmac.compare_digest(token, ADMIN_TOKEN))
+
+
+async def require_admin(x_admin_token: str | None = Header(None)) -> None:
+    """Dependency for /admin endpoints."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled.")
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
@@ -0,0 +1,134 @@
+# API/negotiation.py
+"""
+Content negotiation for ranking responses.
+
+The Pydantic models stay the schema; only the wire format changes:
+- `Accept: application/msgpack` → MessagePack, otherwise JSON (model_dump_json);
+- bodies of at least RESPONSE_COMPRESS_MIN_BYTES are compressed with the coding
+  `Accept-Encoding` weights highest: brotli or gzip.
+brotli is in requirements.txt but optional at runtime (fallback: gzip).
+
+Cacheable responses pass an `etag` (digest of the content, see `content_etag`);
+each format/encoding gets its own strong validator, and a matching
+`If-None-Match` is answered with 304 before anything is encoded.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+import msgpack
+from pydantic import BaseModel
+
+from Core.config import RESPONSE_COMPRESS_MIN_BYTES, RESPONSE_GZIP_LEVEL, RESPONSE_BROTLI_QUALITY
+
+# Optional at runtime
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_ALIASES = (MSGPACK, "application/x-msgpack", "application/vnd.msgpack")
+
+
+def qvalues(header: Optional[str]) -> Dict[str, float]:
+    """'gzip;q=0.5, br' → {"gzip": 0.5, "br": 1.0}"""
+    out: Dict[str, float] = {}
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        out[token.strip().lower()] = q
+    return out
+
+
+def encode_json(model: BaseModel) -> bytes:
+    # pydantic-core serializes straight to JSON; no intermediate dict
+    return model.model_dump_json().encode("utf-8")
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    q = qvalues(accept)
+    q_msgpack = max(q.get(t, 0.0) for t in MSGPACK_ALIASES)
+    return q_msgpack > 0 and q_msgpack >= q.get(JSON, 0.0)
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Accepted coding with the highest q ("*" covers unlisted ones); our preference
+    (br, then gzip) only breaks ties. None when nothing fits or the client weights
+    an explicit `identity` higher.
+    """
+    q = qvalues(accept_encoding)
+    star = q.get("*")
+    best, best_q = None, 0.0
+    for coding in ("br", "gzip") if brotli is not None else ("gzip",):
+        coding_q = q.get(coding, star if star is not None else 0.0)
+        if coding_q > best_q:
+            best, best_q = coding, coding_q
+    return best if best is not None and best_q >= q.get("identity", 0.0) else None
+
+
+def content_etag(model: BaseModel) -> str:
+    """Digest of the model's content, independent of field order and wire format."""
+    canonical = json.dumps(model.model_dump(mode="json"), sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison: W/ prefixes are ignored."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates
+
+
+def negotiated(
+    request: Request,
+    model: BaseModel,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+    etag: Optional[str] = None,
+) -> Response:
+    """
+    Encode `model` in the format and compression the client asked for.
+    With `etag`, sets a per-representation ETag and answers 304 on a match.
+    """
+    media_type = MSGPACK if wants_msgpack(request.headers.get("accept")) else JSON
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    out_headers = {"Vary": "Accept, Accept-Encoding", **(headers or {})}
+
+    if etag is not None:
+        # Format + negotiated coding identify the representation (whether a body
+        # is small enough to skip compression is fixed by the content), so a
+        # revalidation is answered without encoding anything
+        variant = "msgpack" if media_type == MSGPACK else "json"
+        out_headers["ETag"] = f'"{etag}-{variant}{"+" + encoding if encoding else ""}"'
+        if etag_matches(request.headers.get("if-none-match"), out_headers["ETag"]):
+            return Response(status_code=304, headers=out_headers)
+
+    body = msgpack.packb(model.model_dump(mode="json")) if media_type == MSGPACK else encode_json(model)
+    if len(body) < RESPONSE_COMPRESS_MIN_BYTES:
+        encoding = None
+    if encoding:
+        if encoding == "br":
+            body = brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY)
+        else:
+            body = gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0)
+        out_headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=out_headers)
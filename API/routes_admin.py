@@ -0,0 +1,40 @@
+# API/routes_admin.py
+from __future__ import annotations
+
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse, Response
+from fastapi.concurrency import run_in_threadpool
+
+from Agent.prewarm import top_queries
+from Core.profiling import as_text, profile_path
+from .auth import require_admin
+from .schemas import TopQuery
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/top-queries", response_model=List[TopQuery])
+async def get_top_queries(n: int = Query(20, ge=1, le=200)) -> List[TopQuery]:
+    """Most frequent /rank queries in this process (approximate counts, Space-Saving)."""
+    return [TopQuery(**q) for q in top_queries(n)]
+
+
+@router.get("/profiles/{profile_id}", response_class=Response)
+async def get_profile(
+    profile_id: str,
+    format: str = Query("pstats", pattern="^(pstats|txt)$"),
+    limit: int = Query(60, ge=1, le=1000),
+) -> Response:
+    """
+    Profile of a `/rank` request sent with `X-Profile: 1`.
+    format=pstats downloads the raw stats (pstats / snakeviz); format=txt returns
+    the top `limit` functions by cumulative time.
+    """
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    if format == "txt":
+        return PlainTextResponse(await run_in_threadpool(as_text, path, limit))
+    return FileResponse(path, media_type="application/octet-stream", filename=f"rank-{profile_id}.prof")
@@ -0,0 +1,39 @@
+# API/routes_images.py
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import RedirectResponse
+from fastapi.concurrency import run_in_threadpool
+
+from Agent.images import ImageFetchError, decode_image_id, snap_size, thumbnails
+from Core.logs import get_logger
+
+logger = get_logger("images")
+
+router = APIRouter(prefix="/img", tags=["images"])
+
+# Content for an id + size never changes, so clients and CDNs may keep it for a year
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@router.get("/{image_id}", response_class=Response)
+async def get_image(image_id: str, w: Optional[int] = Query(None, ge=1, le=4096)) -> Response:
+    """Offer thumbnail, downscaled to the nearest configured size (IMAGE_SIZES) >= w."""
+    url = decode_image_id(image_id)
+    if url is None:
+        raise HTTPException(status_code=404, detail="Unknown image.")
+    try:
+        data, name = await run_in_threadpool(thumbnails.get, url, snap_size(w))
+    except ImageFetchError as e:
+        raise HTTPException(status_code=502, detail=f"Image unavailable: {e}")
+    except OSError as e:
+        # The thumbnail cache directory is unusable; let the client load the original
+        logger.warning({"event": "thumbnail_cache_error", "error": str(e)})
+        return RedirectResponse(url, status_code=302, headers={"Cache-Control": "no-store"})
+    return Response(
+        content=data,
+        media_type="image/jpeg",
+        headers={"Cache-Control": CACHE_CONTROL, "ETag": f'"{name[:32]}"'},
+    )
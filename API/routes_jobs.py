@@ -0,0 +1,78 @@
+# API/routes_jobs.py
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+
+from Agent.jobs import JobQueue, DONE, FAILED
+from Agent.prewarm import track_query
+from Core.config import OPENAI_API_KEY
+from .admission import rate_limit
+from .negotiation import negotiated
+from .routes_rank import to_rank_response
+from .schemas import RankRequest, JobCreated, JobStatus
+
+router = APIRouter(prefix="/rank/jobs", tags=["rank"])
+
+job_queue = JobQueue()
+
+# How often the WebSocket re-checks a job's status
+WS_POLL_INTERVAL_SEC = 0.5
+
+
+def to_job_status(job: Dict[str, Any]) -> JobStatus:
+    """Map a stored job record to the API shape."""
+    result = None
+    if job["status"] == DONE and job["result"] is not None:
+        result = to_rank_response(job["result"], job["payload"].get("query", ""), pool_id=job["result"].get("pool_id"))
+    return JobStatus(
+        job_id=job["id"],
+        status=job["status"],
+        result=result,
+        error=job.get("error"),
+    )
+
+
+@router.post("", response_model=JobCreated, status_code=202, dependencies=[Depends(rate_limit)])
+async def create_rank_job(payload: RankRequest) -> JobCreated:
+    """Queue a ranking job and return its id immediately."""
+    if not OPENAI_API_KEY:
+        raise HTTPException(status_code=500, detail="OPENAI_API_KEY missing (set env var).")
+
+    track_query(payload.query, payload.trusted_only)
+    job_id = await run_in_threadpool(job_queue.enqueue, payload.model_dump())
+    return JobCreated(job_id=job_id, status="queued")
+
+
+@router.get("/{job_id}", response_model=JobStatus)
+async def get_rank_job(job_id: str, request: Request) -> Response:
+    """Poll a ranking job (same formats as POST /rank)."""
+    job = await run_in_threadpool(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return negotiated(request, to_job_status(job))
+
+
+@router.websocket("/{job_id}/ws")
+async def watch_rank_job(websocket: WebSocket, job_id: str) -> None:
+    """Push status changes for a job until it is done or failed."""
+    await websocket.accept()
+    last_status = None
+    try:
+        while True:
+            job = await run_in_threadpool(job_queue.get, job_id)
+            if job is None:
+                await websocket.send_json({"job_id": job_id, "status": "not_found"})
+                break
+            if job["status"] != last_status:
+                last_status = job["status"]
+                await websocket.send_json(to_job_status(job).model_dump())
+            if last_status in (DONE, FAILED):
+                break
+            await asyncio.sleep(WS_POLL_INTERVAL_SEC)
+    except WebSocketDisconnect:
+        return
+    await websocket.close()
@@ -1,66 +1,213 @@
 # API/routes_rank.py
 from __future__ import annotations
 
-from typing import Any, Dict
-
-from fastapi import APIRouter, HTTPException
-
-from Agent import build_app, AgentState
-from Core.config import OPENAI_API_KEY
-from .schemas import RankRequest, RankResponse, RankResult, OfferItem
+import asyncio
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+
+from Agent import build_app
+from Agent.canonical import canonical_query
+from Agent.images import proxy_url
+from Agent.prewarm import track_query
+from Agent.refine import REFINABLE, refine_pool, save_pool
+from Agent.runner import run_agent
+from Core.cache import CacheBackend, make_cache
+from Core.config import OPENAI_API_KEY, CACHE_MAX_ENTRIES, RANK_GET_MAX_AGE_SEC
+from Core.logs import get_logger, should_dump_state, truncate, elapsed_ms
+from Core.profiling import ProfilerBusy, run_profiled
+from .admission import admission, admit, rate_limit
+from .auth import is_admin
+from .negotiation import content_etag, negotiated
+from .schemas import RankRequest, RankResponse, RankResult, OfferItem, RefineRequest
 
 router = APIRouter(prefix="/rank", tags=["rank"])
+logger = get_logger("rank")
 
-# Build LangGraph app once per process
+# Build the agent app once per process (LangGraph or native, see AGENT_EXECUTOR)
 agent_app = build_app()
 
+# GET /rank responses by canonical query: {"response": RankResponse dump, "expires": epoch seconds}
+_responses: CacheBackend[Dict[str, Any]] = make_cache("response", CACHE_MAX_ENTRIES, RANK_GET_MAX_AGE_SEC)
+# Agent runs in flight for GET /rank, by the same key: concurrent misses share one run
+_inflight: Dict[str, "asyncio.Task[Tuple[RankResponse, int]]"] = {}
 
-@router.post("", response_model=RankResponse)
-async def rank_products(payload: RankRequest) -> RankResponse:
+
+def run_and_respond(query: str, trusted_only: bool) -> Tuple[Optional[Dict[str, Any]], Optional[RankResponse]]:
+    """Run the agent and build the response (blocking; called in the threadpool)."""
+    final = run_agent(agent_app, query, trusted_only)
+    if final is None:
+        return None, None
+    return final, to_rank_response(final, query, pool_id=save_pool(final))
+
+
+@router.post("", response_model=RankResponse, dependencies=[Depends(admit)])
+async def rank_products(
+    payload: RankRequest,
+    request: Request,
+    debug_state: bool = Header(False, alias="X-Debug-State"),
+    profile: bool = Header(False, alias="X-Profile"),
+    admin_token: Optional[str] = Header(None, alias="X-Admin-Token"),
+) -> Response:
     """
     Main endpoint:
     - Accepts a query (e.g. 'iPhone 15 Pro Max 256GB').
     - Optionally restricts to trusted KSA retailers.
     - Runs the LangGraph agent and returns ranked offers.
+    - `X-Debug-State: 1` logs the (truncated) final agent state for this request.
+    - `X-Profile: 1` (with `X-Admin-Token`) runs the request under cProfile; the
+      profile id is returned in `X-Profile-Id`, download via /admin/profiles/{id}.
+    - JSON by default, MessagePack with `Accept: application/msgpack`; large
+      bodies are brotli/gzip compressed per `Accept-Encoding`.
+    - Subject to admission control (429 / 503 with Retry-After under overload).
     """
     if not OPENAI_API_KEY:
         raise HTTPException(status_code=500, detail="OPENAI_API_KEY missing (set env var).")
-
-    init_state: AgentState = {
-        "query": payload.query,
-        "offers": [],
-        "missing": [],
-        "tried_tools": [],
-        "steps": 0,
-        "done": False,
-        "errors": [],
-        "trusted_only": bool(payload.trusted_only),
-    }
-
-    final: Dict[str, Any] | None = None
-
-    # Run the LangGraph agent and capture the final state
-    for event in agent_app.stream(init_state):
-        for node, node_payload in event.items():
-            if node == "finish":
-                # node_payload is what finisher() returned
-                final = node_payload
-
-    if final is None:
+    if profile and not is_admin(admin_token):
+        raise HTTPException(status_code=403, detail="X-Profile requires a valid X-Admin-Token.")
+
+    track_query(payload.query, payload.trusted_only)
+    started = time.perf_counter()
+
+    # The agent is blocking; run it off the event loop so admission limits apply
+    headers: Dict[str, str] = {}
+    if profile:
+        try:
+            (final, response), profile_id = await run_in_threadpool(
+                run_profiled, run_and_respond, payload.query, payload.trusted_only
+            )
+        except ProfilerBusy:
+            raise HTTPException(status_code=409, detail="Another profiled request is in progress.")
+        headers["X-Profile-Id"] = profile_id
+    else:
+        final, response = await run_in_threadpool(run_and_respond, payload.query, payload.trusted_only)
+
+    if final is None or response is None:
         raise HTTPException(status_code=500, detail="Agent did not reach finish node.")
 
-    # Debug: print final to console (useful الآن عشان تشوف شلون شكله)
-    print("\n[FINAL STATE FROM AGENT]")
+    logger.info({
+        "event": "rank_done",
+        "query": truncate(payload.query),
+        "steps": response.steps,
+        "items": len(response.result.items),
+        "errors": len(response.errors),
+        "duration_ms": elapsed_ms(started),
+    })
+    # Full state dumps are sampled (LOG_STATE_SAMPLE_RATE) or requested per call
+    if should_dump_state(debug_state):
+        logger.info({"event": "final_state", "state": truncate(final)})
+    return negotiated(request, response, headers=headers)
+
+
+@router.get("", response_model=RankResponse)
+async def rank_products_cached(
+    request: Request,
+    q: str = Query(..., min_length=1),
+    trusted_only: bool = True,
+) -> Response:
+    """
+    Cacheable variant of POST /rank for HTTP caches and CDNs.
+    - Responses are kept for RANK_GET_MAX_AGE_SEC per canonical query, so spelling
+      variants of a query share one agent run; concurrent misses for the same key
+      in this process wait for a single run.
+    - Strong `ETag` per content and format, `Cache-Control: public, max-age=<remaining>`,
+      `Vary: Accept, Accept-Encoding`; a matching `If-None-Match` gets 304.
+    - Runs that found nothing (e.g. upstream errors) and follow-up questions (written
+      in the language of the query, which the key ignores) are not cached (`no-store`).
+    - Only misses are rate-limited, and only the agent run holds an admission slot;
+      cached responses and 304s cost nothing.
+    """
+    track_query(q, trusted_only)
+    key = f"{canonical_query(q)}|{int(trusted_only)}"
+    started = time.perf_counter()
+
+    entry = await run_in_threadpool(_responses.get, key)
+    coalesced = False
+    if entry is not None:
+        response = RankResponse.model_validate(entry["response"])
+        max_age = max(0, int(entry["expires"] - time.time()))
+    else:
+        if not OPENAI_API_KEY:
+            raise HTTPException(status_code=500, detail="OPENAI_API_KEY missing (set env var).")
+        await rate_limit(request)
+        task = _inflight.get(key)
+        coalesced = task is not None
+        if task is None:
+            task = _inflight[key] = asyncio.ensure_future(_run_and_cache(key, q, trusted_only))
+        # Shielded: a client disconnecting does not cancel the run others wait for
+        response, max_age = await asyncio.shield(task)
+    response = response.model_copy(update={"query": q})
+
+    logger.info({
+        "event": "rank_get_done",
+        "query": truncate(q),
+        "cached": entry is not None,
+        "coalesced": coalesced,
+        "items": len(response.result.items),
+        "duration_ms": elapsed_ms(started),
+    })
+    cache_control = f"public, max-age={max_age}" if max_age > 0 else "no-store"
+    return negotiated(request, response, headers={"Cache-Control": cache_control}, etag=content_etag(response))
+
+
+async def _run_and_cache(key: str, query: str, trusted_only: bool) -> Tuple[RankResponse, int]:
+    """
+    One agent run for a GET /rank key; returns (response, max-age) and stores cacheable results.
+    The run holds an admission slot; requests that joined it share its 503 if none frees up.
+    """
     try:
-        import json
-        print(json.dumps(final, ensure_ascii=False, indent=2))
-    except Exception:
-        print(final)
+        await admission.acquire()
+        try:
+            final, response = await run_in_threadpool(run_and_respond, query, trusted_only)
+        finally:
+            admission.release()
+        if final is None or response is None:
+            raise HTTPException(status_code=500, detail="Agent did not reach finish node.")
+        if not response.result.items or response.needs_more_info:
+            return response, 0
+        entry = {"response": response.model_dump(mode="json"), "expires": time.time() + RANK_GET_MAX_AGE_SEC}
+        await run_in_threadpool(_responses.set, key, entry)
+        return response, RANK_GET_MAX_AGE_SEC
+    finally:
+        _inflight.pop(key, None)
+
+
+@router.post("/refine", response_model=RankResponse, dependencies=[Depends(admit)])
+async def refine_rank(payload: RefineRequest, request: Request) -> Response:
+    """
+    Re-filter and re-rank the offer pool of an earlier /rank response (`pool_id`)
+    with changed constraints, without searching again. Ranking is local unless
+    `use_llm` is true. 404 once the pool has expired. Subject to the same
+    admission control as /rank (it may call the LLM).
+    """
+    changes = {k: getattr(payload, k) for k in payload.model_fields_set if k in REFINABLE}
+    if changes.get("trusted_only", False) is None:
+        del changes["trusted_only"]
+    if "must_have" in changes and changes["must_have"] is None:
+        changes["must_have"] = []
+
+    started = time.perf_counter()
+    final = await run_in_threadpool(refine_pool, payload.pool_id, changes, payload.use_llm)
+    if final is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired pool_id; call /rank again.")
+
+    response = to_rank_response(final, "", pool_id=payload.pool_id)
+    logger.info({
+        "event": "refine_done",
+        "changes": sorted(changes),
+        "use_llm": payload.use_llm,
+        "items": len(response.result.items),
+        "duration_ms": elapsed_ms(started),
+    })
+    return negotiated(request, response)
 
-    # ---- Normalize the shape for RankResponse ----
 
+def to_rank_response(final: Dict[str, Any], fallback_query: str, pool_id: Optional[str] = None) -> RankResponse:
+    """Normalize the final agent state into a RankResponse."""
     # Basic fields
-    query = final.get("query", payload.query)
+    query = final.get("query", fallback_query)
     steps = int(final.get("steps", 0))
     errors = final.get("errors", []) or []
 
@@ -85,18 +232,19 @@ async def rank_products(payload: RankRequest) -> RankResponse:
             condition=it.get("condition"),
             reason=it.get("reason"),
             image=it.get("image"),
+            image_proxy=proxy_url(it.get("image")),
         )
         items.append(item)
 
     result = RankResult(items=items, notes=notes)
 
     # Build final Pydantic response
-    response = RankResponse(
+    return RankResponse(
         query=query,
         steps=steps,
         errors=errors,
         result=result,
         needs_more_info=bool(final.get("needs_more_info")),
         follow_up_question=final.get("follow_up_question"),
+        pool_id=pool_id,
     )
-    return response
@@ -0,0 +1,52 @@
+# API/routes_watch.py
+from __future__ import annotations
+
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from Agent.watch import WatchStore
+from .admission import rate_limit
+from .schemas import WatchRequest, WatchInfo, WatchEvent
+
+router = APIRouter(prefix="/watches", tags=["watches"])
+
+watch_store = WatchStore()
+
+
+@router.post("", response_model=WatchInfo, status_code=201, dependencies=[Depends(rate_limit)])
+async def create_watch(payload: WatchRequest) -> WatchInfo:
+    """Subscribe to price changes for a query; refreshed by the watch scheduler."""
+    watch = await run_in_threadpool(
+        watch_store.add,
+        payload.query,
+        payload.target_price,
+        payload.trusted_only,
+        payload.must_have,
+        payload.condition,
+    )
+    return WatchInfo(**watch)
+
+
+@router.get("/{watch_id}", response_model=WatchInfo)
+async def get_watch(watch_id: str) -> WatchInfo:
+    watch = await run_in_threadpool(watch_store.get, watch_id)
+    if watch is None:
+        raise HTTPException(status_code=404, detail="Watch not found.")
+    return WatchInfo(**watch)
+
+
+@router.delete("/{watch_id}", status_code=204)
+async def delete_watch(watch_id: str) -> None:
+    if not await run_in_threadpool(watch_store.delete, watch_id):
+        raise HTTPException(status_code=404, detail="Watch not found.")
+
+
+@router.get("/{watch_id}/events", response_model=List[WatchEvent])
+async def get_watch_events(watch_id: str, since: int = 0, limit: int = 100) -> List[WatchEvent]:
+    """Events after event id `since` (pass the last id seen to page forward)."""
+    if await run_in_threadpool(watch_store.get, watch_id) is None:
+        raise HTTPException(status_code=404, detail="Watch not found.")
+    events = await run_in_threadpool(watch_store.events, watch_id, since, min(limit, 500))
+    return [WatchEvent(**e) for e in events]
@@ -12,6 +12,20 @@ class RankRequest(BaseModel):
     trusted_only: bool = True
 
 
+class RefineRequest(BaseModel):
+    """
+    Re-filter and re-rank the offers of an earlier /rank response.
+    Only the constraints present in the body change; `null` clears a budget.
+    """
+    pool_id: str
+    trusted_only: Optional[bool] = None
+    budget_min: Optional[float] = None
+    budget_max: Optional[float] = None
+    must_have: Optional[List[str]] = None
+    condition: Optional[str] = None
+    use_llm: bool = False
+
+
 class OfferItem(BaseModel):
     """Single ranked offer returned by the agent."""
     name: str
@@ -22,6 +36,8 @@ class OfferItem(BaseModel):
     condition: Optional[str] = None
     reason: Optional[str] = None
     image: Optional[str] = None
+    # Same image through the caching thumbnail proxy (/img/{id})
+    image_proxy: Optional[str] = None
 
 
 class RankResult(BaseModel):
@@ -38,3 +54,65 @@ class RankResponse(BaseModel):
     result: RankResult
     needs_more_info: bool = False
     follow_up_question: Optional[str] = None
+    # Refine this result with POST /rank/refine while the pool is kept (POOL_TTL_SEC)
+    pool_id: Optional[str] = None
+
+
+class JobCreated(BaseModel):
+    """Returned when a ranking job is queued."""
+    job_id: str
+    status: str
+
+
+class JobStatus(BaseModel):
+    """Current state of a ranking job; result is set once it is done."""
+    job_id: str
+    status: str
+    result: Optional[RankResponse] = None
+    error: Optional[str] = None
+
+
+class WatchRequest(BaseModel):
+    """Subscribe to price changes for a query."""
+    query: str
+    target_price: float
+    trusted_only: bool = True
+    must_have: List[str] = []
+    condition: Optional[str] = None
+
+
+class WatchInfo(BaseModel):
+    """A stored price-watch subscription."""
+    id: str
+    query: str
+    target_price: float
+    trusted_only: bool
+    must_have: List[str] = []
+    condition: Optional[str] = None
+    created_at: float
+
+
+class WatchOffer(BaseModel):
+    """Offer snapshot attached to a watch event."""
+    name: Optional[str] = None
+    price_sar: Optional[float] = None
+    retailer: Optional[str] = None
+    condition: Optional[str] = None
+    link: str
+
+
+class WatchEvent(BaseModel):
+    """A change detected for a watch (new_offer, price_drop, price_increase, removed, target_reached)."""
+    id: int
+    type: str
+    offer: WatchOffer
+    old_price: Optional[float] = None
+    created_at: float
+
+
+class TopQuery(BaseModel):
+    """A popular /rank query; count may be overestimated by at most `error`."""
+    query: str
+    trusted_only: bool
+    count: int
+    error: int
@@ -4,5 +4,6 @@ LangGraph-based shopping agent for KSA market.
 """
 
 from .graph import build_app, AgentState
+from .runner import run_agent
 
-__all__ = ["build_app", "AgentState"]
+__all__ = ["build_app", "AgentState", "run_agent"]
@@ -0,0 +1,100 @@
+# app/agent/canonical.py
+"""
+Arabic/English text canonicalization for queries and offer titles.
+
+- `normalize_text`: orthography only. Unifies alef/hamza/yaa/taa-marbuta forms,
+  strips diacritics and tatweel, maps Arabic-Indic digits to ASCII, writes units
+  as "256gb" / "1tb" / "27inch" / "144hz", splits glued words and numbers
+  ("iphone15" → "iphone 15") and collapses spacing. Safe on titles and queries.
+- `canonical_query`: normalize_text plus product vocabulary (Arabic product words
+  to their English names, "promax" → "pro max", bare 64–512 storage sizes → "gb"),
+  used as the stable key for caches, popular-query tracking and watches.
+
+"ايفون ١٥ برو ماكس ٢٥٦", "آيفون 15 pro max 256GB" and "iPhone15 ProMax 256 gb"
+all become "iphone 15 pro max 256gb".
+"""
+from __future__ import annotations
+
+import re
+from typing import Dict
+
+# Arabic-Indic / Persian digits and separators to ASCII
+ARABIC_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹٫٬", "01234567890123456789.,")
+
+_CHARS = str.maketrans({
+    **{c: d for c, d in zip("٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹", "01234567890123456789")},
+    "٫": ".", "٬": ",", "،": ",",
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي", "ئ": "ي", "ؤ": "و", "ة": "ه",
+    "ـ": None,  # tatweel
+    **{chr(c): None for c in range(0x064B, 0x0653)},  # tashkeel (fathatan .. sukun, maddah)
+    "ٰ": None,  # superscript alef
+    "″": '"', "”": '"', "“": '"',
+    " ": " ", "‏": None, "‎": None, "‌": None, "‍": None,
+})
+
+# One pass for all units: number + unit word → number + canonical unit
+_UNIT = re.compile(
+    r"(\d+(?:\.\d+)?)\s*(?:"
+    r"(gb|gigabytes?|giga|جيجا ?بايت|جيجا|جيقا|قيقا ?بايت|قيقا|غيغا ?بايت|غيغا)"
+    r"|(tb|terabytes?|tera|تيرا ?بايت|تيرا)"
+    r'|(inches|inch|"|انش|بوصه|بوصات)'
+    r"|(hz|هرتز|هيرتز)"
+    r")(?![^\W\d_])"
+)
+_UNIT_NAMES = ("gb", "tb", "inch", "hz")
+
+
+def _unit(m: re.Match) -> str:
+    return m.group(1) + _UNIT_NAMES[m.lastindex - 2]
+
+
+# A letter directly followed by a digit: "iphone15" → "iphone 15" (not "256gb", "4k")
+_GLUED = re.compile(r"(?<=[^\W\d_])(?=\d)")
+# Separators that carry no meaning in a product query or title
+_PUNCT = re.compile(r"[\s\-_/|,;:!?()\[\]{}'*•·]+")
+
+# Normalized Arabic (and run-together English) product words → canonical English
+VOCAB: Dict[str, str] = {
+    "ايفون": "iphone", "ايباد": "ipad", "ماكبوك": "macbook", "ايربودز": "airpods",
+    "جالكسي": "galaxy", "جالاكسي": "galaxy", "قلاكسي": "galaxy", "بكسل": "pixel",
+    "بلايستيشن": "playstation", "بلاستيشن": "playstation",
+    "برو": "pro", "ماكس": "max", "بلس": "plus", "بلاس": "plus", "الترا": "ultra", "ميني": "mini",
+    "اير": "air",
+    "ابل": "apple", "سامسونج": "samsung", "سامسونق": "samsung", "هواوي": "huawei", "شاومي": "xiaomi",
+    "سوني": "sony", "promax": "pro max",
+}
+_PHRASES: Dict[str, str] = {"ماك بوك": "macbook", "اير بودز": "airpods", "اكس بوكس": "xbox", "i phone": "iphone"}
+_PHRASE_RE = re.compile(r"(?<!\w)(?:" + "|".join(map(re.escape, _PHRASES)) + r")(?!\w)")
+# Device storage sizes are often written without a unit
+_BARE_STORAGE = {"64", "128", "256", "512"}
+
+
+def normalize_text(text: str) -> str:
+    """Orthographic normalization of a query or offer title (see module docstring)."""
+    if not text:
+        return ""
+    # Most offer titles are plain ASCII
+    s = text.lower() if text.isascii() else text.translate(_CHARS).lower()
+    s = _UNIT.sub(_unit, s)
+    s = _GLUED.sub(" ", s)
+    return " ".join(_PUNCT.sub(" ", s).split())
+
+
+def canonical_query(text: str) -> str:
+    """Stable cache / grouping key for a query."""
+    s = normalize_text(text)
+    s = _PHRASE_RE.sub(lambda m: _PHRASES[m.group(0)], s)
+    out = []
+    for tok in s.split():
+        word = VOCAB.get(tok)
+        if word is None and tok.startswith("ال") and tok[2:] in VOCAB:
+            word = VOCAB[tok[2:]]  # "الايفون"
+        if word is None and tok in _BARE_STORAGE:
+            word = tok + "gb"
+        out.append(word or tok)
+    return " ".join(out)
+
+
+def has_arabic(text: str) -> bool:
+    return any("؀" <= ch <= "ۿ" for ch in text)
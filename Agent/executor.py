@@ -0,0 +1,61 @@
+# app/agent/executor.py
+"""
+Minimal in-process executor for the fixed plan → act → observe → finish loop.
+
+Runs the same node functions as the compiled LangGraph app and yields the same
+`{node_name: node_output}` events from `stream()`, without per-step channel
+bookkeeping or importing langgraph. Select it with AGENT_EXECUTOR=native.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterator, Optional
+
+Node = Callable[[Dict[str, Any]], Dict[str, Any]]
+Router = Callable[[Dict[str, Any]], Optional[str]]
+
+# Same default as LangGraph's recursion_limit
+DEFAULT_RECURSION_LIMIT = 25
+
+
+class GraphRecursionError(RuntimeError):
+    """The graph ran more steps than the recursion limit allows."""
+
+
+class NativeApp:
+    """
+    Sequential graph runner: each node's router names the next node (None ends the run).
+    Like LangGraph channels, a node's output is merged into the state: keys it
+    drops (e.g. a popped "next_tool") keep their previous value.
+    """
+
+    def __init__(
+        self,
+        nodes: Dict[str, Node],
+        routes: Dict[str, Router],
+        entry: str,
+        recursion_limit: int = DEFAULT_RECURSION_LIMIT,
+    ) -> None:
+        self.nodes = nodes
+        self.routes = routes
+        self.entry = entry
+        self.recursion_limit = recursion_limit
+
+    def stream(self, state: Dict[str, Any]) -> Iterator[Dict[str, Dict[str, Any]]]:
+        state = dict(state)
+        node: Optional[str] = self.entry
+        steps = 0
+        while node is not None:
+            if steps >= self.recursion_limit:
+                raise GraphRecursionError(f"Recursion limit of {self.recursion_limit} reached")
+            out = self.nodes[node](dict(state))
+            yield {node: out}
+            state = {**state, **out}
+            node = self.routes[node](state)
+            steps += 1
+
+    def invoke(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        state = dict(state)
+        for event in self.stream(state):
+            for out in event.values():
+                state.update(out)
+        return state
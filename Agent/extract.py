@@ -0,0 +1,172 @@
+# app/agent/extract.py
+"""
+Structured product data from product pages.
+
+Reads schema.org Product/Offer JSON-LD and OpenGraph/product meta tags with an
+incremental HTML parser, and stops as soon as the <head> and a Product JSON-LD
+block have been seen, so the rest of the page is neither downloaded nor parsed.
+"""
+from __future__ import annotations
+
+import json
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from Agent.normalizers import infer_model_from_text, infer_storage_from_text
+
+# Meta properties we read (OpenGraph + product: namespace used by most retailers)
+META_KEYS = {
+    "og:title": "name",
+    "og:image": "image",
+    "product:price:amount": "price",
+    "og:price:amount": "price",
+    "product:price:currency": "currency",
+    "og:price:currency": "currency",
+    "product:availability": "availability",
+    "og:availability": "availability",
+    "product:retailer_item_id": "sku",
+}
+
+GTIN_KEYS = ("gtin13", "gtin", "gtin14", "gtin12", "gtin8")
+
+
+class ProductPageParser(HTMLParser):
+    """Incremental parser collecting meta tags and JSON-LD blocks."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.meta: Dict[str, str] = {}
+        self.title: Optional[str] = None
+        self.products: List[Dict[str, Any]] = []
+        self.head_done = False
+        self._in_jsonld = False
+        self._in_title = False
+        self._buf: List[str] = []
+
+    @property
+    def complete(self) -> bool:
+        """Head seen and a Product found → nothing else on the page is needed."""
+        return self.head_done and bool(self.products)
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag == "body":
+            self.head_done = True
+        elif tag == "meta":
+            a = dict(attrs)
+            key = (a.get("property") or a.get("name") or "").lower()
+            if key in META_KEYS and a.get("content") and META_KEYS[key] not in self.meta:
+                self.meta[META_KEYS[key]] = a["content"].strip()
+        elif tag == "script" and (dict(attrs).get("type") or "").lower() == "application/ld+json":
+            self._in_jsonld = True
+            self._buf = []
+        elif tag == "title" and self.title is None:
+            self._in_title = True
+            self._buf = []
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "head":
+            self.head_done = True
+        elif tag == "script" and self._in_jsonld:
+            self._in_jsonld = False
+            self._collect_jsonld("".join(self._buf))
+        elif tag == "title" and self._in_title:
+            self._in_title = False
+            self.title = "".join(self._buf).strip()
+
+    def handle_data(self, data: str) -> None:
+        if self._in_jsonld or self._in_title:
+            self._buf.append(data)
+
+    def _collect_jsonld(self, text: str) -> None:
+        try:
+            doc = json.loads(text)
+        except ValueError:
+            return
+        stack = [doc]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, list):
+                stack.extend(node)
+            elif isinstance(node, dict):
+                types = node.get("@type")
+                types = types if isinstance(types, list) else [types]
+                if "Product" in types:
+                    self.products.append(node)
+                elif "@graph" in node:
+                    stack.append(node["@graph"])
+
+
+def _first_offer(product: Dict[str, Any]) -> Dict[str, Any]:
+    offers = product.get("offers") or {}
+    if isinstance(offers, list):
+        offers = offers[0] if offers else {}
+    return offers if isinstance(offers, dict) else {}
+
+
+def _name_of(value: Any) -> Optional[str]:
+    if isinstance(value, dict):
+        value = value.get("name")
+    return str(value).strip() if value else None
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(str(value).replace(",", ""))
+    except (TypeError, ValueError):
+        return None
+
+
+def product_info(parser: ProductPageParser) -> Dict[str, Any]:
+    """Merge JSON-LD (preferred) and meta tags into one flat record."""
+    product = parser.products[0] if parser.products else {}
+    offer = _first_offer(product)
+    meta = parser.meta
+
+    name = _name_of(product.get("name")) or meta.get("name") or parser.title
+    availability = offer.get("availability") or meta.get("availability")
+    if isinstance(availability, str):
+        # "https://schema.org/InStock" → "InStock"
+        availability = availability.rstrip("/").rsplit("/", 1)[-1]
+
+    info: Dict[str, Any] = {
+        "name": name,
+        "price": _to_float(offer.get("price", offer.get("lowPrice"))) or _to_float(meta.get("price")),
+        "currency": offer.get("priceCurrency") or meta.get("currency"),
+        "availability": availability,
+        "gtin": next((str(product[k]) for k in GTIN_KEYS if product.get(k)), None),
+        "brand": _name_of(product.get("brand")),
+        "sku": product.get("sku") or product.get("mpn") or meta.get("sku"),
+        "image": meta.get("image"),
+    }
+
+    # Model/storage labels as used by the normalizers; fall back to the page's own model field
+    text = " ".join(filter(None, [name, _name_of(product.get("model"))])).lower()
+    info["model"] = infer_model_from_text(text) or _name_of(product.get("model"))
+    info["storage"] = infer_storage_from_text(text)
+    return info
+
+
+def parse_until_complete(chunks: Iterable[str], max_chars: int) -> Tuple[ProductPageParser, str]:
+    """
+    Feed chunks until the parser has what it needs or max_chars were read.
+    Returns the parser and the consumed HTML (kept for recordings).
+    """
+    parser = ProductPageParser()
+    consumed: List[str] = []
+    size = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        consumed.append(chunk)
+        size += len(chunk)
+        parser.feed(chunk)
+        if parser.complete or size >= max_chars:
+            break
+    return parser, "".join(consumed)
+
+
+def parse_product_html(html: str) -> Dict[str, Any]:
+    """Extract product info from an already downloaded (possibly partial) page."""
+    parser = ProductPageParser()
+    parser.feed(html)
+    return product_info(parser)
@@ -1,18 +1,34 @@
 # app/agent/graph.py
 from __future__ import annotations
 
+import contextvars
 import json
-from typing import TypedDict, List, Dict, Any, Optional
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypedDict, List, Dict, Any, Callable, Optional, Tuple
 
-from langgraph.graph import StateGraph, START, END
-# لا نستخدم MemorySaver عشان ما نحتاج thread_id
-# from langgraph.checkpoint.memory import MemorySaver
-
-from Core.constants import TRUSTED_KSA
+from Core.config import AGENT_EXECUTOR, ENRICH_MAX_FETCHES, ENRICH_WORKERS
 from Agent.tools import shopping_search, product_page_fetch
-from Agent.normalizers import spec_normalizer, price_normalizer
-from Agent.ranking import llm_rank_offers
+from Agent.canonical import normalize_text
+from Agent.normalizers import (
+    spec_normalizer,
+    price_normalizer,
+    normalize_condition,
+    infer_model_from_text,
+    infer_storage_from_text,
+    MODEL_TOKEN_MAP,
+    STORAGE_TOKEN_MAP,
+)
+from Agent.ranking import llm_rank_offers, local_rank_offers, policy_sort_key, is_trusted
+from Agent.shadow import should_shadow, compare_rankings
 from Agent.intent import analyze_intent
+from Agent.recorder import recorded_node
+from Core.logs import get_logger
+
+logger = get_logger("agent")
+
+# Offers requested from shopping_search per run
+SEARCH_LIMIT = 40
 
 
 class AgentState(TypedDict, total=False):
@@ -30,6 +46,8 @@ class AgentState(TypedDict, total=False):
     follow_up_question: Optional[str]
     search_query: str
     clarification_count: int
+    result: Dict[str, Any]
+    shadow: Dict[str, Any]
 
 
 # -----------------------------
@@ -82,7 +100,7 @@ def planner(state: AgentState) -> AgentState:
     if "shopping_search" not in tried:
         state["next_tool"] = {
             "name": "shopping_search",
-            "args": {"query": search_query, "limit": 40},
+            "args": {"query": search_query, "limit": SEARCH_LIMIT},
         }
         return state
 
@@ -91,13 +109,6 @@ def planner(state: AgentState) -> AgentState:
         state["next_tool"] = {"name": "spec_normalizer_batch", "args": {}}
         return state
 
-    # Optionally enrich by fetching product pages if we still lack details
-    if offers and "product_page_fetch_batch" not in tried:
-        urls = [o.get("link") for o in offers[:3] if o.get("link")]
-        if urls:
-            state["next_tool"] = {"name": "product_page_fetch_batch", "args": {"urls": urls}}
-            return state
-
     # Normalize prices to SAR if needed
     if offers and any("price_sar" not in o for o in offers) and "price_normalizer_batch" not in tried:
         state["next_tool"] = {"name": "price_normalizer_batch", "args": {}}
@@ -135,16 +146,6 @@ def actor(state: AgentState) -> AgentState:
                 )
                 o.update(norm)
 
-        elif name == "product_page_fetch_batch":
-            url_map = {u: product_page_fetch(u) for u in args.get("urls", [])}
-            for o in state.get("offers", []):
-                u = o.get("link")
-                if u in url_map and url_map[u].get("ok"):
-                    if url_map[u].get("model"):
-                        o["model"] = url_map[u]["model"]
-                    if url_map[u].get("storage"):
-                        o["storage"] = url_map[u]["storage"]
-
         elif name == "price_normalizer_batch":
             for o in state.get("offers", []):
                 normp = price_normalizer(o.get("price", 0.0), o.get("currency"))
@@ -178,6 +179,91 @@ def observer(state: AgentState) -> AgentState:
     return state
 
 
+# -----------------------------
+# Finalist enrichment
+# -----------------------------
+MODEL_LABELS = {label for label, _ in MODEL_TOKEN_MAP}
+STORAGE_LABELS = {label for label, _ in STORAGE_TOKEN_MAP}
+STORAGE_MENTION_RE = re.compile(r"(?<![\w.])\d+(?:gb|tb)(?!\w)")
+
+
+def wanted_specs(query: str, intent: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """Model / storage labels the user asked for (None when not stated)."""
+    text = normalize_text(query)
+    model = infer_model_from_text(text)
+    if model and re.search(r"\d+", model).group(0) not in text:
+        # Arabic variant tokens ("برو ماكس") say nothing about the generation
+        model = None
+    specs = normalize_text(" ".join((intent.get("must_have") or []) + (intent.get("nice_to_have") or [])))
+    return {"model": model, "storage": infer_storage_from_text(specs) if specs else None}
+
+
+def needs_enrichment(o: Dict[str, Any], wanted: Dict[str, Optional[str]]) -> bool:
+    """
+    A requested spec is unknown for the offer: model missing, or storage missing
+    or ambiguous (the title lists several sizes, "256GB/512GB"). Specs the user
+    did not ask for are never looked up.
+    """
+    if o.get("enriched"):
+        return False
+    if wanted.get("model") and not o.get("model"):
+        return True
+    if wanted.get("storage"):
+        return not o.get("storage") or len(set(STORAGE_MENTION_RE.findall(normalize_text(o.get("name", ""))))) > 1
+    return False
+
+
+def conflicts(o: Dict[str, Any], wanted: Dict[str, Optional[str]]) -> bool:
+    """The product page shows a different model / storage than asked for."""
+    if not o.get("enriched"):
+        return False
+    for key, labels in (("model", MODEL_LABELS), ("storage", STORAGE_LABELS)):
+        have, want = o.get(key), wanted.get(key)
+        if want and have in labels and have != want:
+            return True
+    return False
+
+
+def _enrich(o: Dict[str, Any]) -> None:
+    info = product_page_fetch(o["link"])
+    o["enriched"] = True
+    if info.get("ok"):
+        for key in ("model", "storage", "availability", "gtin"):
+            if info.get(key):
+                o[key] = info[key]
+
+
+def enrich_finalists(
+    base: List[Dict[str, Any]],
+    k: int,
+    wanted: Dict[str, Optional[str]],
+    max_fetches: int = ENRICH_MAX_FETCHES,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Walk the policy-sorted candidates until k finalists are settled, fetching
+    product pages only for finalists that lack a requested model/storage. Offers whose page
+    contradicts the requested model/storage move to the back and the next
+    candidate takes their place. Returns (re-ordered candidates, pages fetched).
+    """
+    finalists: List[Dict[str, Any]] = []
+    demoted: List[Dict[str, Any]] = []
+    fetched = 0
+    i = 0
+    while len(finalists) < k and i < len(base):
+        batch = base[i: i + k - len(finalists)]
+        i += len(batch)
+        todo = [o for o in batch if o.get("link") and needs_enrichment(o, wanted)][: max(0, max_fetches - fetched)]
+        if todo:
+            fetched += len(todo)
+            # Each fetch runs in its own copy of this context (recording, cache mode)
+            jobs = [(contextvars.copy_context(), o) for o in todo]
+            with ThreadPoolExecutor(max_workers=min(ENRICH_WORKERS, len(todo))) as pool:
+                list(pool.map(lambda job: job[0].run(_enrich, job[1]), jobs))
+        for o in batch:
+            (demoted if conflicts(o, wanted) else finalists).append(o)
+    return finalists + base[i:] + demoted, fetched
+
+
 # -----------------------------
 # Finisher
 # -----------------------------def finisher(state: AgentState) -> Dict[str, Any]:
@@ -190,6 +276,20 @@ def finisher(state: AgentState) -> Dict[str, Any]:
     - Store result in state["result"]
     - Return the updated state
     """
+    return finish_with(state, llm_rank_offers)
+
+
+def finish_with(
+    state: AgentState,
+    ranker: Callable[..., Dict[str, Any]],
+    enrich: bool = True,
+) -> Dict[str, Any]:
+    """
+    Filtering and ranking of finisher() with a given ranker
+    (llm_rank_offers or local_rank_offers); also used by /rank/refine,
+    which passes enrich=False so no product pages are fetched.
+    """
+    top_k = 4
     q = state.get("query", "")
     offers = state.get("offers", [])
     trusted_only = bool(state.get("trusted_only"))
@@ -208,6 +308,8 @@ def finisher(state: AgentState) -> Dict[str, Any]:
     max_budget = intent.get("budget_max")
     must_have = intent.get("must_have", [])
     nice_to_have = intent.get("nice_to_have", [])
+    # "used" / "مستعمل" / "Used" all select offers normalized to "Used"
+    condition = normalize_condition(intent["condition"]).lower() if intent.get("condition") else ""
 
     def pass_basic(o: Dict[str, Any]) -> bool:
         """Basic validation before LLM ranking."""
@@ -230,6 +332,9 @@ def finisher(state: AgentState) -> Dict[str, Any]:
         if category and category not in name:
             return False
 
+        if condition and not (o.get("condition") or "").lower().startswith(condition):
+            return False
+
         # Ensure must-have keywords appear somewhere
         for token in must_have:
             token_lower = token.lower()
@@ -240,9 +345,6 @@ def finisher(state: AgentState) -> Dict[str, Any]:
 
     candidates = [o for o in offers if pass_basic(o)]
 
-    def is_trusted(o: Dict[str, Any]) -> bool:
-        return o.get("retailer") in TRUSTED_KSA
-
     trusted_candidates = [c for c in candidates if is_trusted(c)]
 
     # Case 1: user wants trusted_only and there is no trusted candidate
@@ -268,35 +370,38 @@ def finisher(state: AgentState) -> Dict[str, Any]:
         }
         return state
 
-    def cond_rank(c: str) -> int:
-        """Rank conditions: New < Refurbished < Used < Unknown."""
-        c = (c or "").lower()
-        if c.startswith("new"):
-            return 0
-        if c.startswith("refurb"):
-            return 1
-        if c.startswith("used"):
-            return 2
-        return 3
-
     # Local pre-sort before LLM
-    base.sort(
-        key=lambda x: (
-            0 if is_trusted(x) else 1,
-            cond_rank(x.get("condition")),
-            float(x.get("price_sar", x.get("price", 9e9))),
-        )
-    )
+    base.sort(key=policy_sort_key)
+
+    # Product pages only for the offers that would be shown
+    wanted = wanted_specs(q, intent)
+    if enrich:
+        base, fetched = enrich_finalists(base, top_k, wanted)
+        if fetched:
+            logger.info({"event": "finalists_enriched", "query": q, "pages": fetched})
+    # Offers whose page (fetched now or by the run a refinement comes from)
+    # contradicts the request go last; rankers keep this order as the baseline
+    base.sort(key=lambda o: conflicts(o, wanted))
 
     # LLM re-ranking (keeps links & images)
-    ranked = llm_rank_offers(base[:20], q, intent=intent, trusted_only=trusted_only, top_k=4)
+    ranked = ranker(base[:20], q, intent=intent, trusted_only=trusted_only, top_k=top_k)
+
+    # Shadow evaluation: how far the LLM ranking is from the local policy.
+    # Cached rankings are left out: their cost was not spent by this run.
+    cache_hit = bool((ranked.get("usage") or {}).get("cached"))
+    if ranker is llm_rank_offers and not cache_hit and should_shadow():
+        state["shadow"] = compare_rankings(
+            ranked, local_rank_offers(base, top_k=top_k), category=category, query=q,
+        )
 
-    try:
-        print("\nTop Picks (trusted first, New→Used, lowest price):")
-        for it in ranked.get("items", []):
-            print(f"- {it['retailer']} | {it['name']} | {it['price']} {it['currency']}\n  {it['link']}")
-    except Exception:
-        pass
+    logger.info({
+        "event": "top_picks",
+        "query": q,
+        "items": [
+            {"retailer": it.get("retailer"), "name": it.get("name"), "price": it.get("price")}
+            for it in ranked.get("items", [])
+        ],
+    })
 
     # Store result in the state (this is what FastAPI will see)
     state["result"] = {
@@ -308,28 +413,62 @@ def finisher(state: AgentState) -> Dict[str, Any]:
     return state
 
 # -----------------------------
-# Build Graph
+# Routing
 # -----------------------------
-def build_app():
-    """Build and compile the LangGraph app."""
-    graph = StateGraph(AgentState)
+def route_after_plan(state: AgentState):
+    return "finish" if state.get("done") else "act"
 
-    graph.add_node("plan", planner)
-    graph.add_node("act", actor)
-    graph.add_node("observe", observer)
-    graph.add_node("finish", finisher)
 
-    graph.add_edge(START, "plan")
+def route_after_act(state: AgentState):
+    return "observe"
+
 
-    def route_after_plan(state: AgentState):
-        return "finish" if state.get("done") else "act"
+def route_after_observe(state: AgentState):
+    return "plan"
 
-    def route_after_act(state: AgentState):
-        return "observe"
 
-    def route_after_observe(state: AgentState):
-        return "plan"
+# -----------------------------
+# Build Graph
+# -----------------------------
+def build_app(executor: str = AGENT_EXECUTOR):
+    """
+    Build the agent app.
+    executor="langgraph" (default) compiles the LangGraph app;
+    executor="native" runs the same nodes with the lightweight Agent.executor.NativeApp.
+    Both expose .stream(state) yielding {node: output} events.
+    """
+    nodes = {
+        "plan": recorded_node("plan", planner),
+        "act": recorded_node("act", actor),
+        "observe": recorded_node("observe", observer),
+        "finish": recorded_node("finish", finisher),
+    }
+    if executor == "native":
+        from Agent.executor import NativeApp
+
+        return NativeApp(
+            nodes,
+            {
+                "plan": route_after_plan,
+                "act": route_after_act,
+                "observe": route_after_observe,
+                "finish": lambda state: None,
+            },
+            entry="plan",
+        )
+    if executor != "langgraph":
+        raise ValueError(f"Unknown AGENT_EXECUTOR: {executor!r}")
+
+    # Imported lazily so the native executor does not pay for it
+    from langgraph.graph import StateGraph, START, END
+    # لا نستخدم MemorySaver عشان ما نحتاج thread_id
+    # from langgraph.checkpoint.memory import MemorySaver
 
+    graph = StateGraph(AgentState)
+    for name, fn in nodes.items():
+        graph.add_node(name, fn)
+
+    graph.add_edge(START, "plan")
     graph.add_conditional_edges("plan", route_after_plan, {"finish": "finish", "act": "act"})
     graph.add_conditional_edges("act", route_after_act, {"observe": "observe"})
     graph.add_conditional_edges("observe", route_after_observe, {"plan": "plan"})
@@ -0,0 +1,277 @@
+# app/agent/images.py
+"""
+Thumbnail proxy for offer images.
+
+Offer image URLs are turned into signed ids (`proxy_url`), so /img/{id} only ever
+fetches URLs this service handed out. Ids end up in cached /rank responses and
+are served as immutable, so the signing key must be stable across processes and
+restarts: IMAGE_SIGNING_KEY, else a key derived from OPENAI_API_KEY. Thumbnails are downscaled to one of
+IMAGE_SIZES, re-encoded as JPEG and kept in an on-disk LRU cache bounded by
+IMAGE_CACHE_MAX_BYTES. Concurrent misses for the same (image, size) share one
+upstream fetch.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import hmac
+import io
+import ipaddress
+import os
+import secrets
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from PIL import Image
+
+from Core.config import (
+    IMAGE_CACHE_DIR,
+    IMAGE_CACHE_MAX_BYTES,
+    IMAGE_SIZES,
+    IMAGE_DEFAULT_SIZE,
+    IMAGE_SIGNING_KEY,
+    IMAGE_PUBLIC_BASE_URL,
+    IMAGE_FETCH_TIMEOUT_SEC,
+    IMAGE_MAX_SOURCE_BYTES,
+    OPENAI_API_KEY,
+)
+from Core.logs import get_logger
+
+logger = get_logger("images")
+
+
+def signing_key(configured: Optional[str] = IMAGE_SIGNING_KEY, fallback_secret: Optional[str] = OPENAI_API_KEY) -> bytes:
+    """Stable key for image ids; raises at startup if there is no secret to use."""
+    if configured:
+        return configured.encode("utf-8")
+    if fallback_secret:
+        return hmac.new(fallback_secret.encode("utf-8"), b"salla-image-proxy-v1", hashlib.sha256).digest()
+    raise RuntimeError("IMAGE_SIGNING_KEY missing (set env var or .env).")
+
+
+_signing_key = signing_key()
+
+
+class ImageFetchError(RuntimeError):
+    """The source image could not be fetched or decoded."""
+
+
+# -----------------------------
+# Signed ids
+# -----------------------------
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _sign(payload: str) -> str:
+    return _b64(hmac.new(_signing_key, payload.encode("ascii"), hashlib.sha256).digest()[:12])
+
+
+def image_id(url: str) -> str:
+    payload = _b64(url.encode("utf-8"))
+    return f"{payload}.{_sign(payload)}"
+
+
+def decode_image_id(value: str) -> Optional[str]:
+    """Source URL of a signed id, or None if the id is malformed or not ours."""
+    payload, _, sig = value.partition(".")
+    if not payload or not hmac.compare_digest(sig, _sign(payload)):
+        return None
+    try:
+        return base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def proxy_url(url: Optional[str], size: Optional[int] = None) -> Optional[str]:
+    """Proxied thumbnail URL for an image URL (None for missing / non-http URLs)."""
+    if not url or not url.startswith(("http://", "https://")):
+        return None
+    query = f"?w={size}" if size else ""
+    return f"{IMAGE_PUBLIC_BASE_URL}/img/{image_id(url)}{query}"
+
+
+def snap_size(width: Optional[int]) -> int:
+    """Smallest configured size that covers `width` (the largest if none does)."""
+    if not width:
+        return IMAGE_DEFAULT_SIZE
+    for size in IMAGE_SIZES:
+        if size >= width:
+            return size
+    return IMAGE_SIZES[-1]
+
+
+# -----------------------------
+# On-disk LRU cache
+# -----------------------------
+class DiskLRU:
+    """Files in one directory, evicted least-recently-used first above max_bytes."""
+
+    def __init__(self, directory: str = IMAGE_CACHE_DIR, max_bytes: int = IMAGE_CACHE_MAX_BYTES) -> None:
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # name -> size, oldest first; rebuilt from mtimes on start
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        entries = []
+        for p in self.dir.glob("*.jpg"):
+            st = p.stat()
+            entries.append((st.st_mtime, p.name, st.st_size))
+        for _, name, size in sorted(entries):
+            self._index[name] = size
+            self._bytes += size
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            if name not in self._index:
+                return None
+            self._index.move_to_end(name)
+        path = self.dir / name
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # mtime is the recency kept across restarts
+            return data
+        except FileNotFoundError:
+            with self._lock:
+                self._bytes -= self._index.pop(name, 0)
+            return None
+
+    def set(self, name: str, data: bytes) -> None:
+        tmp = self.dir / f".{name}.{secrets.token_hex(4)}.tmp"
+        tmp.write_bytes(data)
+        os.replace(tmp, self.dir / name)
+        with self._lock:
+            self._bytes += len(data) - self._index.pop(name, 0)
+            self._index[name] = len(data)
+            while self._bytes > self.max_bytes and len(self._index) > 1:
+                old, size = self._index.popitem(last=False)
+                self._bytes -= size
+                (self.dir / old).unlink(missing_ok=True)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
+
+# -----------------------------
+# Fetch + resize
+# -----------------------------
+MAX_REDIRECTS = 3
+
+
+def _check_target(url: str) -> None:
+    """Only public http(s) hosts; a redirect must not reach localhost or internal addresses."""
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.scheme not in ("http", "https") or not host:
+        raise ImageFetchError(f"refusing to fetch {url[:200]}")
+    try:
+        ip = ipaddress.ip_address(host)
+    except ValueError:
+        if host == "localhost" or host.endswith(".localhost"):
+            raise ImageFetchError(f"refusing to fetch {url[:200]}")
+        return
+    if not ip.is_global:
+        raise ImageFetchError(f"refusing to fetch {url[:200]}")
+
+
+def _fetch(url: str) -> bytes:
+    """Download a source image; redirects are followed by hand so every hop is checked."""
+    try:
+        for _ in range(MAX_REDIRECTS + 1):
+            _check_target(url)
+            with requests.get(url, timeout=IMAGE_FETCH_TIMEOUT_SEC, stream=True, allow_redirects=False) as r:
+                if r.is_redirect:
+                    url = urljoin(url, r.headers["Location"])
+                    continue
+                r.raise_for_status()
+                if not r.headers.get("Content-Type", "image/").startswith("image/"):
+                    raise ImageFetchError(f"not an image: {r.headers.get('Content-Type')}")
+                buf = bytearray()
+                for chunk in r.iter_content(chunk_size=65536):
+                    buf.extend(chunk)
+                    if len(buf) > IMAGE_MAX_SOURCE_BYTES:
+                        raise ImageFetchError("source image too large")
+                return bytes(buf)
+    except requests.RequestException as e:
+        raise ImageFetchError(str(e)) from e
+    raise ImageFetchError("too many redirects")
+
+
+def make_thumbnail(data: bytes, size: int) -> bytes:
+    """Downscale to fit size x size (never upscale) and re-encode as JPEG."""
+    try:
+        img = Image.open(io.BytesIO(data))
+        img.draft("RGB", (size, size))  # JPEG sources decode at reduced scale
+        img.thumbnail((size, size))
+        if img.mode in ("RGBA", "LA", "P"):
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel("A"))
+            img = background
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+        out = io.BytesIO()
+        img.save(out, "JPEG", quality=80, optimize=True, progressive=True)
+        return out.getvalue()
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise ImageFetchError(f"cannot decode image: {e}") from e
+
+
+class ThumbnailService:
+    """Cached, coalesced thumbnails."""
+
+    def __init__(self, cache: Optional[DiskLRU] = None) -> None:
+        self._cache = cache
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+
+    @property
+    def cache(self) -> DiskLRU:
+        # Created on first use so importing the API does not touch the disk
+        if self._cache is None:
+            self._cache = DiskLRU()
+        return self._cache
+
+    def get(self, url: str, size: int) -> Tuple[bytes, str]:
+        """(JPEG bytes, cache name) of url downscaled to size."""
+        name = hashlib.sha256(f"{size}|{url}".encode("utf-8")).hexdigest() + ".jpg"
+        data = self.cache.get(name)
+        if data is not None:
+            return data, name
+
+        with self._lock:
+            future = self._inflight.get(name)
+            leader = future is None
+            if leader:
+                future = self._inflight[name] = Future()
+        if not leader:
+            return future.result(), name
+
+        try:
+            data = make_thumbnail(_fetch(url), size)
+            try:
+                self.cache.set(name, data)
+            except OSError as e:
+                # Full or read-only disk: serve the thumbnail uncached
+                logger.warning({"event": "thumbnail_cache_write_failed", "name": name, "error": str(e)})
+            future.set_result(data)
+            return data, name
+        except Exception as e:
+            logger.warning({"event": "thumbnail_failed", "url": url, "size": size, "error": str(e)})
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(name, None)
+
+
+thumbnails = ThumbnailService()
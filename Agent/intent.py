@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import copy
 import json
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
-from Core.config import client
+from Agent import recorder
+from Agent.canonical import canonical_query, has_arabic
+from Agent.intent_rules import parse_intent_locally
+from Core.cache import CacheBackend, cached, make_cache
+from Core.config import client, INTENT_FASTPATH_MIN_CONFIDENCE, CACHE_MAX_ENTRIES, INTENT_CACHE_TTL_SEC
 
 
 INTENT_SYSTEM_PROMPT = (
@@ -15,8 +20,37 @@ INTENT_SYSTEM_PROMPT = (
     "user's language. Always respond with strict JSON matching the schema."
 )
 
+# query -> LLM-parsed intent
+_intent_cache: CacheBackend[Dict[str, Any]] = make_cache("intent", CACHE_MAX_ENTRIES, INTENT_CACHE_TTL_SEC)
+
 
 def analyze_intent(query: str) -> Dict[str, Any]:
+    # Well-formed queries ("iPhone 15 Pro Max 256GB") are parsed locally
+    local, confidence = parse_intent_locally(query)
+    if confidence >= INTENT_FASTPATH_MIN_CONFIDENCE:
+        return local
+
+    # The planner edits the intent in place; hand out a copy of the cached one
+    data = cached(_intent_cache, _intent_key(query), lambda: _analyze_with_llm(query))
+    return copy.deepcopy(data)
+
+
+def known_intent(query: str) -> Optional[Dict[str, Any]]:
+    """The intent analyze_intent would return, if it needs no LLM call (else None)."""
+    local, confidence = parse_intent_locally(query)
+    if confidence >= INTENT_FASTPATH_MIN_CONFIDENCE:
+        return local
+    data = _intent_cache.get(_intent_key(query))
+    return copy.deepcopy(data) if data is not None else None
+
+
+def _intent_key(query: str) -> str:
+    # Keyed by canonical query; the script stays in the key because the follow-up
+    # question is written in the user's language
+    return ("ar|" if has_arabic(query) else "en|") + canonical_query(query)
+
+
+def _analyze_with_llm(query: str) -> Dict[str, Any]:
     schema = {
         "type": "object",
         "properties": {
@@ -57,23 +91,29 @@ def analyze_intent(query: str) -> Dict[str, Any]:
         ],
     }
 
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
-        temperature=0,
-        response_format={"type": "json_object"},
-        messages=[
-            {"role": "system", "content": INTENT_SYSTEM_PROMPT},
-            {
-                "role": "user",
-                "content": (
-                    "User request:\n"
-                    f"{query}\n\n"
-                    "Respond with JSON."
-                ),
-            },
-        ],
-    )
-    data = json.loads(resp.choices[0].message.content)
+    messages = [
+        {"role": "system", "content": INTENT_SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": (
+                "User request:\n"
+                f"{query}\n\n"
+                "Respond with JSON."
+            ),
+        },
+    ]
+
+    def complete() -> str:
+        resp = client.chat.completions.create(
+            model="gpt-4o-mini",
+            temperature=0,
+            response_format={"type": "json_object"},
+            messages=messages,
+        )
+        return resp.choices[0].message.content
+
+    content = recorder.upstream("openai", json.dumps(messages, ensure_ascii=False), complete)
+    data = json.loads(content)
 
     # Normalize legacy fields (some models might return different keys)
     if "ready" not in data:
@@ -0,0 +1,230 @@
+# app/agent/intent_rules.py
+"""
+Rule-based intent parser for common, well-formed shopping queries.
+
+Handles queries such as "iPhone 15 Pro Max 256GB" or
+"شاشة 27 انش 2K تحت 1000 ريال": product family or category, specs
+(storage, screen size, resolution, refresh rate), item condition and budget. Returns the same
+dict shape as analyze_intent plus a confidence score; analyze_intent only calls
+the LLM when the confidence is below INTENT_FASTPATH_MIN_CONFIDENCE.
+"""
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from Agent.canonical import ARABIC_DIGITS
+from Agent.normalizers import infer_model_from_text
+
+# Product families whose English name appears in practically every offer title,
+# so it is safe to use as the finisher's category filter.
+FAMILIES: List[Tuple[str, List[str]]] = [
+    ("iphone", ["iphone", "ايفون", "آيفون", "أيفون"]),
+    ("ipad", ["ipad", "ايباد", "آيباد"]),
+    ("macbook", ["macbook", "ماك بوك", "ماكبوك"]),
+    ("airpods", ["airpods", "ايربودز", "اير بودز"]),
+    ("galaxy", ["galaxy", "جالكسي", "جالاكسي", "قلاكسي"]),
+    ("pixel", ["pixel", "بكسل"]),
+    ("playstation", ["playstation", "ps5", "بلايستيشن", "بلاستيشن"]),
+    ("xbox", ["xbox", "اكس بوكس"]),
+]
+
+# Generic categories; their words rarely appear in offer titles, so the
+# category filter is left empty and they only shape the search query.
+CATEGORIES: List[Tuple[str, List[str]]] = [
+    ("monitor", ["monitor", "شاشة كمبيوتر", "شاشه", "شاشة"]),
+    ("tv", ["tv", "television", "تلفزيون", "تلفاز"]),
+    ("laptop", ["laptop", "notebook", "لابتوب", "لاب توب"]),
+    ("phone", ["phone", "smartphone", "جوال", "هاتف", "موبايل"]),
+    ("headphones", ["headphones", "earbuds", "سماعة", "سماعات"]),
+    ("tablet", ["tablet", "تابلت"]),
+    ("watch", ["smartwatch", "watch", "ساعة ذكية", "ساعة"]),
+]
+
+BRANDS = ["apple", "samsung", "lg", "sony", "dell", "hp", "lenovo", "asus", "acer", "huawei",
+          "xiaomi", "msi", "ابل", "أبل", "سامسونج", "هواوي", "شاومي", "سوني", "ديل", "لينوفو"]
+
+VARIANT_WORDS = ["pro max", "promax", "pro", "max", "plus", "ultra", "mini", "air", "fe", "series", "slim",
+                 "برو ماكس", "برو", "ماكس", "بلس", "بلاس", "الترا", "ميني", "اير", "سليم"]
+
+# Words that carry no product information (greetings, "I want", "price", currency, ...)
+FILLER = {
+    "ابي", "ابغى", "أبغى", "ابغا", "اريد", "أريد", "ودي", "ابحث", "عن", "لي", "ب", "بـ", "في", "من",
+    "سعر", "اسعار", "أسعار", "ارخص", "أرخص", "افضل", "أفضل", "جديد", "اصلي", "أصلي", "السعودية",
+    "ريال", "رس", "sar", "sr", "riyal", "riyals", "i", "want", "need", "buy", "a", "an", "the",
+    "for", "with", "price", "cheapest", "best", "new", "original", "in", "ksa", "saudi", "gb",
+    "tb", "inch", "و", "and", "or", "او", "أو",
+}
+
+STORAGE_RE = re.compile(r"(\d{1,4})\s*(gb|tb|جيجابايت|جيجا|قيقا|تيرابايت|تيرا)(?!\w)", re.I)
+SIZE_RE = re.compile(r"(\d{2}(?:\.\d)?)\s*(?:inch|in\b|\"|”|انش|إنش|بوصة|بوصه)", re.I)
+BARE_STORAGE_RE = re.compile(r"(?<!\d)(64|128|256|512)(?!\d)")
+RESOLUTION_RE = re.compile(r"\b(8k|4k|2k|1080p|1440p|2160p|qhd|fhd|uhd|full hd)\b", re.I)
+REFRESH_RE = re.compile(r"(\d{2,3})\s*(?:hz|هرتز)", re.I)
+
+# A price, not a spec: "over 256gb" / "under 27 inch" are not budgets
+NUM = (
+    r"(?<![\d.,])(\d[\d,]*(?:\.\d+)?(?:\s*(?:k|ألف|الف)(?!\w))?)"
+    r"(?![\d.,]|\s*(?:gb|tb|giga|tera|جيجا|قيقا|تيرا|inch|\"|”|انش|إنش|بوصة|بوصه|hz|هرتز))"
+)
+CURRENCY = r"(?:\s*(?:ريال|رس|sar|sr|riyals?)(?!\w))?"
+
+
+def _keywords(*words: str) -> str:
+    """Whole-word alternation ("over" must not match inside "cover")."""
+    return r"(?<!\w)(?:" + "|".join(words) + r")(?!\w)"
+
+
+BUDGET_PATTERNS: List[Tuple[re.Pattern, str]] = [
+    (re.compile(rf"{_keywords('بين', 'between')}\s*{NUM}{CURRENCY}\s*(?:و|-|and|to|الى|إلى)\s*{NUM}{CURRENCY}", re.I),
+     "range"),
+    (re.compile(rf"(?:{_keywords('تحت', 'أقل من', 'اقل من', 'ما يزيد عن', 'لا يتجاوز', 'under', 'below', 'less than', 'up to')}"
+                rf"|<)\s*{NUM}{CURRENCY}", re.I), "max"),
+    (re.compile(rf"(?:{_keywords('فوق', 'أكثر من', 'اكثر من', 'above', 'over', 'more than')}|>)\s*{NUM}{CURRENCY}", re.I),
+     "min"),
+    (re.compile(rf"(?:{_keywords('بحدود', 'حدود', 'around', 'about')}|~)\s*{NUM}{CURRENCY}", re.I), "around"),
+    (re.compile(rf"{NUM}\s*(?:ريال|رس|sar|sr|riyals?)(?!\w)", re.I), "max"),
+]
+
+# Item condition words → intent["condition"] (matched against the offer's normalized condition)
+CONDITIONS: List[Tuple[str, List[str]]] = [
+    ("refurbished", ["refurbished", "renewed", "مجدد", "مجددة", "مجدده"]),
+    ("used", ["used", "second hand", "مستعمل", "مستعملة", "مستعمله", "مستخدم"]),
+]
+
+# The query is about an accessory for the product, not the product itself;
+# the family filter would be wrong, so these go to the LLM
+ACCESSORY_WORDS = ["cover", "case", "charger", "cable", "screen protector", "strap", "كفر", "جراب", "غطاء",
+                   "شاحن", "كيبل", "سلك", "حماية شاشة", "لزقة", "استيكر"]
+
+
+# Thousands separators inside a number: "4,000" / "٤٬٠٠٠" / "4،000" → "4000"
+DIGIT_GROUP_RE = re.compile(r"(?<=\d)[,،](?=\d{3}(?!\d))")
+
+
+def _to_number(txt: str) -> float:
+    """'1,500' → 1500.0, '2k' / '2 ألف' → 2000.0"""
+    m = re.match(r"([\d,.]+)\s*(k|ألف|الف)?", txt.strip(), re.I)
+    value = float(m.group(1).replace(",", ""))
+    return value * 1000 if m.group(2) else value
+
+
+def parse_budget(text: str) -> Tuple[Optional[float], Optional[float], Optional[Tuple[int, int]]]:
+    """Return (budget_min, budget_max, matched span) from a normalized query."""
+    for pattern, kind in BUDGET_PATTERNS:
+        m = pattern.search(text)
+        if not m:
+            continue
+        if kind == "range":
+            lo, hi = sorted((_to_number(m.group(1)), _to_number(m.group(2))))
+            return lo, hi, m.span()
+        value = _to_number(m.group(1))
+        if kind == "max":
+            return None, value, m.span()
+        if kind == "min":
+            return value, None, m.span()
+        return round(value * 0.85), round(value * 1.15), m.span()
+    return None, None, None
+
+
+def _find(text: str, table: List[Tuple[str, List[str]]]) -> Tuple[Optional[str], Optional[str]]:
+    for label, words in table:
+        for w in words:
+            # A number may be glued on ("iphone15"), a letter may not ("tvs" is fine, "tvbox" is not)
+            if re.search(rf"(?<!\w){re.escape(w)}(?![^\W\d_])", text):
+                return label, w
+    return None, None
+
+
+def parse_intent_locally(query: str) -> Tuple[Dict[str, Any], float]:
+    """Parse a query without the LLM. Returns (intent dict, confidence in [0, 1])."""
+    normalized = " ".join(DIGIT_GROUP_RE.sub("", query.translate(ARABIC_DIGITS)).split())
+    text = normalized.lower()
+
+    budget_min, budget_max, budget_span = parse_budget(text)
+    product_text = text if budget_span is None else (text[: budget_span[0]] + " " + text[budget_span[1]:])
+    product_text = " ".join(product_text.split())
+
+    family, family_word = _find(product_text, FAMILIES)
+    category, category_word = (None, None) if family else _find(product_text, CATEGORIES)
+
+    specs: List[str] = []
+    recognized: List[str] = []
+    m = STORAGE_RE.search(product_text)
+    if m:
+        unit = "TB" if m.group(2).lower() in ("tb", "تيرا", "تيرابايت") else "GB"
+        specs.append(f"{m.group(1)}{unit}")
+        recognized.append(m.group(0))
+    elif family:
+        # "ايفون 15 برو 256": device families quote storage without a unit
+        m = BARE_STORAGE_RE.search(product_text)
+        if m:
+            specs.append(f"{m.group(1)}GB")
+            recognized.append(m.group(0))
+    m = SIZE_RE.search(product_text)
+    if m:
+        specs.append(f"{m.group(1)} inch")
+        recognized.append(m.group(0))
+    m = RESOLUTION_RE.search(product_text)
+    if m:
+        specs.append(m.group(1).upper())
+        recognized.append(m.group(0))
+    m = REFRESH_RE.search(product_text)
+    if m:
+        specs.append(f"{m.group(1)}Hz")
+        recognized.append(m.group(0))
+    condition, condition_word = _find(product_text, CONDITIONS)
+    if condition_word:
+        recognized.append(condition_word)
+    accessory = any(re.search(rf"(?<!\w){re.escape(w)}(?!\w)", product_text) for w in ACCESSORY_WORDS)
+
+    model = infer_model_from_text(product_text) if family == "iphone" else None
+    if model and re.search(r"\d+", model).group(0) not in product_text:
+        # The normalizer's Arabic variant tokens ("برو ماكس") are generation-agnostic
+        model = None
+
+    # Coverage: share of query tokens we understood; unknown words mean the
+    # query says something the rules cannot capture (use case, comparison, ...)
+    leftover = product_text
+    for phrase in sorted(recognized + [family_word or "", category_word or ""] + VARIANT_WORDS + BRANDS,
+                         key=len, reverse=True):
+        if phrase:
+            leftover = re.sub(rf"(?<!\w){re.escape(phrase)}(?![^\W\d_])", " ", leftover)
+    tokens = product_text.split()
+    unknown = [t for t in leftover.split() if t not in FILLER and not t.isdigit()]
+    coverage = 1.0 - (len(unknown) / max(1, len(tokens)))
+
+    has_product = bool(family or category)
+    has_brand = any(re.search(rf"(?<!\w){re.escape(b)}(?!\w)", product_text) for b in BRANDS)
+    confidence = 0.0
+    if family:
+        confidence = 0.45 + 0.4 * coverage
+        if model or re.search(r"\d", product_text):
+            confidence += 0.15
+    elif category:
+        # A bare category ("جوال") is usually worth a follow-up question; specs or a brand make it searchable
+        confidence = 0.35 + 0.4 * coverage + (0.1 if specs else 0.0) + (0.1 if has_brand else 0.0)
+    if accessory:
+        confidence = min(confidence, 0.5)
+    confidence = round(min(confidence, 1.0), 2)
+
+    search_query = normalized
+    if budget_span is not None:
+        # Drop the budget phrase from the search text
+        search_query = " ".join((normalized[: budget_span[0]] + " " + normalized[budget_span[1]:]).split())
+
+    intent: Dict[str, Any] = {
+        "need_summary": " ".join([model, *specs]) if model else search_query,
+        "category": family or "",
+        "search_query": search_query,
+        "budget_min": budget_min,
+        "budget_max": budget_max,
+        "must_have": [],
+        "nice_to_have": specs,
+        "missing_info": [],
+        "follow_up_question": None,
+        "ready": has_product,
+    }
+    if condition:
+        intent["condition"] = condition
+    return intent, confidence
@@ -0,0 +1,218 @@
+# app/agent/jobs.py
+"""
+SQLite-backed job queue and worker processes for asynchronous /rank jobs.
+
+The API process only enqueues jobs and reads their status; a pool of worker
+processes claims queued jobs and runs the agent. Workers can run embedded in
+the API process (see JOB_WORKERS) or standalone:
+
+    python -m Agent.jobs --workers 4
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from typing import Any, Dict, List, Optional
+
+from Agent.graph import build_app
+from Agent.refine import save_pool
+from Agent.runner import run_agent, result_view
+from Core.config import JOBS_DB_PATH, JOB_WORKERS, JOB_MAX_ATTEMPTS, JOB_RETENTION_SEC
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Jobs stuck in "running" longer than this (worker crashed) are re-queued,
+# up to JOB_MAX_ATTEMPTS claims in total
+STALE_AFTER_SEC = 600
+# How often each worker deletes finished jobs older than JOB_RETENTION_SEC
+SWEEP_INTERVAL_SEC = 300
+
+
+class JobQueue:
+    """Small persistent job queue shared by the API and worker processes."""
+
+    def __init__(self, path: str = JOBS_DB_PATH, max_attempts: int = JOB_MAX_ATTEMPTS) -> None:
+        self.path = path
+        self.max_attempts = max_attempts
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            # Databases created before attempts were counted
+            columns = {r["name"] for r in conn.execute("PRAGMA table_info(jobs)")}
+            if "attempts" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def enqueue(self, payload: Dict[str, Any]) -> str:
+        """Add a job and return its id."""
+        job_id = uuid.uuid4().hex
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, payload, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(payload, ensure_ascii=False), time.time()),
+            )
+        return job_id
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Atomically move the oldest queued job to running and return it.
+        Stale running jobs are re-queued first, or failed once they used up their attempts.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+                "WHERE status = ? AND started_at < ? AND attempts >= ?",
+                (FAILED, f"Worker died {self.max_attempts} times while running this job.", now,
+                 RUNNING, now - STALE_AFTER_SEC, self.max_attempts),
+            )
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL WHERE status = ? AND started_at < ?",
+                (QUEUED, RUNNING, now - STALE_AFTER_SEC),
+            )
+            row = conn.execute(
+                "SELECT id, payload FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (QUEUED,),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (RUNNING, now, row["id"]),
+            )
+            conn.execute("COMMIT")
+            return {"id": row["id"], "payload": json.loads(row["payload"])}
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, finished_at = ? WHERE id = ?",
+                (DONE, json.dumps(result, ensure_ascii=False), time.time(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                (FAILED, error, time.time(), job_id),
+            )
+
+    def sweep(self, retention: float = JOB_RETENTION_SEC) -> int:
+        """Delete done/failed jobs finished more than `retention` seconds ago. Returns how many."""
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (DONE, FAILED, time.time() - retention),
+            )
+        return cur.rowcount
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job record (status, payload, result, error) or None."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+def worker_main(db_path: str = JOBS_DB_PATH, poll_interval: float = 0.2) -> None:
+    """Worker process loop: claim queued jobs and run the agent on them."""
+    queue = JobQueue(db_path)
+    app = build_app()
+    next_sweep = 0.0
+    while True:
+        if time.time() >= next_sweep:
+            queue.sweep()
+            next_sweep = time.time() + SWEEP_INTERVAL_SEC
+        job = queue.claim()
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        run_job(queue, app, job)
+
+
+def run_job(queue: JobQueue, app: Any, job: Dict[str, Any]) -> None:
+    """Run one claimed job and record its result or error."""
+    payload = job["payload"]
+    try:
+        final = run_agent(app, payload["query"], payload.get("trusted_only", True))
+        if final is None:
+            queue.fail(job["id"], "Agent did not reach finish node.")
+        else:
+            # Same pool_id as a synchronous /rank (refinable if CACHE_BACKEND is shared)
+            queue.complete(job["id"], {**result_view(final), "pool_id": save_pool(final)})
+    except Exception as e:
+        queue.fail(job["id"], str(e))
+
+
+def start_workers(n: int = JOB_WORKERS, db_path: str = JOBS_DB_PATH) -> List[mp.Process]:
+    """Start n daemon worker processes."""
+    ctx = mp.get_context("spawn")
+    procs = []
+    for _ in range(max(0, n)):
+        p = ctx.Process(target=worker_main, args=(db_path,), daemon=True)
+        p.start()
+        procs.append(p)
+    return procs
+
+
+def stop_workers(procs: List[mp.Process]) -> None:
+    for p in procs:
+        p.terminate()
+    for p in procs:
+        p.join(timeout=5)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run /rank job workers.")
+    parser.add_argument("--workers", type=int, default=mp.cpu_count())
+    parser.add_argument("--db", default=JOBS_DB_PATH)
+    args = parser.parse_args()
+
+    JobQueue(args.db)  # create schema before workers race for it
+    workers = start_workers(args.workers, args.db)
+    try:
+        for w in workers:
+            w.join()
+    except KeyboardInterrupt:
+        stop_workers(workers)
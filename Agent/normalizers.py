@@ -3,6 +3,8 @@ from __future__ import annotations
 
 from typing import Dict, Any, Optional, List, Tuple
 
+from Agent.canonical import normalize_text
+
 MODEL_TOKEN_MAP: List[Tuple[str, List[str]]] = [
     ("iPhone 15 Pro Max", ["15 pro max", "15promax", "promax", "برو ماكس", "ماكس"]),
     ("iPhone 15 Pro", ["15 pro", "15pro", "برو"]),
@@ -36,25 +38,32 @@ def infer_storage_from_text(txt: str) -> Optional[str]:
     return None
 
 
+# Normalized (see normalize_text) prefixes of used-condition labels
+USED_PREFIXES = ("used", "pre owned", "second hand", "مستعمل", "مستخدم")
+
+
+def normalize_condition(condition: Optional[str]) -> str:
+    """'مستعملة - ممتاز' → 'Used', 'brand new' → 'New'; unknown labels are kept as-is."""
+    cond_raw = (condition or "").strip()
+    cl = normalize_text(cond_raw)
+    if cl in {"new", "brand new", "جديد"}:
+        return "New"
+    if "refurb" in cl or cl.startswith("مجدد") or cl == "منتجات مجدده":
+        return "Refurbished"
+    if cl.startswith(USED_PREFIXES):
+        return "Used"
+    return cond_raw or "Unknown"
+
+
 def spec_normalizer(name: str, retailer: str, condition: str) -> Dict[str, Any]:
     """Normalize model, storage, and condition from raw product text."""
-    txt = f"{name} {retailer} {condition}".lower()
+    # "iPhone15 Pro Max ٢٥٦ جيجا" → "iphone 15 pro max 256gb"
+    txt = normalize_text(f"{name} {retailer} {condition}")
 
     model = infer_model_from_text(txt)
     storage = infer_storage_from_text(txt)
 
-    cond_raw = (condition or "").strip()
-    cl = cond_raw.lower()
-    if cl in {"new", "brand new", "جديد"}:
-        cond = "New"
-    elif "refurb" in cl or cl in {"مجدَّد", "منتَجات مجدَّدة"}:
-        cond = "Refurbished"
-    elif cl.startswith("used"):
-        cond = "Used"
-    else:
-        cond = cond_raw or "Unknown"
-
-    return {"model": model, "storage": storage, "condition": cond}
+    return {"model": model, "storage": storage, "condition": normalize_condition(condition)}
 
 
 def price_normalizer(price: float, currency: Optional[str]) -> Dict[str, Any]:
@@ -0,0 +1,142 @@
+# app/agent/prewarm.py
+"""
+Popular-query tracking and cache pre-warming.
+
+Every /rank query is counted in a Space-Saving heavy-hitter table. A background
+thread re-runs the agent for the top-N queries (in cache refresh mode) when their
+cached search result is missing or expires within PREWARM_LEAD_SEC, spending at
+most PREWARM_CREDITS_PER_HOUR SearchAPI credits (one per refreshed query).
+Entries written by requests or by other processes count, so fresh ones are left alone.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, List
+
+from Agent.canonical import canonical_query
+from Agent.graph import SEARCH_LIMIT
+from Agent.intent import known_intent
+from Agent.runner import stream_final
+from Agent.tools import search_expires_in
+from Core.cache import refreshing
+from Core.config import (
+    HEAVY_HITTER_CAPACITY,
+    PREWARM_TOP_N,
+    PREWARM_INTERVAL_SEC,
+    PREWARM_LEAD_SEC,
+    PREWARM_CREDITS_PER_HOUR,
+)
+from Core.heavy_hitters import SpaceSaving
+from Core.logs import get_logger
+
+logger = get_logger("prewarm")
+
+query_tracker = SpaceSaving(HEAVY_HITTER_CAPACITY)
+
+
+def query_key(query: str, trusted_only: bool) -> str:
+    return f"{int(bool(trusted_only))}|{canonical_query(query)}"
+
+
+def track_query(query: str, trusted_only: bool) -> None:
+    """Count one request for a query."""
+    query_tracker.offer(query_key(query, trusted_only), {"query": query, "trusted_only": bool(trusted_only)})
+
+
+def top_queries(n: int = PREWARM_TOP_N) -> List[Dict[str, Any]]:
+    return [
+        {"query": t["payload"]["query"], "trusted_only": t["payload"]["trusted_only"],
+         "count": t["count"], "error": t["error"]}
+        for t in query_tracker.top(n)
+    ]
+
+
+class Prewarmer:
+    """Background thread keeping the top queries' caches warm within a credit budget."""
+
+    def __init__(
+        self,
+        app: Any,
+        tracker: SpaceSaving = query_tracker,
+        top_n: int = PREWARM_TOP_N,
+        interval: float = PREWARM_INTERVAL_SEC,
+        credits_per_hour: int = PREWARM_CREDITS_PER_HOUR,
+        lead: float = PREWARM_LEAD_SEC,
+    ) -> None:
+        self.app = app
+        self.tracker = tracker
+        self.top_n = top_n
+        self.interval = interval
+        self.credits_per_hour = credits_per_hour
+        # Refresh entries expiring before the next check, plus a margin
+        self.lead = max(lead, interval)
+        self._window_start = time.time()
+        self._spent = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="prewarmer", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def _take_credit(self) -> bool:
+        now = time.time()
+        if now - self._window_start >= 3600:
+            self._window_start, self._spent = now, 0
+        if self._spent >= self.credits_per_hour:
+            return False
+        self._spent += 1
+        return True
+
+    def is_due(self, payload: Dict[str, Any]) -> bool:
+        """
+        True if the query's cached search result is missing or expires within `lead`.
+        The search query comes from the locally parsed or cached intent (never the LLM);
+        with neither, the intent has expired too and the query is due. Queries
+        answered with a follow-up question never search, so are never due.
+        """
+        intent = known_intent(payload["query"])
+        if intent is None:
+            return True
+        if not intent.get("ready", False):
+            return False
+        left = search_expires_in(intent.get("search_query") or payload["query"], limit=SEARCH_LIMIT)
+        return left is None or left <= self.lead
+
+    def run_once(self) -> int:
+        """Refresh due top queries. Returns how many were refreshed."""
+        refreshed = 0
+        for item in self.tracker.top(self.top_n):
+            payload = item["payload"]
+            try:
+                if not self.is_due(payload):
+                    continue
+            except Exception as e:
+                logger.warning({"event": "prewarm_check_failed", "query": payload["query"], "error": str(e)})
+                continue
+            if not self._take_credit():
+                logger.info({"event": "prewarm_budget_exhausted", "spent": self._spent})
+                break
+            started = time.perf_counter()
+            try:
+                with refreshing():
+                    stream_final(self.app, payload["query"], payload["trusted_only"])
+            except Exception as e:
+                logger.warning({"event": "prewarm_failed", "query": payload["query"], "error": str(e),
+                                "duration_ms": round((time.perf_counter() - started) * 1000, 1)})
+                continue
+            refreshed += 1
+            logger.info({"event": "prewarmed", "query": payload["query"], "count": item["count"],
+                         "duration_ms": round((time.perf_counter() - started) * 1000, 1)})
+        return refreshed
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.warning({"event": "prewarm_error", "error": str(e)})
@@ -1,12 +1,76 @@
 # app/agent/ranking.py
 from __future__ import annotations
 
+import copy
+import hashlib
 import json
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Tuple
 
-from Core.config import client
+from Agent import recorder
+from Core.cache import CacheBackend, cached, make_cache
+from Core.config import client, CACHE_MAX_ENTRIES, RANK_CACHE_TTL_SEC
 from Core.constants import TRUSTED_KSA
 
+# hash of the ranking prompt -> LLM ranking
+_rank_cache: CacheBackend[Dict[str, Any]] = make_cache("rank", CACHE_MAX_ENTRIES, RANK_CACHE_TTL_SEC)
+
+
+def is_trusted(offer: Dict[str, Any]) -> bool:
+    return offer.get("retailer") in TRUSTED_KSA
+
+
+def cond_rank(c: str | None) -> int:
+    """Rank conditions: New < Refurbished < Used < Unknown."""
+    c = (c or "").lower()
+    if c.startswith("new"):
+        return 0
+    if c.startswith("refurb"):
+        return 1
+    if c.startswith("used"):
+        return 2
+    return 3
+
+
+def policy_sort_key(offer: Dict[str, Any]) -> Tuple[int, int, float]:
+    """Local ranking policy: trusted first, then better condition, then cheaper."""
+    return (
+        0 if is_trusted(offer) else 1,
+        cond_rank(offer.get("condition")),
+        float(offer.get("price_sar", offer.get("price", 9e9))),
+    )
+
+
+def local_rank_offers(
+    offers: List[Dict[str, Any]],
+    query: str = "",
+    intent: Dict[str, Any] | None = None,
+    trusted_only: bool = False,
+    top_k: int = 4,
+) -> Dict[str, Any]:
+    """
+    Deterministic ranking in the same shape (and signature) as llm_rank_offers:
+    the first top_k offers in the given order. finish_with passes them sorted by
+    policy_sort_key with spec conflicts moved last; query, intent and
+    trusted_only are applied by its filtering.
+    """
+    items = []
+    for o in [o for o in offers if o.get("link")][:top_k]:
+        reason = ["trusted retailer" if is_trusted(o) else "other retailer"]
+        if o.get("condition"):
+            reason.append(str(o["condition"]).lower())
+        items.append({
+            "name": o.get("name"),
+            "price": o.get("price_sar", o.get("price")),
+            "currency": o.get("currency", "SAR"),
+            "retailer": o.get("retailer"),
+            "link": o.get("link"),
+            "condition": o.get("condition"),
+            "image": o.get("image"),
+            "reason": ", ".join(reason) + ", lowest price among these",
+        })
+    return {"items": items, "notes": None}
+
 
 def llm_rank_offers(
     offers: List[Dict[str, Any]],
@@ -75,27 +139,62 @@ def llm_rank_offers(
         "required": ["items"],
     }
 
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
-        temperature=0,
-        response_format={"type": "json_object"},
-        messages=[
-            {"role": "system", "content": system},
-            {
-                "role": "user",
-                "content": (
-                    "User query:\n"
-                    f"{query}\n\n"
-                    "Shopping intent:\n"
-                    f"{json.dumps(policy, ensure_ascii=False)}\n\n"
-                    "Candidate offers:\n"
-                    f"{json.dumps(slim, ensure_ascii=False)}\n\n"
-                    "Return schema:\n"
-                    f"{json.dumps(schema, ensure_ascii=False)}"
-                ),
+    messages = [
+        {"role": "system", "content": system},
+        {
+            "role": "user",
+            "content": (
+                "User query:\n"
+                f"{query}\n\n"
+                "Shopping intent:\n"
+                f"{json.dumps(policy, ensure_ascii=False)}\n\n"
+                "Candidate offers:\n"
+                f"{json.dumps(slim, ensure_ascii=False)}\n\n"
+                "Return schema:\n"
+                f"{json.dumps(schema, ensure_ascii=False)}"
+            ),
+        },
+    ]
+
+    def complete() -> Dict[str, Any]:
+        started = time.perf_counter()
+        resp = client.chat.completions.create(
+            model="gpt-4o-mini",
+            temperature=0,
+            response_format={"type": "json_object"},
+            messages=messages,
+        )
+        usage = getattr(resp, "usage", None)
+        return {
+            "content": resp.choices[0].message.content,
+            "usage": {
+                "prompt_tokens": getattr(usage, "prompt_tokens", None),
+                "completion_tokens": getattr(usage, "completion_tokens", None),
+                "latency_ms": round((time.perf_counter() - started) * 1000, 1),
             },
-        ],
-    )
-    data = json.loads(resp.choices[0].message.content)
-    data["items"] = data.get("items", [])[:top_k]
+        }
+
+    prompt = json.dumps(messages, ensure_ascii=False)
+
+    computed = False
+
+    def rank() -> Dict[str, Any]:
+        nonlocal computed
+        computed = True
+        response = recorder.upstream("openai", prompt, complete)
+        # Older recordings hold the bare completion text
+        if isinstance(response, str):
+            response = {"content": response, "usage": None}
+        data = json.loads(response["content"])
+        data["items"] = data.get("items", [])[:top_k]
+        # Cost of the call that produced this ranking
+        data["usage"] = response["usage"] and {**response["usage"], "cached": False}
+        return data
+
+    # Same candidates + intent → same prompt → reuse the ranking
+    key = hashlib.sha256(f"{top_k}|{prompt}".encode("utf-8")).hexdigest()
+    data = copy.deepcopy(cached(_rank_cache, key, rank))
+    if not computed:
+        # Served from the cache: this run spent nothing
+        data["usage"] = {"prompt_tokens": 0, "completion_tokens": 0, "latency_ms": 0.0, "cached": True}
     return data
@@ -0,0 +1,164 @@
+# app/agent/recorder.py
+"""
+Record-and-replay of agent runs.
+
+While a run is being recorded, every graph node's input/output state and every
+upstream response (SearchAPI JSON, product page HTML, OpenAI completions) is
+captured and written to a gzip'd JSON file. Only the most recent RECORD_MAX_RUNS
+files are kept. A recording can be re-executed offline with `python -m Agent.replay`.
+"""
+from __future__ import annotations
+
+import copy
+import gzip
+import json
+import random
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from Core.cache import bypass as bypass_caches
+from Core.config import RECORD_DIR, RECORD_MAX_RUNS, RECORD_SAMPLE_RATE
+
+_current: ContextVar[Optional["Recording"]] = ContextVar("agent_recording", default=None)
+
+
+class ReplayMiss(RuntimeError):
+    """An upstream call during replay has no recorded response."""
+
+
+class Recording:
+    """Captured data of one agent run."""
+
+    def __init__(self, query: str, trusted_only: bool, replaying: bool = False) -> None:
+        self.id = uuid.uuid4().hex
+        self.created_at = time.time()
+        self.query = query
+        self.trusted_only = trusted_only
+        self.replaying = replaying
+        self.nodes: List[Dict[str, Any]] = []
+        self.upstream: List[Dict[str, Any]] = []
+        self.final: Optional[Dict[str, Any]] = None
+        self._replay_index: Dict[str, List[Any]] = defaultdict(list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "created_at": self.created_at,
+            "query": self.query,
+            "trusted_only": self.trusted_only,
+            "nodes": self.nodes,
+            "upstream": self.upstream,
+            "final": self.final,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], replaying: bool = True) -> "Recording":
+        rec = cls(data["query"], data.get("trusted_only", True), replaying=replaying)
+        rec.id = data.get("id", rec.id)
+        rec.created_at = data.get("created_at", rec.created_at)
+        rec.nodes = data.get("nodes", [])
+        rec.upstream = data.get("upstream", [])
+        rec.final = data.get("final")
+        for call in rec.upstream:
+            rec._replay_index[_index_key(call["kind"], call["key"])].append(call["response"])
+        return rec
+
+    def replay_response(self, kind: str, key: str) -> Any:
+        """Return the next recorded response for (kind, key), in call order."""
+        responses = self._replay_index.get(_index_key(kind, key))
+        if not responses:
+            raise ReplayMiss(f"no recorded {kind} response for {key[:120]}")
+        # Repeated identical calls consume responses in order; the last one is reused
+        return responses.pop(0) if len(responses) > 1 else responses[0]
+
+
+def _index_key(kind: str, key: str) -> str:
+    return f"{kind}\x00{key}"
+
+
+def _snapshot(state: Any) -> Any:
+    return copy.deepcopy(state)
+
+
+def current() -> Optional[Recording]:
+    return _current.get()
+
+
+def upstream(kind: str, key: str, fetch: Callable[[], Any]) -> Any:
+    """
+    Perform (or replay) an upstream call.
+    `fetch` must return a JSON-serializable value; it is never called during replay.
+    """
+    rec = _current.get()
+    if rec is None:
+        return fetch()
+    if rec.replaying:
+        return rec.replay_response(kind, key)
+    response = fetch()
+    rec.upstream.append({"kind": kind, "key": key, "response": response})
+    return response
+
+
+def recorded_node(name: str, fn: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    """Wrap a graph node so its input and output state are captured when recording."""
+
+    def wrapper(state: Any) -> Any:
+        rec = _current.get()
+        if rec is None or rec.replaying:
+            return fn(state)
+        before = _snapshot(state)
+        started = time.perf_counter()
+        out = fn(state)
+        rec.nodes.append({
+            "node": name,
+            "input": before,
+            "output": _snapshot(out),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+        return out
+
+    wrapper.__name__ = getattr(fn, "__name__", name)
+    wrapper.__doc__ = fn.__doc__
+    return wrapper
+
+
+def should_record() -> bool:
+    return RECORD_SAMPLE_RATE > 0 and random.random() < RECORD_SAMPLE_RATE
+
+
+@contextmanager
+def session(rec: Recording) -> Iterator[Recording]:
+    """
+    Make `rec` the active recording (or replay) for the current context.
+    Caches are bypassed so every upstream call is really made and captured.
+    """
+    token = _current.set(rec)
+    try:
+        with bypass_caches():
+            yield rec
+    finally:
+        _current.reset(token)
+
+
+def save(rec: Recording, directory: str = RECORD_DIR, max_runs: int = RECORD_MAX_RUNS) -> Path:
+    """Write a recording and drop the oldest files beyond max_runs (ring buffer)."""
+    out_dir = Path(directory)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"{int(rec.created_at * 1000)}-{rec.id}.json.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(rec.to_dict(), f, ensure_ascii=False, separators=(",", ":"), default=str)
+
+    files = sorted(out_dir.glob("*.json.gz"))
+    for old in files[: max(0, len(files) - max_runs)]:
+        old.unlink(missing_ok=True)
+    return path
+
+
+def load(path: str) -> Recording:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return Recording.from_dict(json.load(f))
@@ -0,0 +1,66 @@
+# app/agent/refine.py
+"""
+Offer pools for cheap refinements.
+
+After a /rank run, the enriched offers and the parsed intent are kept under a
+`pool_id` (POOL_TTL_SEC, on the CACHE_BACKEND so any worker can serve the
+refinement). `refine_pool` re-runs only the finisher's filtering and ranking
+with changed constraints (no page fetches), using the local policy ranking
+unless asked for the LLM.
+"""
+from __future__ import annotations
+
+import copy
+import uuid
+from typing import Any, Dict, Optional
+
+from Agent.graph import finish_with
+from Agent.ranking import llm_rank_offers, local_rank_offers
+from Core.cache import CacheBackend, make_cache
+from Core.config import POOL_MAX_ENTRIES, POOL_TTL_SEC
+
+# Constraints a refinement may change (intent keys, plus trusted_only on the state)
+REFINABLE = ("trusted_only", "budget_min", "budget_max", "must_have", "condition")
+
+# pool_id -> {"query", "trusted_only", "intent", "offers"}
+_pools: CacheBackend[Dict[str, Any]] = make_cache("pool", POOL_MAX_ENTRIES, POOL_TTL_SEC)
+
+
+def save_pool(final: Dict[str, Any]) -> Optional[str]:
+    """Keep the offers of a finished run; None if there is nothing to refine."""
+    if final.get("needs_more_info") or not final.get("offers"):
+        return None
+    pool_id = uuid.uuid4().hex
+    _pools.set(pool_id, {
+        "query": final.get("query", ""),
+        "trusted_only": bool(final.get("trusted_only")),
+        "intent": final.get("intent") or {},
+        "offers": final["offers"],
+    })
+    return pool_id
+
+
+def refine_pool(pool_id: str, changes: Dict[str, Any], use_llm: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Final state for the pool with `changes` (subset of REFINABLE) applied,
+    or None if the pool is unknown or expired.
+    """
+    pool = _pools.get(pool_id)
+    if pool is None:
+        return None
+    # finisher sorts and annotates in place; never touch the stored pool
+    pool = copy.deepcopy(pool)
+    intent = pool["intent"]
+    for key, value in changes.items():
+        if key in REFINABLE and key != "trusted_only":
+            intent[key] = value
+    state = {
+        "query": pool["query"],
+        "offers": pool["offers"],
+        "intent": intent,
+        "trusted_only": bool(changes.get("trusted_only", pool["trusted_only"])),
+        "steps": 0,
+        "errors": [],
+    }
+    # Offers enriched by the original run keep their page data; no new fetches
+    return finish_with(state, llm_rank_offers if use_llm else local_rank_offers, enrich=False)
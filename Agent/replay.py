@@ -0,0 +1,88 @@
+# app/agent/replay.py
+"""
+Replay a recorded agent run with no network access.
+
+    python -m Agent.replay recordings/<file>.json.gz               # whole graph
+    python -m Agent.replay recordings/<file>.json.gz --node finish # one node on its recorded inputs
+    python -m Agent.replay recordings/<file>.json.gz --profile     # print cProfile stats
+
+Upstream calls are answered from the recording; a call that was not recorded
+fails with ReplayMiss instead of going to the network. Core.config still builds
+its OpenAI client at import, so OPENAI_API_KEY must be set (any value works).
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import cProfile
+import json
+import pstats
+import time
+from typing import Any, Dict, List
+
+from Agent import recorder
+from Agent.graph import build_app, planner, actor, observer, finisher
+from Agent.runner import stream_final
+
+NODES = {"plan": planner, "act": actor, "observe": observer, "finish": finisher}
+
+
+def _items(state: Dict[str, Any] | None) -> List[str]:
+    """Links of the returned items, used to compare rankings."""
+    result = (state or {}).get("result") or {}
+    return [it.get("link", "") for it in result.get("items", [])]
+
+
+def replay_run(rec: recorder.Recording) -> Dict[str, Any]:
+    """Re-execute the whole graph against a recording."""
+    app = build_app()
+    started = time.perf_counter()
+    with recorder.session(rec):
+        final = stream_final(app, rec.query, rec.trusted_only)
+    return {
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        "same_items": _items(final) == _items(rec.final),
+        "recorded_items": _items(rec.final),
+        "replayed_items": _items(final),
+    }
+
+
+def replay_node(rec: recorder.Recording, node: str) -> List[Dict[str, Any]]:
+    """Re-execute one node on each of its recorded inputs."""
+    fn = NODES[node]
+    out = []
+    for call in (c for c in rec.nodes if c["node"] == node):
+        started = time.perf_counter()
+        with recorder.session(rec):
+            result = fn(copy.deepcopy(call["input"]))
+        out.append({
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            "recorded_ms": call.get("duration_ms"),
+            "same_output": json.dumps(result, sort_keys=True, default=str)
+            == json.dumps(call["output"], sort_keys=True, default=str),
+        })
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a recorded agent run offline.")
+    parser.add_argument("path", help="recording file (.json.gz)")
+    parser.add_argument("--node", choices=sorted(NODES), help="replay a single node instead of the graph")
+    parser.add_argument("--profile", action="store_true", help="print cProfile stats for the replay")
+    args = parser.parse_args()
+
+    rec = recorder.load(args.path)
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    report: Any = replay_node(rec, args.node) if args.node else replay_run(rec)
+    if profiler:
+        profiler.disable()
+
+    print(json.dumps({"query": rec.query, "report": report}, ensure_ascii=False, indent=2))
+    if profiler:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+
+if __name__ == "__main__":
+    main()
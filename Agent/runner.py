@@ -0,0 +1,63 @@
+# app/agent/runner.py
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+from Agent import recorder
+from Agent.graph import AgentState
+from Core.logs import get_logger
+
+logger = get_logger("runner")
+
+
+# Keys of the final agent state that make up an API response.
+RESULT_KEYS = ("query", "steps", "errors", "result", "needs_more_info", "follow_up_question")
+
+
+def initial_state(query: str, trusted_only: bool = True) -> AgentState:
+    """Build the initial agent state for a query."""
+    return {
+        "query": query,
+        "offers": [],
+        "missing": [],
+        "tried_tools": [],
+        "steps": 0,
+        "done": False,
+        "errors": [],
+        "trusted_only": bool(trusted_only),
+    }
+
+
+def run_agent(app: Any, query: str, trusted_only: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Run the agent app for a query and return the final state.
+    Returns None if the agent never reached the finish node.
+    A sampled share of runs is recorded (see Agent.recorder).
+    """
+    if not recorder.should_record():
+        return stream_final(app, query, trusted_only)
+
+    rec = recorder.Recording(query, trusted_only)
+    with recorder.session(rec):
+        final = stream_final(app, query, trusted_only)
+    rec.final = final
+    try:
+        recorder.save(rec)
+    except Exception as e:
+        logger.warning({"event": "record_save_failed", "error": str(e)})
+    return final
+
+
+def stream_final(app: Any, query: str, trusted_only: bool) -> Optional[Dict[str, Any]]:
+    final: Optional[Dict[str, Any]] = None
+    for event in app.stream(initial_state(query, trusted_only)):
+        for node, node_payload in event.items():
+            if node == "finish":
+                # node_payload is what finisher() returned
+                final = node_payload
+    return final
+
+
+def result_view(final: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the parts of the final state needed to build a response."""
+    return {k: final.get(k) for k in RESULT_KEYS if k in final}
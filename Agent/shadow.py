@@ -0,0 +1,89 @@
+# app/agent/shadow.py
+"""
+Shadow evaluation of the LLM re-ranker.
+
+For a sampled share of runs (SHADOW_SAMPLE_RATE) the finisher also computes the
+deterministic policy ranking and logs how much the two agree, together with what
+the LLM call cost. Rankings served from the rank cache are skipped, since no
+call was made for them. `scripts/shadow_report.py` computes the same metrics offline
+from recorded runs, grouped by intent category.
+"""
+from __future__ import annotations
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from Core.config import SHADOW_SAMPLE_RATE
+from Core.logs import get_logger
+
+logger = get_logger("shadow")
+
+_forced: ContextVar[bool] = ContextVar("shadow_forced", default=False)
+
+
+def should_shadow() -> bool:
+    if _forced.get():
+        return True
+    return SHADOW_SAMPLE_RATE > 0 and random.random() < SHADOW_SAMPLE_RATE
+
+
+@contextmanager
+def forced() -> Iterator[None]:
+    """Shadow-evaluate every ranking inside this block (used by the offline report)."""
+    token = _forced.set(True)
+    try:
+        yield
+    finally:
+        _forced.reset(token)
+
+
+def kendall_tau(a: List[str], b: List[str]) -> Optional[float]:
+    """Kendall rank correlation over the items present in both lists (None if fewer than 2)."""
+    pos_b = {x: i for i, x in enumerate(b)}
+    common = [x for x in a if x in pos_b]
+    n = len(common)
+    if n < 2:
+        return None
+    score = 0
+    for i in range(n):
+        for j in range(i + 1, n):
+            # common is in a's order, so the pair is concordant iff b agrees
+            score += 1 if pos_b[common[i]] < pos_b[common[j]] else -1
+    return score / (n * (n - 1) / 2)
+
+
+def agreement(llm_links: List[str], local_links: List[str], k: int) -> Dict[str, Any]:
+    """Top-1 match, overlap@k and Kendall tau between two ranked lists of links."""
+    k_eff = min(k, len(local_links)) or 1
+    return {
+        "top1_match": bool(llm_links and local_links and llm_links[0] == local_links[0]),
+        "overlap_at_k": len(set(llm_links[:k]) & set(local_links[:k])) / k_eff,
+        "kendall_tau": kendall_tau(llm_links[:k], local_links[:k]),
+    }
+
+
+def compare_rankings(
+    ranked: Dict[str, Any],
+    local: Dict[str, Any],
+    category: str = "",
+    query: str = "",
+    k: int = 4,
+) -> Dict[str, Any]:
+    """Compare an llm_rank_offers result with a local_rank_offers result and log the metrics."""
+    llm_links = [it.get("link") for it in ranked.get("items", []) if it.get("link")]
+    local_links = [it.get("link") for it in local.get("items", []) if it.get("link")]
+    usage = ranked.get("usage") or {}
+
+    metrics = {
+        "category": category or "generic",
+        "k": k,
+        **agreement(llm_links, local_links, k),
+        "llm_items": len(llm_links),
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "completion_tokens": usage.get("completion_tokens"),
+        "llm_latency_ms": usage.get("latency_ms"),
+    }
+    logger.info({"event": "shadow_rank", "query": query, **metrics})
+    return metrics
@@ -1,14 +1,32 @@
 # app/agent/tools.py
 from __future__ import annotations
 
-import re
+import json
+import time
 from typing import List, Dict, Any, Optional
 
 import requests
 
-from Core.config import SEARCHAPI_KEY
+from Agent import recorder
+from Agent.canonical import canonical_query
+from Agent.extract import parse_until_complete, parse_product_html, product_info
+from Core.cache import CacheBackend, cache_mode, cached, make_cache
+from Core.config import (
+    SEARCHAPI_KEY,
+    CACHE_MAX_ENTRIES,
+    SEARCH_CACHE_TTL_SEC,
+    PAGE_CACHE_SIZE,
+    PAGE_CACHE_TTL_SEC,
+    PAGE_CACHE_FRESH_SEC,
+    PAGE_MAX_CHARS,
+)
 from Core.constants import TRUSTED_KSA  # imported for completeness (if needed)
 
+# search params (without API key) -> normalized offers
+_search_cache: CacheBackend[List[Dict[str, Any]]] = make_cache("search", CACHE_MAX_ENTRIES, SEARCH_CACHE_TTL_SEC)
+# url -> {"info", "etag", "last_modified", "checked_at"}
+_page_cache: CacheBackend[Dict[str, Any]] = make_cache("page", PAGE_CACHE_SIZE, PAGE_CACHE_TTL_SEC)
+
 
 def normalize_retailer(name: Optional[str]) -> str:
     """Normalize retailer names and map variants to canonical trusted names."""
@@ -51,9 +69,6 @@ def shopping_search(
     limit: int = 40,
 ) -> List[Dict[str, Any]]:
     """Search via SearchAPI.io Google Shopping and return normalized offers."""
-    if not SEARCHAPI_KEY:
-        raise RuntimeError("SEARCHAPI_KEY missing (set env var or .env).")
-
     url = "https://www.searchapi.io/api/v1/search"
     params = {
         "engine": "google_shopping",
@@ -64,10 +79,51 @@ def shopping_search(
         "location": location,
         "api_key": SEARCHAPI_KEY,
     }
-    r = requests.get(url, params=params, timeout=30)
-    r.raise_for_status()
-    data = r.json()
 
+    def fetch() -> Dict[str, Any]:
+        if not SEARCHAPI_KEY:
+            raise RuntimeError("SEARCHAPI_KEY missing (set env var or .env).")
+        r = requests.get(url, params=params, timeout=30)
+        r.raise_for_status()
+        return r.json()
+
+    # Recorded/replayed and cached without the API key in the key
+    request_key = json.dumps({k: v for k, v in params.items() if k != "api_key"}, sort_keys=True, ensure_ascii=False)
+
+    def search() -> List[Dict[str, Any]]:
+        data = recorder.upstream("searchapi", request_key, fetch)
+        return _parse_shopping_results(data, limit)
+
+    offers = cached(_search_cache, _search_cache_key(params, limit), search)
+    # Callers enrich offers in place; never hand out the cached dicts
+    return [dict(o) for o in offers]
+
+
+def _search_cache_key(params: Dict[str, Any], limit: int) -> str:
+    # Spelling variants of the same query ("ايفون ١٥" / "iPhone15") share one cache entry
+    cache_key = json.dumps(
+        {**{k: v for k, v in params.items() if k != "api_key"}, "q": canonical_query(params["q"])},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return f"{cache_key}|{limit}"
+
+
+def search_expires_in(
+    query: str,
+    gl: str = "sa",
+    hl: str = "ar",
+    google_domain: str = "google.com.sa",
+    location: str = "Riyadh, Saudi Arabia",
+    limit: int = 40,
+) -> Optional[float]:
+    """Seconds until the cached shopping_search result for these arguments expires (None if not cached)."""
+    params = {"engine": "google_shopping", "q": query, "gl": gl, "hl": hl,
+              "google_domain": google_domain, "location": location}
+    return _search_cache.expires_in(_search_cache_key(params, limit))
+
+
+def _parse_shopping_results(data: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
     out: List[Dict[str, Any]] = []
     for it in (data.get("shopping_results") or [])[:limit]:
         name = it.get("title")
@@ -95,22 +151,58 @@ def shopping_search(
 
 
 def product_page_fetch(url: str) -> Dict[str, Any]:
-    """Fetch page HTML and try to extract clarified specs (placeholder heuristics)."""
+    """
+    Fetch a product page and extract structured specs (JSON-LD / OpenGraph).
+    Results are cached per URL and revalidated with ETag / Last-Modified,
+    so an unchanged page costs a 304 instead of a download and parse.
+    """
+    mode = cache_mode()
+    entry = _page_cache.get(url) if mode != "bypass" else None
+    if entry and mode == "normal" and time.time() - entry["checked_at"] < PAGE_CACHE_FRESH_SEC:
+        return entry["info"]
+
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    parsed: Dict[str, Any] = {}
+
+    def fetch() -> Dict[str, Any]:
+        with requests.get(url, headers=headers, timeout=20, stream=True) as r:
+            if r.status_code == 304:
+                return {"status": 304}
+            r.raise_for_status()
+            if "charset=" not in r.headers.get("Content-Type", "").lower():
+                # requests assumes ISO-8859-1 for text/html without a charset; shop pages are UTF-8
+                r.encoding = "utf-8"
+            parser, html = parse_until_complete(r.iter_content(chunk_size=16384, decode_unicode=True), PAGE_MAX_CHARS)
+            parsed["info"] = product_info(parser)
+            return {
+                "status": r.status_code,
+                "etag": r.headers.get("ETag"),
+                "last_modified": r.headers.get("Last-Modified"),
+                "html": html,
+            }
+
     try:
-        r = requests.get(url, timeout=20)
-        r.raise_for_status()
-        html = r.text
+        resp = recorder.upstream("page", url, fetch)
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
-    model = None
-    if re.search(r"15\s*Pro\s*Max", html, re.I):
-        model = "iPhone 15 Pro Max"
-    elif re.search(r"15\s*Pro\b", html, re.I):
-        model = "iPhone 15 Pro"
-
-    storage = None
-    if re.search(r"(256)\s*GB|٢٥٦", html, re.I):
-        storage = "256GB"
-
-    return {"ok": True, "model": model, "storage": storage}
+    if resp["status"] == 304 and entry:
+        info = entry["info"]
+    else:
+        # During replay nothing was parsed live; parse the recorded HTML instead
+        info = {"ok": True, **(parsed.get("info") or parse_product_html(resp.get("html", "")))}
+
+    if mode == "bypass":
+        return info
+    _page_cache.set(url, {
+        "info": info,
+        "etag": resp.get("etag") or (entry or {}).get("etag"),
+        "last_modified": resp.get("last_modified") or (entry or {}).get("last_modified"),
+        "checked_at": time.time(),
+    })
+    return info
@@ -0,0 +1,349 @@
+# app/agent/watch.py
+"""
+Price-watch subscriptions and their refresh scheduler.
+
+Subscribers watch a query (plus constraints and a target price). The scheduler
+groups watches by normalized query, refreshes each distinct query once per
+interval through shopping_search and the normalizers (no LLM), diffs the new
+offers against the previous snapshot and stores events only when something
+changed. Upstream calls therefore scale with distinct watched queries, not
+with subscribers.
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from typing import Any, Dict, List, Optional
+
+from Agent.canonical import canonical_query
+from Agent.normalizers import normalize_condition, spec_normalizer, price_normalizer
+from Agent.tools import shopping_search
+from Core.cache import refreshing
+from Core.config import WATCH_DB_PATH, WATCH_REFRESH_INTERVAL_SEC
+from Core.constants import TRUSTED_KSA
+from Core.logs import get_logger
+
+logger = get_logger("watch")
+
+# Event types
+NEW_OFFER = "new_offer"
+PRICE_DROP = "price_drop"
+PRICE_INCREASE = "price_increase"
+REMOVED = "removed"
+TARGET_REACHED = "target_reached"
+
+
+def watch_key(query: str) -> str:
+    """Grouping key for watched queries (spelling variants share one refresh)."""
+    return canonical_query(query)
+
+
+def fetch_snapshot(query: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Search once and normalize offers; returns {link: offer}.
+    The search always goes upstream (a cached result could be up to its TTL old)
+    and the fresh result replaces the cached one.
+    """
+    snapshot: Dict[str, Dict[str, Any]] = {}
+    with refreshing():
+        offers = shopping_search(query)
+    for o in offers:
+        o.update(spec_normalizer(o.get("name", ""), o.get("retailer", ""), o.get("condition", "")))
+        o.update(price_normalizer(o.get("price", 0.0), o.get("currency")))
+        snapshot[o["link"]] = {
+            "name": o.get("name"),
+            "price_sar": o.get("price_sar"),
+            "retailer": o.get("retailer"),
+            "condition": o.get("condition"),
+            "link": o["link"],
+        }
+    return snapshot
+
+
+def diff_snapshots(old: Dict[str, Dict[str, Any]], new: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Offer-level changes between two snapshots."""
+    changes: List[Dict[str, Any]] = []
+    for link, offer in new.items():
+        prev = old.get(link)
+        if prev is None:
+            changes.append({"type": NEW_OFFER, "offer": offer, "old_price": None})
+        elif offer["price_sar"] < prev["price_sar"]:
+            changes.append({"type": PRICE_DROP, "offer": offer, "old_price": prev["price_sar"]})
+        elif offer["price_sar"] > prev["price_sar"]:
+            changes.append({"type": PRICE_INCREASE, "offer": offer, "old_price": prev["price_sar"]})
+    for link, prev in old.items():
+        if link not in new:
+            changes.append({"type": REMOVED, "offer": prev, "old_price": prev["price_sar"]})
+    return changes
+
+
+def matches(watch: Dict[str, Any], offer: Dict[str, Any]) -> bool:
+    """Whether an offer satisfies a watch's constraints."""
+    if watch["trusted_only"] and offer.get("retailer") not in TRUSTED_KSA:
+        return False
+    cond = normalize_condition(watch["condition"]).lower() if watch.get("condition") else ""
+    if cond and not (offer.get("condition") or "").lower().startswith(cond):
+        return False
+    name = (offer.get("name") or "").lower()
+    return all(tok.lower() in name for tok in watch.get("must_have") or [])
+
+
+def events_for_watch(watch: Dict[str, Any], changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Translate query-level changes into the events one subscriber cares about."""
+    target = watch["target_price"]
+    out: List[Dict[str, Any]] = []
+    for ch in changes:
+        offer = ch["offer"]
+        if not matches(watch, offer):
+            continue
+        out.append(ch)
+        if ch["type"] == REMOVED:
+            continue
+        was_above = ch["old_price"] is None or ch["old_price"] > target
+        if offer["price_sar"] <= target and was_above:
+            out.append({"type": TARGET_REACHED, "offer": offer, "old_price": ch["old_price"]})
+    return out
+
+
+# PRAGMA user_version of the watch database; 1 = query keys are canonical_query
+SCHEMA_VERSION = 1
+
+
+class WatchStore:
+    """SQLite storage for watches, per-query snapshots and events."""
+
+    def __init__(self, path: str = WATCH_DB_PATH) -> None:
+        self.path = path
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS watches (
+                    id TEXT PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    query_key TEXT NOT NULL,
+                    trusted_only INTEGER NOT NULL,
+                    target_price REAL NOT NULL,
+                    must_have TEXT NOT NULL,
+                    condition TEXT,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS watches_key ON watches (query_key);
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    query_key TEXT PRIMARY KEY,
+                    offers TEXT,
+                    refreshed_at REAL,
+                    next_refresh_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    watch_id TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    offer TEXT NOT NULL,
+                    old_price REAL,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS events_watch ON events (watch_id, id);
+                """
+            )
+            self._migrate(conn)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        """
+        Re-key watches stored before keys were canonical (lowercase + collapsed
+        spaces) and merge their snapshots, keeping the most recently refreshed one.
+        Runs once per database; the version check is repeated under the write lock
+        so concurrent processes do not migrate twice.
+        """
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                renamed: Dict[str, str] = {}
+                for row in conn.execute("SELECT id, query, query_key FROM watches").fetchall():
+                    key = watch_key(row["query"])
+                    if key != row["query_key"]:
+                        conn.execute("UPDATE watches SET query_key = ? WHERE id = ?", (key, row["id"]))
+                        renamed[row["query_key"]] = key
+                for old, new in renamed.items():
+                    if conn.execute("SELECT 1 FROM watches WHERE query_key = ?", (old,)).fetchone():
+                        continue  # another watch still maps to the old key
+                    old_snap = conn.execute("SELECT * FROM snapshots WHERE query_key = ?", (old,)).fetchone()
+                    if old_snap is None:
+                        continue
+                    new_snap = conn.execute("SELECT * FROM snapshots WHERE query_key = ?", (new,)).fetchone()
+                    if new_snap is None:
+                        conn.execute("UPDATE snapshots SET query_key = ? WHERE query_key = ?", (new, old))
+                        continue
+                    keep = max((old_snap, new_snap), key=lambda s: s["refreshed_at"] or 0.0)
+                    conn.execute(
+                        "UPDATE snapshots SET offers = ?, refreshed_at = ?, next_refresh_at = ? WHERE query_key = ?",
+                        (keep["offers"], keep["refreshed_at"],
+                         min(old_snap["next_refresh_at"], new_snap["next_refresh_at"]), new),
+                    )
+                    conn.execute("DELETE FROM snapshots WHERE query_key = ?", (old,))
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def add(
+        self,
+        query: str,
+        target_price: float,
+        trusted_only: bool = True,
+        must_have: Optional[List[str]] = None,
+        condition: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        watch_id = uuid.uuid4().hex
+        key = watch_key(query)
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO watches VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (watch_id, query, key, int(trusted_only), float(target_price),
+                 json.dumps(must_have or [], ensure_ascii=False), condition, time.time()),
+            )
+            # A new query is due immediately; an already watched one keeps its schedule
+            conn.execute(
+                "INSERT OR IGNORE INTO snapshots (query_key, next_refresh_at) VALUES (?, ?)",
+                (key, 0.0),
+            )
+        return self.get(watch_id)  # type: ignore[return-value]
+
+    def get(self, watch_id: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM watches WHERE id = ?", (watch_id,)).fetchone()
+        return _watch_row(row) if row else None
+
+    def delete(self, watch_id: str) -> bool:
+        with closing(self._connect()) as conn:
+            cur = conn.execute("DELETE FROM watches WHERE id = ?", (watch_id,))
+            conn.execute("DELETE FROM events WHERE watch_id = ?", (watch_id,))
+        return cur.rowcount > 0
+
+    def events(self, watch_id: str, since_id: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT * FROM events WHERE watch_id = ? AND id > ? ORDER BY id LIMIT ?",
+                (watch_id, since_id, limit),
+            ).fetchall()
+        return [dict(r, offer=json.loads(r["offer"])) for r in rows]
+
+    def claim_due(self, interval: float) -> List[Dict[str, Any]]:
+        """
+        Atomically take the watched queries that are due and push their next
+        refresh time forward, so concurrent schedulers never refresh the same query.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                """
+                SELECT s.query_key, MIN(w.query) AS query, s.offers
+                FROM snapshots s JOIN watches w ON w.query_key = s.query_key
+                WHERE s.next_refresh_at <= ?
+                GROUP BY s.query_key
+                """,
+                (now,),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE snapshots SET next_refresh_at = ? WHERE query_key = ?",
+                [(now + interval, r["query_key"]) for r in rows],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return [
+            {"query_key": r["query_key"], "query": r["query"], "offers": json.loads(r["offers"]) if r["offers"] else None}
+            for r in rows
+        ]
+
+    def apply_snapshot(self, query_key: str, previous: Optional[Dict[str, Any]], snapshot: Dict[str, Any]) -> int:
+        """Store a new snapshot and the resulting per-watch events. Returns the number of events."""
+        changes = diff_snapshots(previous or {}, snapshot)
+        now = time.time()
+        with closing(self._connect()) as conn:
+            watches = [
+                _watch_row(r)
+                for r in conn.execute("SELECT * FROM watches WHERE query_key = ?", (query_key,)).fetchall()
+            ]
+            rows = []
+            for w in watches:
+                for ev in events_for_watch(w, changes):
+                    # The first snapshot is a baseline: only report targets already met
+                    if previous is None and ev["type"] != TARGET_REACHED:
+                        continue
+                    rows.append((w["id"], ev["type"], json.dumps(ev["offer"], ensure_ascii=False), ev["old_price"], now))
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO events (watch_id, type, offer, old_price, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute(
+                "UPDATE snapshots SET offers = ?, refreshed_at = ? WHERE query_key = ?",
+                (json.dumps(snapshot, ensure_ascii=False), now, query_key),
+            )
+            conn.execute("COMMIT")
+        return len(rows)
+
+
+def _watch_row(row: sqlite3.Row) -> Dict[str, Any]:
+    w = dict(row)
+    w["trusted_only"] = bool(w["trusted_only"])
+    w["must_have"] = json.loads(w["must_have"])
+    return w
+
+
+def refresh_due(store: WatchStore, interval: float = WATCH_REFRESH_INTERVAL_SEC) -> int:
+    """Refresh every due watched query once. Returns the number of queries refreshed."""
+    due = store.claim_due(interval)
+    for item in due:
+        try:
+            snapshot = fetch_snapshot(item["query"])
+            n_events = store.apply_snapshot(item["query_key"], item["offers"], snapshot)
+            logger.info({"event": "watch_refreshed", "query_key": item["query_key"],
+                         "offers": len(snapshot), "events": n_events})
+        except Exception as e:
+            logger.warning({"event": "watch_refresh_failed", "query_key": item["query_key"], "error": str(e)})
+    return len(due)
+
+
+class WatchScheduler:
+    """Background thread that periodically refreshes due watched queries."""
+
+    def __init__(self, store: WatchStore, interval: float = WATCH_REFRESH_INTERVAL_SEC, tick: float = 30.0) -> None:
+        self.store = store
+        self.interval = interval
+        self.tick = min(tick, interval)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="watch-scheduler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                refresh_due(self.store, self.interval)
+            except Exception as e:
+                logger.warning({"event": "watch_scheduler_error", "error": str(e)})
+            self._stop.wait(self.tick)
@@ -0,0 +1,324 @@
+# app/core/cache.py
+"""
+Result caches.
+
+`make_cache(namespace, maxsize, ttl)` returns the backend selected by CACHE_BACKEND:
+- "memory": `TTLCache`, per process;
+- "sqlite": `SQLiteCache`, one file shared by the workers of a node;
+- "redis": `RedisCache`, shared across nodes (needs the `redis` package).
+Shared backends store values as compact binary (MessagePack, zlib above 1 KB) and
+treat backend errors and undecodable values as misses, so a cache outage or a
+corrupt entry never fails a request.
+
+`cached(cache, key, compute)` is the read-through helper used by the agent's
+search / intent / ranking caches. Two context switches change its behavior for
+the current context only:
+- `refreshing()`: skip reads, recompute and overwrite (used by the pre-warmer);
+- `bypass()`: skip reads and writes (used while recording or replaying runs, so
+  every upstream call really happens and is captured).
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Generic, Iterator, Optional, Protocol, Tuple, TypeVar
+
+import msgpack
+
+from Core.config import CACHE_BACKEND, CACHE_SQLITE_PATH, CACHE_REDIS_URL
+from Core.logs import get_logger
+
+V = TypeVar("V")
+
+logger = get_logger("cache")
+
+# "normal" | "refresh" | "bypass"
+_mode: ContextVar[str] = ContextVar("cache_mode", default="normal")
+
+
+class TTLCache(Generic[V]):
+    """Thread-safe LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[V]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def expires_in(self, key: str) -> Optional[float]:
+        """Seconds until key expires (None if missing or expired)."""
+        with self._lock:
+            item = self._data.get(key)
+        if item is None:
+            return None
+        left = item[0] - time.time()
+        return left if left > 0 else None
+
+    def set(self, key: str, value: V, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._data[key] = (time.time() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CacheBackend(Protocol[V]):
+    """What `cached` needs from a cache."""
+
+    def get(self, key: str) -> Optional[V]: ...
+
+    def expires_in(self, key: str) -> Optional[float]: ...
+
+    def set(self, key: str, value: V, ttl: Optional[float] = None) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+
+# -----------------------------
+# Binary serialization
+# -----------------------------
+# Header: format byte + codec version, so values written in another format
+# (e.g. by an older release) are read as misses instead of garbage.
+# MessagePack does not depend on the Python version and never executes code.
+_RAW = b"M"
+_ZLIB = b"Z"
+_VERSION = 1
+_COMPRESS_ABOVE = 1024
+
+
+def encode_value(value: Any) -> bytes:
+    """Serialize JSON-like values (dict, list, str, int, float, bool, None; tuples come back as lists)."""
+    data = msgpack.packb(value, use_bin_type=True)
+    if len(data) > _COMPRESS_ABOVE:
+        return _ZLIB + bytes([_VERSION]) + zlib.compress(data, 6)
+    return _RAW + bytes([_VERSION]) + data
+
+
+def decode_value(blob: bytes) -> Optional[Any]:
+    """Inverse of encode_value; None for unknown formats and corrupt values."""
+    if len(blob) < 2 or blob[1] != _VERSION or blob[:1] not in (_RAW, _ZLIB):
+        return None
+    body = blob[2:]
+    try:
+        if blob[:1] == _ZLIB:
+            body = zlib.decompress(body)
+        return msgpack.unpackb(body, raw=False, strict_map_key=False)
+    except Exception as e:  # shared stores can hold anything; a bad entry is a miss
+        logger.warning({"event": "cache_decode_failed", "error": f"{type(e).__name__}: {e}"})
+        return None
+
+
+# -----------------------------
+# Shared backends
+# -----------------------------
+class SQLiteCache(Generic[V]):
+    """
+    Cache in a SQLite file shared by all processes on a node.
+    Above maxsize entries, those expiring soonest are evicted.
+    """
+
+    def __init__(self, namespace: str, maxsize: int, ttl: float, path: str = CACHE_SQLITE_PATH) -> None:
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        self._writes = 0
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    ns TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    value BLOB NOT NULL,
+                    PRIMARY KEY (ns, key)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_expiry ON cache (ns, expires_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def get(self, key: str) -> Optional[V]:
+        try:
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT value FROM cache WHERE ns = ? AND key = ? AND expires_at >= ?",
+                    (self.namespace, key, time.time()),
+                ).fetchone()
+            return decode_value(row[0]) if row else None
+        except (sqlite3.Error, ValueError, EOFError, zlib.error) as e:
+            logger.warning({"event": "cache_get_failed", "backend": "sqlite", "ns": self.namespace, "error": str(e)})
+            return None
+
+    def expires_in(self, key: str) -> Optional[float]:
+        now = time.time()
+        try:
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT expires_at FROM cache WHERE ns = ? AND key = ? AND expires_at >= ?",
+                    (self.namespace, key, now),
+                ).fetchone()
+            return row[0] - now if row else None
+        except sqlite3.Error as e:
+            logger.warning({"event": "cache_get_failed", "backend": "sqlite", "ns": self.namespace, "error": str(e)})
+            return None
+
+    def set(self, key: str, value: V, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        try:
+            blob = encode_value(value)
+            with closing(self._connect()) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (ns, key, expires_at, value) VALUES (?, ?, ?, ?)",
+                    (self.namespace, key, expires_at, blob),
+                )
+                # Trimming scans the namespace, so do it every 100 writes
+                self._writes += 1
+                if self._writes % 100 == 0:
+                    self._trim(conn)
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning({"event": "cache_set_failed", "backend": "sqlite", "ns": self.namespace, "error": str(e)})
+
+    def _trim(self, conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM cache WHERE ns = ? AND expires_at < ?", (self.namespace, time.time()))
+        conn.execute(
+            """
+            DELETE FROM cache WHERE ns = ? AND key IN (
+                SELECT key FROM cache WHERE ns = ? ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.namespace, self.namespace, self.maxsize),
+        )
+
+    def delete(self, key: str) -> None:
+        try:
+            with closing(self._connect()) as conn:
+                conn.execute("DELETE FROM cache WHERE ns = ? AND key = ?", (self.namespace, key))
+        except sqlite3.Error as e:
+            logger.warning({"event": "cache_delete_failed", "backend": "sqlite", "ns": self.namespace, "error": str(e)})
+
+
+class RedisCache(Generic[V]):
+    """
+    Cache in Redis (or anything speaking its protocol), shared across nodes.
+    Entry count is bounded by the server's maxmemory policy, not by maxsize.
+    """
+
+    def __init__(self, namespace: str, ttl: float, url: str = CACHE_REDIS_URL) -> None:
+        # Optional dependency: only needed with CACHE_BACKEND=redis
+        import redis
+
+        self.namespace = namespace
+        self.ttl = ttl
+        self._errors = (redis.RedisError, ValueError, EOFError, zlib.error)
+        self._client = redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1)
+
+    def _key(self, key: str) -> str:
+        return f"salla:{self.namespace}:{key}"
+
+    def get(self, key: str) -> Optional[V]:
+        try:
+            blob = self._client.get(self._key(key))
+            return decode_value(blob) if blob is not None else None
+        except self._errors as e:
+            logger.warning({"event": "cache_get_failed", "backend": "redis", "ns": self.namespace, "error": str(e)})
+            return None
+
+    def expires_in(self, key: str) -> Optional[float]:
+        try:
+            ttl_ms = self._client.pttl(self._key(key))
+        except self._errors as e:
+            logger.warning({"event": "cache_get_failed", "backend": "redis", "ns": self.namespace, "error": str(e)})
+            return None
+        # -2: missing, -1: no expiry (never written by set)
+        return ttl_ms / 1000 if ttl_ms >= 0 else None
+
+    def set(self, key: str, value: V, ttl: Optional[float] = None) -> None:
+        ttl_ms = max(1, int((self.ttl if ttl is None else ttl) * 1000))
+        try:
+            self._client.set(self._key(key), encode_value(value), px=ttl_ms)
+        except self._errors as e:
+            logger.warning({"event": "cache_set_failed", "backend": "redis", "ns": self.namespace, "error": str(e)})
+
+    def delete(self, key: str) -> None:
+        try:
+            self._client.delete(self._key(key))
+        except self._errors as e:
+            logger.warning({"event": "cache_delete_failed", "backend": "redis", "ns": self.namespace, "error": str(e)})
+
+
+def make_cache(namespace: str, maxsize: int, ttl: float, backend: str = CACHE_BACKEND) -> CacheBackend[Any]:
+    """Cache for one namespace ("search", "intent", ...) on the configured backend."""
+    if backend == "memory":
+        return TTLCache(maxsize, ttl)
+    if backend == "sqlite":
+        return SQLiteCache(namespace, maxsize, ttl)
+    if backend == "redis":
+        return RedisCache(namespace, ttl)
+    raise ValueError(f"Unknown CACHE_BACKEND: {backend!r}")
+
+
+@contextmanager
+def _use_mode(mode: str) -> Iterator[None]:
+    token = _mode.set(mode)
+    try:
+        yield
+    finally:
+        _mode.reset(token)
+
+
+def cache_mode() -> str:
+    """Current mode: "normal", "refresh" or "bypass"."""
+    return _mode.get()
+
+
+def refreshing() -> Any:
+    """Recompute and overwrite cached values inside this block."""
+    return _use_mode("refresh")
+
+
+def bypass() -> Any:
+    """Neither read nor write caches inside this block."""
+    return _use_mode("bypass")
+
+
+def cached(cache: CacheBackend[V], key: str, compute: Callable[[], V], ttl: Optional[float] = None) -> V:
+    """Read-through: return cache[key] or compute, store and return it."""
+    mode = _mode.get()
+    if mode == "normal":
+        hit = cache.get(key)
+        if hit is not None:
+            return hit
+    value = compute()
+    if mode != "bypass":
+        cache.set(key, value, ttl)
+    return value
@@ -13,6 +13,109 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip() if os.getenv("OPENAI_AP
 # SearchAPI.io key
 SEARCHAPI_KEY = os.getenv("SEARCHAPI_KEY", "").strip() if os.getenv("SEARCHAPI_KEY") else None
 
+# Graph executor: "langgraph" (compiled StateGraph) or "native" (Agent.executor.NativeApp)
+AGENT_EXECUTOR = os.getenv("AGENT_EXECUTOR", "langgraph").strip().lower()
+
+# Asynchronous job mode (/rank/jobs): SQLite queue file and local worker processes
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# A job whose worker died this many times is failed instead of re-queued; finished jobs are kept this long
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETENTION_SEC = int(os.getenv("JOB_RETENTION_SEC", str(24 * 3600)))
+
+# GET /rank: responses are cached by canonical query and served with Cache-Control max-age
+# for this long (keep it below POOL_TTL_SEC so cached pool_ids stay refinable)
+RANK_GET_MAX_AGE_SEC = int(os.getenv("RANK_GET_MAX_AGE_SEC", "300"))
+
+# Response encoding (/rank, /rank/refine, /rank/jobs/{id}): compress bodies of at least this many bytes
+# when the client accepts br/gzip, with these levels
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "5"))
+
+# Structured logging: level, share of requests that dump the full final state, truncation limits
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_STATE_SAMPLE_RATE = float(os.getenv("LOG_STATE_SAMPLE_RATE", "0.0"))
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "300"))
+LOG_MAX_LIST_ITEMS = int(os.getenv("LOG_MAX_LIST_ITEMS", "10"))
+
+# Run recorder: share of runs recorded, where recordings go, and how many recent runs are kept
+RECORD_SAMPLE_RATE = float(os.getenv("RECORD_SAMPLE_RATE", "0.0"))
+RECORD_DIR = os.getenv("RECORD_DIR", "recordings")
+RECORD_MAX_RUNS = int(os.getenv("RECORD_MAX_RUNS", "200"))
+
+# On-demand profiling (X-Profile: 1 + admin token): where profiles go and how many recent ones are kept
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MAX_RUNS = int(os.getenv("PROFILE_MAX_RUNS", "50"))
+
+# Shadow evaluation: share of ranked runs where the LLM ranking is compared with the local policy
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.0"))
+
+# Admission control for /rank (per API process): concurrent agent runs, wait queue, per-client rate limit
+RANK_MAX_CONCURRENT = int(os.getenv("RANK_MAX_CONCURRENT", "8"))
+RANK_MAX_QUEUE = int(os.getenv("RANK_MAX_QUEUE", "16"))
+RANK_QUEUE_TIMEOUT_SEC = float(os.getenv("RANK_QUEUE_TIMEOUT_SEC", "5"))
+RATE_LIMIT_PER_MIN = float(os.getenv("RATE_LIMIT_PER_MIN", "30"))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "10"))
+# Known client API keys (comma-separated); only these get their own bucket, anything else is keyed by IP
+API_KEYS = frozenset(k.strip() for k in os.getenv("API_KEYS", "").split(",") if k.strip())
+
+# Price watches: SQLite store, refresh interval per distinct watched query, scheduler on/off
+WATCH_DB_PATH = os.getenv("WATCH_DB_PATH", "watches.sqlite3")
+WATCH_REFRESH_INTERVAL_SEC = int(os.getenv("WATCH_REFRESH_INTERVAL_SEC", "3600"))
+WATCH_SCHEDULER = os.getenv("WATCH_SCHEDULER", "1") == "1"
+
+# Rule-based intent parsing: skip the LLM when the local parser's confidence reaches this (>1 disables)
+INTENT_FASTPATH_MIN_CONFIDENCE = float(os.getenv("INTENT_FASTPATH_MIN_CONFIDENCE", "0.8"))
+
+# Result caches: backend ("memory" per process, "sqlite" shared file per node, "redis" shared across nodes),
+# entries per cache and TTLs for search results, parsed intents and LLM rankings
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", "cache.sqlite3")
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "5000"))
+SEARCH_CACHE_TTL_SEC = int(os.getenv("SEARCH_CACHE_TTL_SEC", "1800"))
+INTENT_CACHE_TTL_SEC = int(os.getenv("INTENT_CACHE_TTL_SEC", "86400"))
+RANK_CACHE_TTL_SEC = int(os.getenv("RANK_CACHE_TTL_SEC", "1800"))
+
+# Finalist enrichment: product pages fetched per run at most, and in parallel
+ENRICH_MAX_FETCHES = int(os.getenv("ENRICH_MAX_FETCHES", "8"))
+ENRICH_WORKERS = int(os.getenv("ENRICH_WORKERS", "4"))
+
+# Offer pools behind /rank/refine: how long a /rank result's enriched offers stay refinable, and how many
+POOL_TTL_SEC = int(os.getenv("POOL_TTL_SEC", "1800"))
+POOL_MAX_ENTRIES = int(os.getenv("POOL_MAX_ENTRIES", "2000"))
+
+# Popular-query tracking and pre-warming: tracked keys, queries kept warm, check interval,
+# refresh lead time before cache expiry, and SearchAPI credits the pre-warmer may spend per hour
+HEAVY_HITTER_CAPACITY = int(os.getenv("HEAVY_HITTER_CAPACITY", "1000"))
+PREWARM_TOP_N = int(os.getenv("PREWARM_TOP_N", "20"))
+PREWARM_INTERVAL_SEC = int(os.getenv("PREWARM_INTERVAL_SEC", "60"))
+PREWARM_LEAD_SEC = int(os.getenv("PREWARM_LEAD_SEC", "120"))
+PREWARM_CREDITS_PER_HOUR = int(os.getenv("PREWARM_CREDITS_PER_HOUR", "0"))
+
+# Admin endpoints (/admin/*) require X-Admin-Token to match; unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "").strip() or None
+
+# Product page cache: entries kept (with ETag/Last-Modified) for TTL, served without revalidation while fresh
+PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", "2000"))
+PAGE_CACHE_TTL_SEC = int(os.getenv("PAGE_CACHE_TTL_SEC", str(7 * 24 * 3600)))
+PAGE_CACHE_FRESH_SEC = int(os.getenv("PAGE_CACHE_FRESH_SEC", "600"))
+# Stop reading a product page after this many characters if no structured data was found
+PAGE_MAX_CHARS = int(os.getenv("PAGE_MAX_CHARS", "1000000"))
+
+# Image proxy (/img/{id}): on-disk thumbnail cache and its size bound, allowed widths, default width,
+# key signing image ids (derived from OPENAI_API_KEY if unset; must be the same on every API process),
+# optional absolute URL prefix for proxied URLs, upstream timeout and max source image size
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "image_cache")
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+IMAGE_SIZES = tuple(sorted(int(s) for s in os.getenv("IMAGE_SIZES", "96,200,400").split(",") if s.strip()))
+IMAGE_DEFAULT_SIZE = int(os.getenv("IMAGE_DEFAULT_SIZE", "200"))
+IMAGE_SIGNING_KEY = os.getenv("IMAGE_SIGNING_KEY", "").strip() or None
+IMAGE_PUBLIC_BASE_URL = os.getenv("IMAGE_PUBLIC_BASE_URL", "").rstrip("/")
+IMAGE_FETCH_TIMEOUT_SEC = float(os.getenv("IMAGE_FETCH_TIMEOUT_SEC", "5"))
+IMAGE_MAX_SOURCE_BYTES = int(os.getenv("IMAGE_MAX_SOURCE_BYTES", str(5 * 1024 * 1024)))
+
 
 def get_openai_client() -> OpenAI:
     """Return a shared OpenAI client. Raises if API key is missing."""
@@ -0,0 +1,52 @@
+# app/core/heavy_hitters.py
+"""
+Bounded-memory tracking of the most frequent keys (Space-Saving algorithm).
+
+At most `capacity` keys are kept. When a new key arrives and the table is full,
+it replaces the key with the smallest count and inherits that count as its
+error bound, so any key seen more than N/capacity times is guaranteed to be
+tracked and counts are overestimated by at most `error`.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, List, Optional
+
+
+class SpaceSaving:
+    """Approximate top-k counter with a fixed number of slots."""
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.total = 0
+        # key -> [count, error, payload]
+        self._slots: Dict[str, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def offer(self, key: str, payload: Any = None) -> None:
+        """Count one occurrence of key; payload is kept with the key (latest wins)."""
+        with self._lock:
+            self.total += 1
+            slot = self._slots.get(key)
+            if slot is not None:
+                slot[0] += 1
+                if payload is not None:
+                    slot[2] = payload
+                return
+            if len(self._slots) < self.capacity:
+                self._slots[key] = [1, 0, payload]
+                return
+            victim = min(self._slots, key=lambda k: self._slots[k][0])
+            floor = self._slots.pop(victim)[0]
+            self._slots[key] = [floor + 1, floor, payload]
+
+    def top(self, n: int) -> List[Dict[str, Any]]:
+        """The n most frequent keys with their (over)estimated count and error bound."""
+        with self._lock:
+            items = sorted(self._slots.items(), key=lambda kv: kv[1][0], reverse=True)[:n]
+        return [{"key": k, "count": c, "error": e, "payload": p} for k, (c, e, p) in items]
+
+    def payload(self, key: str) -> Optional[Any]:
+        with self._lock:
+            slot = self._slots.get(key)
+            return slot[2] if slot else None
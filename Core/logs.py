@@ -0,0 +1,105 @@
+# app/core/logs.py
+"""
+Structured (JSON lines) logging with a background writer.
+
+Callers log dicts, e.g. `logger.info({"event": "rank_done", "steps": 3})`.
+Records are handed to a queue; formatting and the stdout write happen on a
+listener thread, so request threads never block on I/O or JSON encoding.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
+
+from Core.config import (
+    LOG_LEVEL,
+    LOG_STATE_SAMPLE_RATE,
+    LOG_MAX_FIELD_CHARS,
+    LOG_MAX_LIST_ITEMS,
+)
+
+_ROOT = "salla"
+_lock = threading.Lock()
+_listener: Optional[QueueListener] = None
+
+
+def truncate(obj: Any, max_chars: int = LOG_MAX_FIELD_CHARS, max_items: int = LOG_MAX_LIST_ITEMS) -> Any:
+    """Return a copy of obj with long strings and lists cut down for logging."""
+    if isinstance(obj, str):
+        return obj if len(obj) <= max_chars else obj[:max_chars] + f"…(+{len(obj) - max_chars} chars)"
+    if isinstance(obj, dict):
+        return {k: truncate(v, max_chars, max_items) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        out = [truncate(v, max_chars, max_items) for v in obj[:max_items]]
+        if len(obj) > max_items:
+            out.append(f"…(+{len(obj) - max_items} items)")
+        return out
+    return obj
+
+
+def should_dump_state(forced: bool = False) -> bool:
+    """Decide whether this request logs its full final state."""
+    return forced or (LOG_STATE_SAMPLE_RATE > 0 and random.random() < LOG_STATE_SAMPLE_RATE)
+
+
+class JsonFormatter(logging.Formatter):
+    """Render a record as one JSON line; dict messages are merged into the line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line: dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        if isinstance(record.msg, dict):
+            line.update(record.msg)
+        else:
+            line["message"] = record.getMessage()
+        if record.exc_info:
+            line["exc"] = self.formatException(record.exc_info)
+        return json.dumps(line, ensure_ascii=False, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging() -> None:
+    """Install the queue handler and start the listener (idempotent)."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+        q: queue.SimpleQueue = queue.SimpleQueue()
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(JsonFormatter())
+        _listener = QueueListener(q, stream, respect_handler_level=False)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+        root = logging.getLogger(_ROOT)
+        root.setLevel(LOG_LEVEL)
+        root.addHandler(_DeferredQueueHandler(q))
+        root.propagate = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Return a structured logger under the app namespace."""
+    setup_logging()
+    return logging.getLogger(f"{_ROOT}.{name}")
+
+
+def elapsed_ms(start: float) -> float:
+    """Milliseconds since a time.perf_counter() start mark."""
+    return round((time.perf_counter() - start) * 1000, 1)
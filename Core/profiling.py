@@ -0,0 +1,73 @@
+# app/core/profiling.py
+"""
+On-demand cProfile runs.
+
+`run_profiled(fn)` runs one call under the deterministic profiler and stores the
+stats under PROFILE_DIR (newest PROFILE_MAX_RUNS kept). Only one profile runs at
+a time: cProfile is per-thread up to Python 3.11 but process-wide from 3.12, so
+concurrent profiles would either fail or mix requests together.
+"""
+from __future__ import annotations
+
+import cProfile
+import io
+import pstats
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple
+
+from Core.config import PROFILE_DIR, PROFILE_MAX_RUNS
+
+_ID_RE = re.compile(r"^\d+-[0-9a-f]{32}$")
+_busy = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    """Another profiled call is in progress."""
+
+
+def run_profiled(fn: Callable[..., Any], *args: Any) -> Tuple[Any, str]:
+    """Run fn(*args) under cProfile; returns (result, profile id)."""
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("another profile is in progress")
+    try:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            result = fn(*args)
+        finally:
+            profiler.disable()
+        return result, save(profiler)
+    finally:
+        _busy.release()
+
+
+def save(profiler: cProfile.Profile, directory: str = PROFILE_DIR, max_runs: int = PROFILE_MAX_RUNS) -> str:
+    """Dump stats as <id>.prof and drop the oldest files beyond max_runs."""
+    out_dir = Path(directory)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    profile_id = f"{int(time.time() * 1000)}-{uuid.uuid4().hex}"
+    profiler.dump_stats(str(out_dir / f"{profile_id}.prof"))
+
+    files = sorted(out_dir.glob("*.prof"))
+    for old in files[: max(0, len(files) - max_runs)]:
+        old.unlink(missing_ok=True)
+    return profile_id
+
+
+def profile_path(profile_id: str, directory: str = PROFILE_DIR) -> Optional[Path]:
+    if not _ID_RE.match(profile_id):
+        return None
+    path = Path(directory) / f"{profile_id}.prof"
+    return path if path.exists() else None
+
+
+def as_text(path: Path, limit: int = 60, sort: str = "cumulative") -> str:
+    """Human-readable report of the top `limit` functions."""
+    out = io.StringIO()
+    stats = pstats.Stats(str(path), stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
@@ -1,6 +1,7 @@
 # app/main.py
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Any, Dict
 
@@ -8,14 +9,38 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 
-from Core.config import OPENAI_API_KEY, SEARCHAPI_KEY
-from API.routes_rank import router as rank_router
+from Core.config import OPENAI_API_KEY, SEARCHAPI_KEY, JOB_WORKERS, WATCH_SCHEDULER, PREWARM_CREDITS_PER_HOUR
+from Agent.jobs import start_workers, stop_workers
+from Agent.prewarm import Prewarmer
+from Agent.watch import WatchScheduler
+from API.routes_rank import router as rank_router, agent_app
+from API.routes_jobs import router as jobs_router
+from API.routes_watch import router as watch_router, watch_store
+from API.routes_admin import router as admin_router
+from API.routes_images import router as images_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background job workers, the watch scheduler and the cache pre-warmer with the app."""
+    workers = start_workers(JOB_WORKERS)
+    scheduler = WatchScheduler(watch_store) if WATCH_SCHEDULER else None
+    prewarmer = Prewarmer(agent_app) if PREWARM_CREDITS_PER_HOUR > 0 else None
+    for background in (scheduler, prewarmer):
+        if background:
+            background.start()
+    yield
+    for background in (scheduler, prewarmer):
+        if background:
+            background.stop()
+    stop_workers(workers)
 
 
 app = FastAPI(
     title="KSA Shopping Ranker API",
     description="LangGraph-based shopping agent for the Saudi market.",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # CORS (you can restrict origins later)
@@ -82,3 +107,7 @@ async def test_page() -> HTMLResponse:
 
 # Register v1 routes
 app.include_router(rank_router)
+app.include_router(jobs_router)
+app.include_router(watch_router)
+app.include_router(images_router)
+app.include_router(admin_router)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Compare per-request overhead and import/build time of the LangGraph and native executors.
+
+Upstream tools (search, page fetch, intent, LLM ranking) are replaced by in-memory
+stubs, so the numbers are graph execution plus normalizers on a 40-offer state.
+
+Usage: python scripts/bench_executor.py [--runs 500] [--offers 40]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("OPENAI_API_KEY", "unused")
+
+import Agent.graph as graph  # noqa: E402
+from Agent.runner import stream_final  # noqa: E402
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--runs", type=int, default=500)
+parser.add_argument("--offers", type=int, default=40)
+args = parser.parse_args()
+
+OFFERS = [
+    {
+        "name": f"Apple iPhone 15 Pro Max {256 if i % 2 else 512}GB - Natural Titanium #{i}",
+        "price": 4500.0 + i * 10,
+        "currency": "SAR",
+        "retailer": ["Jarir", "eXtra Stores", "Noon.com", "Some Shop"][i % 4],
+        "link": f"https://example.com/p/{i}",
+        "image": f"https://example.com/i/{i}.jpg",
+        "condition": "New",
+        "source": "searchapi_google_shopping",
+    }
+    for i in range(args.offers)
+]
+
+graph.analyze_intent = lambda q: {
+    "need_summary": q, "category": "iphone", "search_query": q, "budget_min": None, "budget_max": None,
+    "must_have": [], "nice_to_have": [], "missing_info": [], "follow_up_question": None, "ready": True,
+}
+graph.shopping_search = lambda query, limit=40, **kw: [dict(o) for o in OFFERS[:limit]]
+graph.product_page_fetch = lambda url: {"ok": True, "model": "iPhone 15 Pro Max", "storage": "256GB"}
+graph.llm_rank_offers = lambda offers, q, intent, trusted_only=False, top_k=4: {
+    "items": [dict(o, reason="stub") for o in offers[:top_k]], "notes": None,
+}
+
+
+def per_request_ms(executor: str) -> list:
+    app = graph.build_app(executor)
+    stream_final(app, "iphone 15 pro max", True)  # warm up
+    samples = []
+    for _ in range(args.runs):
+        t = time.perf_counter()
+        stream_final(app, "iphone 15 pro max", True)
+        samples.append((time.perf_counter() - t) * 1000)
+    return samples
+
+
+def startup_ms(executor: str) -> float:
+    """Fresh interpreter: import the agent and build the app."""
+    code = (
+        "import time; t = time.perf_counter(); "
+        "import Agent.graph as g; g.build_app(%r); "
+        "print((time.perf_counter() - t) * 1000)" % executor
+    )
+    runs = []
+    for _ in range(5):
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                             env={**os.environ, "LOG_LEVEL": "ERROR"}, check=True)
+        runs.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(runs)
+
+
+print(f"runs={args.runs} offers={args.offers}")
+print(f"{'executor':<10} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'import+build ms':>16}")
+for name in ("langgraph", "native"):
+    s = sorted(per_request_ms(name))
+    print(f"{name:<10} {statistics.mean(s):>9.3f} {s[len(s) // 2]:>9.3f} {s[int(len(s) * 0.95)]:>9.3f} "
+          f"{startup_ms(name):>16.1f}")
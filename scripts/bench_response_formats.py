@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Compare payload size and encode time of the /rank response formats.
+
+Responses are rebuilt from recorded runs (final state of the finish node →
+to_rank_response); without recordings, synthetic 4-item responses are used.
+"FastAPI default" is what a plain `return response` costs (jsonable_encoder + json.dumps).
+
+Usage: python scripts/bench_response_formats.py [recordings/] [--runs 2000]
+"""
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+# Nothing runs upstream; Core.config still wants a key to build its client
+os.environ.setdefault("OPENAI_API_KEY", "unused")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from Agent import recorder  # noqa: E402
+from API.negotiation import brotli, encode_json, msgpack  # noqa: E402
+from API.routes_rank import to_rank_response  # noqa: E402
+from Core.config import RESPONSE_BROTLI_QUALITY, RESPONSE_GZIP_LEVEL  # noqa: E402
+
+parser = argparse.ArgumentParser()
+parser.add_argument("directory", nargs="?", default=os.getenv("RECORD_DIR", "recordings"))
+parser.add_argument("--runs", type=int, default=2000)
+args = parser.parse_args()
+
+
+def recorded_responses():
+    for path in sorted(Path(args.directory).glob("*.json.gz")):
+        calls = [c for c in recorder.load(str(path)).nodes if c["node"] == "finish"]
+        if calls:
+            final = {**calls[-1]["input"], **(calls[-1]["output"] or {})}
+            yield to_rank_response(final, final.get("query", ""))
+
+
+def synthetic_responses():
+    retailers = ["Jarir", "eXtra Stores", "Noon.com", "Amazon.sa"]
+    for n in range(10):
+        items = [
+            {
+                "name": f"Apple iPhone 15 Pro Max {256 if i % 2 else 512}GB - Natural Titanium",
+                "price": 4599.0 + 100 * i + n,
+                "currency": "SAR",
+                "retailer": retailers[i],
+                "link": f"https://www.example.com/sa/iphone-15-pro-max/{n}-{i}?utm_source=google_shopping",
+                "condition": "New",
+                "reason": "متجر موثوق، أقل سعر للسعة المطلوبة، الضمان متوفر والشحن سريع",
+                "image": f"https://encrypted-tbn0.gstatic.com/shopping?q=tbn:ANd9Gc{n}{i}",
+            }
+            for i in range(4)
+        ]
+        yield to_rank_response({
+            "query": "ايفون 15 برو ماكس 256",
+            "steps": 3,
+            "errors": [],
+            "result": {"items": items, "notes": "الأسعار بالريال وتشمل الضريبة"},
+        }, "", pool_id="0" * 32)
+
+
+responses = list(recorded_responses())
+source = "recorded"
+if not responses:
+    responses, source = list(synthetic_responses()), "synthetic"
+
+formats = {
+    "FastAPI default": lambda r: json.dumps(jsonable_encoder(r), ensure_ascii=False).encode("utf-8"),
+    "json (served)": encode_json,
+}
+formats["msgpack"] = lambda r: msgpack.packb(r.model_dump(mode="json"))
+formats["json + gzip"] = lambda r: gzip.compress(encode_json(r), compresslevel=RESPONSE_GZIP_LEVEL, mtime=0)
+if brotli is not None:
+    formats["json + br"] = lambda r: brotli.compress(encode_json(r), quality=RESPONSE_BROTLI_QUALITY)
+if brotli is not None:
+    formats["msgpack + br"] = lambda r: brotli.compress(msgpack.packb(r.model_dump(mode="json")),
+                                                        quality=RESPONSE_BROTLI_QUALITY)
+
+runs_each = max(1, args.runs // len(responses))
+print(f"{len(responses)} {source} responses, {runs_each} encodes each")
+print(f"{'format':<16} {'bytes':>8} {'µs/response':>12}")
+for name, encode in formats.items():
+    size = statistics.mean(len(encode(r)) for r in responses)
+    started = time.perf_counter()
+    for _ in range(runs_each):
+        for r in responses:
+            encode(r)
+    us = (time.perf_counter() - started) / (runs_each * len(responses)) * 1e6
+    print(f"{name:<16} {size:>8.0f} {us:>12.1f}")
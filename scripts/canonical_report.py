@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Report how many distinct cache keys query canonicalization removes on a query corpus.
+
+Compares the previous key (lowercase + collapsed spaces) with canonical_query().
+
+Usage: python scripts/canonical_report.py [queries.txt] [-v]
+"""
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+# Only the canonicalizer runs; Core.config still wants a key to build its client
+os.environ.setdefault("OPENAI_API_KEY", "unused")
+
+from Agent.canonical import canonical_query  # noqa: E402
+
+parser = argparse.ArgumentParser()
+parser.add_argument("corpus", nargs="?", default=str(ROOT / "scripts" / "data" / "sample_queries.txt"))
+parser.add_argument("-v", "--verbose", action="store_true")
+args = parser.parse_args()
+
+queries = [q.strip() for q in Path(args.corpus).read_text(encoding="utf-8").splitlines() if q.strip()]
+
+raw_keys = {" ".join(q.lower().split()) for q in queries}
+groups = defaultdict(set)
+started = time.perf_counter()
+for q in queries:
+    groups[canonical_query(q)].add(q)
+elapsed_us = (time.perf_counter() - started) * 1e6
+
+if args.verbose:
+    for key, variants in sorted(groups.items(), key=lambda kv: -len(kv[1])):
+        if len(variants) > 1:
+            print(f"{key}")
+            for v in sorted(variants):
+                print(f"    {v}")
+
+print(f"queries:            {len(queries)}")
+print(f"raw keys:           {len(raw_keys)}")
+print(f"canonical keys:     {len(groups)}")
+print(f"collapse rate:      {1 - len(groups) / max(1, len(raw_keys)):.1%} fewer distinct keys")
+print(f"canonicalize time:  {elapsed_us / max(1, len(queries)):.1f} us/query")
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""Report how many intent LLM calls the rule-based fast path removes on a query corpus.
+
+Usage: python scripts/intent_fastpath_report.py [queries.txt] [--threshold 0.8] [-v]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+# Only the local parser runs; Core.config still wants a key to build its client
+os.environ.setdefault("OPENAI_API_KEY", "unused")
+
+from Agent.intent_rules import parse_intent_locally  # noqa: E402
+from Core.config import INTENT_FASTPATH_MIN_CONFIDENCE  # noqa: E402
+
+parser = argparse.ArgumentParser()
+parser.add_argument("corpus", nargs="?", default=str(ROOT / "scripts" / "data" / "sample_queries.txt"))
+parser.add_argument("--threshold", type=float, default=INTENT_FASTPATH_MIN_CONFIDENCE)
+parser.add_argument("-v", "--verbose", action="store_true")
+args = parser.parse_args()
+
+queries = [q.strip() for q in Path(args.corpus).read_text(encoding="utf-8").splitlines() if q.strip()]
+
+local = 0
+started = time.perf_counter()
+for q in queries:
+    intent, confidence = parse_intent_locally(q)
+    hit = confidence >= args.threshold
+    local += hit
+    if args.verbose:
+        print(f"{'LOCAL' if hit else 'LLM  '} {confidence:.2f}  {q}")
+elapsed_ms = (time.perf_counter() - started) * 1000
+
+print(f"queries:          {len(queries)}")
+print(f"threshold:        {args.threshold}")
+print(f"parsed locally:   {local} ({local / max(1, len(queries)):.0%} of intent LLM calls removed)")
+print(f"sent to LLM:      {len(queries) - local}")
+print(f"local parse time: {elapsed_ms / max(1, len(queries)):.3f} ms/query")
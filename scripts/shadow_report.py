@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Compare the LLM ranking with the local policy ranking over recorded runs, per intent category.
+
+Each recording's finish node is replayed offline (the LLM ranking comes from the
+recording) with shadow evaluation forced on. Token/latency columns are only
+available for recordings that stored completion usage.
+
+Usage: python scripts/shadow_report.py [recordings/] [-v]
+"""
+import argparse
+import copy
+import os
+import statistics
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+# Everything is replayed; Core.config still wants a key to build its client
+os.environ.setdefault("OPENAI_API_KEY", "unused")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+from Agent import recorder, shadow  # noqa: E402
+from Agent.graph import finisher  # noqa: E402
+
+parser = argparse.ArgumentParser()
+parser.add_argument("directory", nargs="?", default=os.getenv("RECORD_DIR", "recordings"))
+parser.add_argument("-v", "--verbose", action="store_true")
+args = parser.parse_args()
+
+
+def mean(values):
+    values = [v for v in values if v is not None]
+    return statistics.mean(values) if values else None
+
+
+def fmt(value, spec):
+    return "-" if value is None else format(value, spec)
+
+
+by_category = defaultdict(list)
+skipped = 0
+for path in sorted(Path(args.directory).glob("*.json.gz")):
+    rec = recorder.load(str(path))
+    calls = [c for c in rec.nodes if c["node"] == "finish"]
+    if not calls:
+        skipped += 1
+        continue
+    try:
+        with recorder.session(rec), shadow.forced():
+            out = finisher(copy.deepcopy(calls[-1]["input"]))
+    except recorder.ReplayMiss:
+        skipped += 1
+        continue
+    metrics = out.get("shadow")
+    if not metrics:
+        # Follow-up questions and empty candidate sets never reach the ranker
+        skipped += 1
+        continue
+    by_category[metrics["category"]].append(metrics)
+    if args.verbose:
+        print(f"{metrics['category']:<12} top1={metrics['top1_match']!s:<5} "
+              f"overlap={metrics['overlap_at_k']:.2f} tau={fmt(metrics['kendall_tau'], '.2f')}  {rec.query}")
+
+print(f"{'category':<14} {'runs':>5} {'top1':>6} {'overlap@k':>10} {'tau':>6} "
+      f"{'prompt tok':>11} {'compl tok':>10} {'llm ms':>8}")
+for category, rows in sorted(by_category.items(), key=lambda kv: -len(kv[1])):
+    print(f"{category:<14} {len(rows):>5} "
+          f"{mean([r['top1_match'] for r in rows]):>6.0%} "
+          f"{mean([r['overlap_at_k'] for r in rows]):>10.2f} "
+          f"{fmt(mean([r['kendall_tau'] for r in rows]), '.2f'):>6} "
+          f"{fmt(mean([r['prompt_tokens'] for r in rows]), '.0f'):>11} "
+          f"{fmt(mean([r['completion_tokens'] for r in rows]), '.0f'):>10} "
+          f"{fmt(mean([r['llm_latency_ms'] for r in rows]), '.0f'):>8}")
+print(f"skipped recordings (no ranking step): {skipped}")
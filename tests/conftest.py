@@ -0,0 +1,121 @@
+# tests/conftest.py
+"""
+Settings for the test run. Core.config reads the environment at import time, so
+everything is set here before any project module is imported: no upstream keys
+are used, caches stay in memory and background workers are off.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+_tmp = tempfile.mkdtemp(prefix="salla-tests-")
+
+os.environ.update({
+    "OPENAI_API_KEY": "test",
+    "CACHE_BACKEND": "memory",
+    "JOB_WORKERS": "0",
+    "WATCH_SCHEDULER": "0",
+    "PREWARM_CREDITS_PER_HOUR": "0",
+    "RECORD_SAMPLE_RATE": "0",
+    "SHADOW_SAMPLE_RATE": "0",
+    "LOG_LEVEL": "ERROR",
+    "RATE_LIMIT_PER_MIN": "0",
+    "JOBS_DB_PATH": os.path.join(_tmp, "jobs.sqlite3"),
+    "WATCH_DB_PATH": os.path.join(_tmp, "watches.sqlite3"),
+    "PROFILE_DIR": os.path.join(_tmp, "profiles"),
+    "IMAGE_CACHE_DIR": os.path.join(_tmp, "image_cache"),
+})
+
+import json  # noqa: E402
+from types import SimpleNamespace  # noqa: E402
+
+import pytest  # noqa: E402
+import requests  # noqa: E402
+
+SEARCH_RESULTS = {"shopping_results": [
+    {"title": f"Apple iPhone 15 Pro Max {storage}GB", "extracted_price": price, "product_link": f"https://shop.test/{i}",
+     "seller": seller, "condition": condition, "thumbnail": f"https://img.test/{i}.jpg"}
+    for i, (storage, price, seller, condition) in enumerate([
+        (256, 5199, "Jarir", "New"), (256, 4999, "eBay", "Used"), (512, 5999, "Noon", "New"),
+        (256, 4899, "Extra", "New"), (128, 4300, "Amazon.sa", "New"), (256, 5100, "Random shop", "New"),
+    ])
+]}
+PAGE_HTML = "<html><head><title>Apple iPhone 15 Pro Max 256GB</title></head><body></body></html>"
+
+
+class FakeResponse:
+    def __init__(self, data=None, text="", status_code=200, headers=None):
+        self._data = data
+        self.text = text
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.encoding = "utf-8"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(str(self.status_code))
+
+    def json(self):
+        return self._data
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        return iter([self.text])
+
+
+class FakeUpstream:
+    """SearchAPI, product pages and OpenAI answered locally, with call counts."""
+
+    def __init__(self):
+        self.calls = {"search": 0, "page": 0, "llm": 0}
+
+    def get(self, url, params=None, **kwargs):
+        if "searchapi" in url:
+            self.calls["search"] += 1
+            return FakeResponse(SEARCH_RESULTS)
+        self.calls["page"] += 1
+        return FakeResponse(text=PAGE_HTML)
+
+    def create(self, messages=None, **kwargs):
+        self.calls["llm"] += 1
+        prompt = messages[-1]["content"]
+        if "Candidate offers:\n" in prompt:
+            offers = json.loads(prompt.split("Candidate offers:\n")[1].split("\n\nReturn schema")[0])
+            content = json.dumps({"items": [dict(o, reason="ok") for o in offers], "notes": ""})
+        else:
+            content = json.dumps({"category": "iphone", "search_query": "iPhone 15 Pro Max 256GB", "ready": True,
+                                  "missing_info": [], "follow_up_question": None})
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=100, completion_tokens=50),
+        )
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Fake every upstream service and give each test empty agent caches."""
+    import Agent.intent as intent
+    import Agent.ranking as ranking
+    import Agent.tools as tools
+    from Core.cache import TTLCache
+
+    fake = FakeUpstream()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fake.create)))
+    monkeypatch.setattr(tools.requests, "get", fake.get)
+    monkeypatch.setattr(tools, "SEARCHAPI_KEY", "test")
+    monkeypatch.setattr(ranking, "client", client)
+    monkeypatch.setattr(intent, "client", client)
+    monkeypatch.setattr(tools, "_search_cache", TTLCache(100, 600))
+    monkeypatch.setattr(tools, "_page_cache", TTLCache(100, 600))
+    monkeypatch.setattr(ranking, "_rank_cache", TTLCache(100, 600))
+    monkeypatch.setattr(intent, "_intent_cache", TTLCache(100, 600))
+    return fake
@@ -0,0 +1,24 @@
+from starlette.requests import Request
+
+from API.admission import RateLimiter, client_key
+
+
+def make_request(api_key=None, host="10.0.0.1"):
+    headers = [(b"x-api-key", api_key.encode())] if api_key else []
+    return Request({"type": "http", "headers": headers, "client": (host, 1234)})
+
+
+def test_known_api_key_gets_own_bucket():
+    assert client_key(make_request("good"), api_keys=frozenset({"good"})) == "key:good"
+
+
+def test_unknown_api_key_falls_back_to_ip():
+    keys = frozenset({"good"})
+    assert client_key(make_request("random-1"), api_keys=keys) == "ip:10.0.0.1"
+    assert client_key(make_request("random-2"), api_keys=keys) == "ip:10.0.0.1"
+
+
+def test_spoofed_keys_share_the_ip_bucket():
+    limiter = RateLimiter(per_minute=60, burst=2)
+    results = [limiter.allow(client_key(make_request(f"spoof-{i}"), api_keys=frozenset()))[0] for i in range(3)]
+    assert results == [True, True, False]
@@ -0,0 +1,55 @@
+import sqlite3
+
+import pytest
+
+from Core.cache import SQLiteCache, TTLCache, cached, decode_value, encode_value, refreshing
+
+VALUE = {"items": [{"name": "iPhone 15 ايفون", "price": 4599.0, "tags": ["a", None, True]}], "steps": 3}
+
+
+@pytest.mark.parametrize("value", [VALUE, {"big": "x" * 5000}, [], None, 1.5, "نص"])
+def test_codec_round_trip(value):
+    assert decode_value(encode_value(value)) == value
+
+
+def test_large_values_are_compressed():
+    assert len(encode_value({"big": "x" * 5000})) < 200
+
+
+@pytest.mark.parametrize("blob", [
+    b"",
+    b"M",
+    b"M\x01\xc1",  # reserved msgpack byte
+    b"Z\x01not zlib",
+    b"M\x09" + encode_value(VALUE)[2:],  # unknown codec version
+    b"m\x04\xfb\x03\x00\x00\x00",  # old marshal entry
+    encode_value(VALUE)[:-5],  # truncated
+])
+def test_corrupt_values_are_misses(blob):
+    assert decode_value(blob) is None
+
+
+def test_sqlite_corrupt_row_is_a_miss(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SQLiteCache("test", maxsize=10, ttl=60, path=path)
+    cache.set("k", VALUE)
+    assert cache.get("k") == VALUE
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE cache SET value = ? WHERE key = 'k'", (b"Z\x01garbage",))
+    assert cache.get("k") is None
+    assert cached(cache, "k", lambda: {"fresh": True}) == {"fresh": True}
+
+
+def test_expires_in():
+    cache = TTLCache(10, 60)
+    cache.set("k", 1, ttl=30)
+    assert 29 < cache.expires_in("k") <= 30
+    assert cache.expires_in("missing") is None
+
+
+def test_refreshing_recomputes():
+    cache = TTLCache(10, 60)
+    cache.set("k", "old")
+    with refreshing():
+        assert cached(cache, "k", lambda: "new") == "new"
+    assert cache.get("k") == "new"
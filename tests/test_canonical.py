@@ -0,0 +1,56 @@
+import pytest
+
+from Agent.canonical import canonical_query, has_arabic, normalize_text
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("ايفون ١٥ برو ماكس ٢٥٦", "ايفون 15 برو ماكس 256"),
+    ("آيفون 15 pro max 256GB", "ايفون 15 pro max 256gb"),
+    ("iPhone15 ProMax 256 gb", "iphone 15 promax 256gb"),
+    ("شاشة ٢٧ إنش ١٤٤ هرتز", "شاشه 27inch 144hz"),
+    ("مُسْتَعْمَلة", "مستعمله"),
+    ("macbook air m2 ٥١٢ جيجا بايت", "macbook air m 2 512gb"),
+    ('4K 32"', "4k 32inch"),
+    ("Galaxy S24 Ultra 1 TB", "galaxy s 24 ultra 1tb"),
+    ("  iphone 15 / pro (max) ", "iphone 15 pro max"),
+    ("", ""),
+])
+def test_normalize_text(text, expected):
+    assert normalize_text(text) == expected
+
+
+def test_normalize_text_is_idempotent():
+    for text in ("ايفون ١٥ برو ماكس ٢٥٦", "iPhone15 ProMax 256 gb", "شاشة ٢٧ إنش"):
+        assert normalize_text(normalize_text(text)) == normalize_text(text)
+
+
+@pytest.mark.parametrize("variant", [
+    "ايفون ١٥ برو ماكس ٢٥٦",
+    "آيفون 15 pro max 256GB",
+    "iPhone15 ProMax 256 gb",
+    "الايفون 15 برو ماكس 256 جيجا",
+    "i phone 15 pro max 256",
+])
+def test_spelling_variants_share_a_key(variant):
+    assert canonical_query(variant) == "iphone 15 pro max 256gb"
+
+
+@pytest.mark.parametrize("a, b", [
+    ("iphone 15 256gb", "iphone 15 512gb"),
+    ("iphone 15 pro", "iphone 15 pro max"),
+    ("galaxy s24", "galaxy s23"),
+    ("iphone 15 1tb", "iphone 15 1gb"),
+])
+def test_different_products_keep_different_keys(a, b):
+    assert canonical_query(a) != canonical_query(b)
+
+
+def test_vocabulary():
+    assert canonical_query("سامسونج جالاكسي S24 ألترا") == "samsung galaxy s 24 ultra"
+    assert canonical_query("ماك بوك اير") == "macbook air"
+    # Only device storage sizes get a unit; other numbers are left alone
+    assert canonical_query("شاشة 27") == "شاشه 27"
+
+
+def test_has_arabic():
+    assert has_arabic("ايفون 15") and not has_arabic("iphone 15")
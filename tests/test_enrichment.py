@@ -0,0 +1,114 @@
+import pytest
+
+import Agent.graph as graph
+from Agent.ranking import local_rank_offers, policy_sort_key
+from Agent.refine import refine_pool, save_pool
+
+QUERY = "iPhone 15 Pro Max 256GB"
+INTENT = {"category": "iphone", "nice_to_have": ["256GB"], "must_have": []}
+WANTED = {"model": "iPhone 15 Pro Max", "storage": "256GB"}
+
+
+def offer(i, price, storage="256GB", retailer="Jarir", **extra):
+    name = f"Apple iPhone 15 Pro Max {storage or ''}".strip()
+    return {"name": name, "price_sar": price, "retailer": retailer, "condition": "New",
+            "link": f"https://shop.test/{i}", "model": "iPhone 15 Pro Max", "storage": storage, **extra}
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    """link -> product page info; records fetched links."""
+    info, fetched = {}, []
+
+    def fetch(url):
+        fetched.append(url)
+        return {"ok": True, **info.get(url, {})}
+
+    monkeypatch.setattr(graph, "product_page_fetch", fetch)
+    return info, fetched
+
+
+def test_wanted_specs():
+    assert graph.wanted_specs(QUERY, INTENT) == WANTED
+    assert graph.wanted_specs("galaxy s24", {"nice_to_have": []}) == {"model": None, "storage": None}
+
+
+def test_needs_enrichment_only_for_requested_specs():
+    assert not graph.needs_enrichment(offer(0, 1, storage=None), {"model": None, "storage": None})
+    assert graph.needs_enrichment(offer(0, 1, storage=None), WANTED)
+    assert graph.needs_enrichment(dict(offer(0, 1), name="iPhone 15 Pro Max 256GB/512GB"), WANTED)
+    assert not graph.needs_enrichment(offer(0, 1), WANTED)
+    assert not graph.needs_enrichment(offer(0, 1, storage=None, enriched=True), WANTED)
+    galaxy = {"name": "Samsung Galaxy S24 Ultra", "link": "https://shop.test/g", "model": None, "storage": None}
+    assert not graph.needs_enrichment(galaxy, {"model": None, "storage": None})
+
+
+def test_conflicts():
+    assert not graph.conflicts(offer(0, 1, storage="512GB"), WANTED)  # title only, page not seen
+    assert graph.conflicts(offer(0, 1, storage="512GB", enriched=True), WANTED)
+    assert not graph.conflicts(offer(0, 1, enriched=True), WANTED)
+    assert not graph.conflicts(offer(0, 1, storage="512GB", enriched=True), {"model": None, "storage": None})
+    # Labels the normalizers do not produce are never a conflict
+    assert not graph.conflicts(dict(offer(0, 1, enriched=True), model="Galaxy S24"), WANTED)
+
+
+def test_contradicting_finalist_is_replaced(pages):
+    info, fetched = pages
+    base = [offer(0, 4000, storage=None), offer(1, 4100), offer(2, 4200, storage=None), offer(3, 4300)]
+    info["https://shop.test/0"] = {"storage": "512GB"}
+    info["https://shop.test/2"] = {"storage": "256GB"}
+    ordered, n = graph.enrich_finalists(base, 2, WANTED)
+    assert n == 2 and fetched == ["https://shop.test/0", "https://shop.test/2"]
+    assert [o["link"][-1] for o in ordered] == ["1", "2", "3", "0"]
+
+
+def test_no_pages_without_requested_specs(pages):
+    _, fetched = pages
+    base = [{"name": "Samsung Galaxy S24", "price_sar": 3000, "link": f"https://shop.test/{i}"} for i in range(4)]
+    assert graph.enrich_finalists(base, 4, graph.wanted_specs("galaxy s24", {}))[1] == 0
+    assert fetched == []
+
+
+def state(offers, trusted_only=True):
+    return {"query": QUERY, "offers": offers, "intent": dict(INTENT), "trusted_only": trusted_only}
+
+
+def test_demotion_survives_local_ranking(pages):
+    info, _ = pages
+    offers = [offer(i, 4000 + i * 100, storage=None) for i in range(5)]
+    info["https://shop.test/0"] = {"storage": "512GB"}
+    final = graph.finish_with(state(offers), local_rank_offers)
+    links = [it["link"] for it in final["result"]["items"]]
+    assert "https://shop.test/0" not in links
+    assert links == [f"https://shop.test/{i}" for i in (1, 2, 3, 4)]
+
+
+def test_refine_keeps_demotion_without_fetching(pages):
+    info, fetched = pages
+    offers = [offer(i, 4000 + i * 100, storage=None) for i in range(5)]
+    info["https://shop.test/0"] = {"storage": "512GB"}
+    final = graph.finish_with(state(offers), local_rank_offers)
+    pool_id = save_pool(final)
+    n = len(fetched)
+
+    refined = refine_pool(pool_id, {"budget_max": 4250})
+    assert len(fetched) == n
+    # The cheapest offer is still last: its page showed a different storage
+    assert [it["link"] for it in refined["result"]["items"]] == [f"https://shop.test/{i}" for i in (1, 2, 0)]
+
+
+def test_shadow_baseline_keeps_demotion(pages, monkeypatch):
+    info, _ = pages
+    offers = [offer(i, 4000 + i * 100, storage=None) for i in range(5)]
+    info["https://shop.test/0"] = {"storage": "512GB"}
+    baselines = []
+    monkeypatch.setattr(graph, "should_shadow", lambda: True)
+    monkeypatch.setattr(graph, "compare_rankings", lambda llm, local, **kw: baselines.append(local) or {})
+    monkeypatch.setattr(graph, "llm_rank_offers", lambda base, *a, **k: {"items": [], "usage": {}})
+    graph.finish_with(state(offers), graph.llm_rank_offers)
+    assert "https://shop.test/0" not in [it["link"] for it in baselines[0]["items"]]
+
+
+def test_local_ranking_keeps_input_order():
+    offers = sorted([offer(i, 5000 - i * 100) for i in range(5)], key=policy_sort_key)
+    assert [it["link"] for it in local_rank_offers(offers, top_k=3)["items"]] == [o["link"] for o in offers[:3]]
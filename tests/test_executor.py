@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from Agent.executor import GraphRecursionError, NativeApp
+from Agent.graph import build_app
+from Agent.runner import initial_state
+from Core.cache import bypass
+
+
+def events(app, query, trusted_only=True):
+    # Caches bypassed so both executors see identical upstream calls
+    with bypass():
+        return [
+            (node, json.loads(json.dumps(payload, sort_keys=True, default=str)))
+            for event in app.stream(initial_state(query, trusted_only))
+            for node, payload in event.items()
+        ]
+
+
+@pytest.mark.parametrize("query, trusted_only", [("iPhone 15 Pro Max 256GB", True), ("iPhone 15 Pro Max 256GB", False)])
+def test_native_executor_matches_langgraph(upstream, query, trusted_only):
+    native = events(build_app("native"), query, trusted_only)
+    langgraph = events(build_app("langgraph"), query, trusted_only)
+    assert [node for node, _ in native] == [node for node, _ in langgraph]
+    assert native == langgraph
+    assert native[0][0] == "plan" and native[-1][0] == "finish"
+    assert native[-1][1]["result"]["items"]
+
+
+def test_unknown_executor():
+    with pytest.raises(ValueError):
+        build_app("threads")
+
+
+def test_recursion_limit():
+    app = NativeApp({"loop": lambda s: dict(s, n=s["n"] + 1)}, {"loop": lambda s: "loop"}, "loop", recursion_limit=5)
+    with pytest.raises(GraphRecursionError):
+        list(app.stream({"n": 0}))
+    stop = NativeApp({"loop": lambda s: dict(s, n=s["n"] + 1)}, {"loop": lambda s: "loop" if s["n"] < 3 else None}, "loop")
+    assert stop.invoke({"n": 0}) == {"n": 3}
+
+
+def test_dropped_keys_keep_their_value():
+    def produce(s):
+        return dict(s, tool="search", n=s["n"] + 1)
+
+    def consume(s):
+        s.pop("tool")
+        return s
+
+    routes = {"produce": lambda s: "consume", "consume": lambda s: "produce" if s["n"] < 2 else None}
+    app = NativeApp({"produce": produce, "consume": consume}, routes, "produce")
+    assert app.invoke({"n": 0}) == {"n": 2, "tool": "search"}
@@ -0,0 +1,114 @@
+import io
+import json
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+import Agent.tools as tools
+from Agent.extract import parse_product_html, parse_until_complete
+from Core.cache import TTLCache
+
+JSONLD_PAGE = """<!doctype html><html><head>
+<title>Store | iPhone</title>
+<meta property="og:title" content="OG title">
+<meta property="og:image" content="https://img.test/og.jpg">
+<script type="application/ld+json">{}</script>
+</head><body><h1>ignored</h1></body></html>""".format(json.dumps({
+    "@context": "https://schema.org",
+    "@graph": [
+        {"@type": "BreadcrumbList"},
+        {"@type": "Product", "name": "Apple iPhone 15 Pro Max 256GB Natural Titanium", "gtin13": "0194253401234",
+         "brand": {"@type": "Brand", "name": "Apple"}, "sku": "MU793",
+         "offers": [{"@type": "Offer", "price": "5,199.00", "priceCurrency": "SAR",
+                     "availability": "https://schema.org/InStock"}]},
+    ],
+}))
+
+OG_PAGE = """<html><head>
+<meta property="og:title" content="ايفون 15 برو 128 جيجا">
+<meta property="product:price:amount" content="4299">
+<meta property="product:price:currency" content="SAR">
+<meta property="og:availability" content="instock">
+</head><body></body></html>"""
+
+
+def test_jsonld_product_is_preferred_over_meta():
+    info = parse_product_html(JSONLD_PAGE)
+    assert info["name"] == "Apple iPhone 15 Pro Max 256GB Natural Titanium"
+    assert info["price"] == 5199.0 and info["currency"] == "SAR"
+    assert info["availability"] == "InStock"
+    assert (info["gtin"], info["brand"], info["sku"]) == ("0194253401234", "Apple", "MU793")
+    assert info["image"] == "https://img.test/og.jpg"
+    assert (info["model"], info["storage"]) == ("iPhone 15 Pro Max", "256GB")
+
+
+def test_opengraph_fallback():
+    info = parse_product_html(OG_PAGE)
+    assert info["name"] == "ايفون 15 برو 128 جيجا"
+    assert (info["price"], info["currency"], info["availability"]) == (4299.0, "SAR", "instock")
+    assert info["gtin"] is None and info["brand"] is None
+
+
+def test_parsing_stops_once_head_and_product_are_seen():
+    head, body = JSONLD_PAGE.split("<body>")
+    chunks = [head, "<body>", body, "<p>never read</p>"]
+    parser, html = parse_until_complete(iter(chunks), max_chars=10**6)
+    assert parser.complete
+    assert html == head
+
+
+def response(body: bytes, status=200, headers=None):
+    """A streamed requests.Response the way the HTTP adapter builds it."""
+    r = requests.Response()
+    r.status_code = status
+    r.headers = CaseInsensitiveDict(headers or {})
+    r.encoding = get_encoding_from_headers(r.headers)
+    r.raw = io.BytesIO(body)
+    r.url = "https://shop.test/p"
+    return r
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    monkeypatch.setattr(tools, "_page_cache", TTLCache(10, 600))
+    monkeypatch.setattr(tools, "PAGE_CACHE_FRESH_SEC", 0)
+    sent = []
+
+    def serve(*responses):
+        queue = list(responses)
+
+        def get(url, headers=None, **kwargs):
+            sent.append(dict(headers or {}))
+            return queue.pop(0)
+
+        monkeypatch.setattr(tools.requests, "get", get)
+        return sent
+
+    return serve
+
+
+def test_page_without_charset_is_decoded_as_utf8(pages):
+    pages(response(OG_PAGE.encode("utf-8"), headers={"Content-Type": "text/html"}))
+    assert tools.product_page_fetch("https://shop.test/p")["name"] == "ايفون 15 برو 128 جيجا"
+
+
+def test_declared_charset_is_respected(pages):
+    html = OG_PAGE.replace("ايفون 15 برو 128 جيجا", "iPhone 15 Pro – 128GB")
+    pages(response(html.encode("cp1252"), headers={"Content-Type": "text/html; charset=windows-1252"}))
+    assert tools.product_page_fetch("https://shop.test/p")["name"] == "iPhone 15 Pro – 128GB"
+
+
+def test_unchanged_page_is_revalidated_with_304(pages):
+    sent = pages(
+        response(JSONLD_PAGE.encode(), headers={"Content-Type": "text/html", "ETag": '"v1"',
+                                               "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}),
+        response(b"", status=304),
+    )
+    first = tools.product_page_fetch("https://shop.test/p")
+    second = tools.product_page_fetch("https://shop.test/p")
+    assert second == first and first["price"] == 5199.0
+    assert sent[0] == {}
+    assert sent[1] == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    assert tools._page_cache.get("https://shop.test/p")["etag"] == '"v1"'
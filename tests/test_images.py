@@ -0,0 +1,112 @@
+import io
+
+import pytest
+import requests
+from fastapi.testclient import TestClient
+from PIL import Image
+from requests.structures import CaseInsensitiveDict
+
+from Agent import images
+from main import app
+
+
+def test_signing_key_is_stable_without_explicit_key():
+    assert images.signing_key(None, "sk-abc") == images.signing_key(None, "sk-abc")
+    assert images.signing_key(None, "sk-abc") != images.signing_key(None, "sk-other")
+
+
+def test_explicit_signing_key_wins():
+    assert images.signing_key("configured", "sk-abc") == b"configured"
+
+
+def test_missing_secret_fails_fast():
+    with pytest.raises(RuntimeError):
+        images.signing_key(None, None)
+
+
+def test_image_id_round_trip():
+    url = "https://example.com/a.jpg"
+    image_id = images.image_id(url)
+    assert images.decode_image_id(image_id) == url
+    assert images.decode_image_id(image_id[:-2] + "xx") is None
+
+
+def png_bytes():
+    out = io.BytesIO()
+    Image.new("RGB", (40, 30), (200, 10, 10)).save(out, "PNG")
+    return out.getvalue()
+
+
+def response(status=200, body=b"", headers=None):
+    r = requests.Response()
+    r.status_code = status
+    r.headers = CaseInsensitiveDict(headers or {})
+    r.raw = io.BytesIO(body)
+    return r
+
+
+@pytest.fixture
+def web(monkeypatch):
+    """url -> response; records which urls were requested."""
+    pages, seen = {}, []
+
+    def get(url, allow_redirects=True, **kwargs):
+        assert allow_redirects is False
+        seen.append(url)
+        return pages[url]
+
+    monkeypatch.setattr(images.requests, "get", get)
+    return pages, seen
+
+
+def test_redirects_are_followed_to_public_hosts(web):
+    pages, seen = web
+    pages["https://cdn.test/a"] = response(301, headers={"Location": "/b"})
+    pages["https://cdn.test/b"] = response(200, png_bytes(), {"Content-Type": "image/png"})
+    assert images._fetch("https://cdn.test/a") == png_bytes()
+    assert seen == ["https://cdn.test/a", "https://cdn.test/b"]
+
+
+@pytest.mark.parametrize("target", [
+    "http://127.0.0.1/admin", "http://169.254.169.254/latest/meta-data", "http://10.0.0.5/x",
+    "http://localhost:8000/img", "http://[::1]/x", "file:///etc/passwd",
+])
+def test_redirects_to_internal_targets_are_refused(web, target):
+    pages, seen = web
+    pages["https://cdn.test/a"] = response(302, headers={"Location": target})
+    with pytest.raises(images.ImageFetchError):
+        images._fetch("https://cdn.test/a")
+    assert seen == ["https://cdn.test/a"]
+
+
+def test_redirect_loops_are_cut_off(web):
+    pages, _ = web
+    pages["https://cdn.test/a"] = response(302, headers={"Location": "https://cdn.test/a"})
+    with pytest.raises(images.ImageFetchError, match="too many redirects"):
+        images._fetch("https://cdn.test/a")
+
+
+class ReadOnlyCache:
+    def get(self, name):
+        return None
+
+    def set(self, name, data):
+        raise OSError(28, "No space left on device")
+
+
+def test_thumbnail_is_served_when_the_cache_cannot_be_written(web):
+    pages, _ = web
+    pages["https://cdn.test/a.png"] = response(200, png_bytes(), {"Content-Type": "image/png"})
+    data, _ = images.ThumbnailService(ReadOnlyCache()).get("https://cdn.test/a.png", 64)
+    assert Image.open(io.BytesIO(data)).format == "JPEG"
+
+
+def test_unusable_cache_directory_redirects_to_the_source(monkeypatch):
+    def broken(url, size):
+        raise PermissionError(13, "Permission denied")
+
+    monkeypatch.setattr(images.thumbnails, "get", broken)
+    url = "https://cdn.test/a.png"
+    r = TestClient(app).get(f"/img/{images.image_id(url)}", follow_redirects=False)
+    assert r.status_code == 302
+    assert r.headers["location"] == url and r.headers["cache-control"] == "no-store"
@@ -0,0 +1,94 @@
+import pytest
+
+import Agent.graph as graph
+from Agent.intent_rules import parse_budget, parse_intent_locally
+from Agent.normalizers import normalize_condition, price_normalizer, spec_normalizer
+from Agent.ranking import local_rank_offers
+from Agent.watch import matches
+from Core.config import INTENT_FASTPATH_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("query", ["iphone 15 pro max cover 256gb", "macbook air 13 cover 2024"])
+def test_keyword_inside_word_is_not_a_budget(query):
+    intent, confidence = parse_intent_locally(query)
+    assert intent["budget_min"] is None and intent["budget_max"] is None
+    assert intent["search_query"] == query
+    # Accessory queries go to the LLM
+    assert confidence < INTENT_FASTPATH_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("text", ["iphone 15 over 256gb", "شاشة تحت 27 انش", "monitor above 144hz"])
+def test_number_with_unit_is_not_a_budget(text):
+    assert parse_budget(text)[:2] == (None, None)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("iphone 15 over 4000", (4000.0, None)),
+    ("iphone 14 <3000", (None, 3000.0)),
+    ("ايفون 15 بين 3000 و4000", (3000.0, 4000.0)),
+    ("شاشة 27 انش تحت 1000 ريال", (None, 1000.0)),
+    ("galaxy s24 under 2k", (None, 2000.0)),
+])
+def test_budgets_still_parse(text, expected):
+    assert parse_budget(text)[:2] == expected
+
+
+@pytest.mark.parametrize("query, condition", [
+    ("ايفون 13 مستعمل", "used"),
+    ("iphone 13 used", "used"),
+    ("iphone 15 refurbished", "refurbished"),
+])
+def test_condition_is_carried_into_intent(query, condition):
+    intent, _ = parse_intent_locally(query)
+    assert intent["condition"] == condition
+
+
+def test_no_condition_by_default():
+    intent, confidence = parse_intent_locally("iPhone 15 Pro Max 256GB")
+    assert "condition" not in intent
+    assert confidence >= INTENT_FASTPATH_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("ايفون 15 اقل من ٤٬٠٠٠", 4000.0),
+    ("ايفون 15 تحت ٤،٥٠٠ ريال", 4500.0),
+    ("iphone 15 under 4,500", 4500.0),
+    ("iphone 15 under 12,500.50 sar", 12500.5),
+])
+def test_thousands_separators(query, expected):
+    intent, _ = parse_intent_locally(query)
+    assert intent["budget_max"] == expected
+    assert intent["search_query"] in ("ايفون 15", "iphone 15")
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("مستعمل", "Used"), ("مستعملة - بحالة ممتازة", "Used"), ("مستخدم", "Used"), ("Used - Like New", "Used"),
+    ("Pre-owned", "Used"), ("جديد", "New"), ("مجددة", "Refurbished"), ("Open box", "Open box"), ("", "Unknown"),
+])
+def test_condition_labels_are_normalized(raw, expected):
+    assert normalize_condition(raw) == expected
+
+
+USED_OFFERS = [
+    {"name": "Apple iPhone 13 128GB", "price": 1900, "retailer": "Jarir", "link": "https://shop.test/used", "condition": "مستعملة"},
+    {"name": "Apple iPhone 13 128GB", "price": 2100, "retailer": "Jarir", "link": "https://shop.test/used-en", "condition": "Used - good"},
+    {"name": "Apple iPhone 13 128GB", "price": 2500, "retailer": "Jarir", "link": "https://shop.test/new", "condition": "جديد"},
+]
+
+
+@pytest.mark.parametrize("wanted", ["used", "مستعمل", "Used"])
+def test_used_condition_filters_end_to_end(wanted):
+    offers = []
+    for o in USED_OFFERS:
+        o = dict(o)
+        o.update(spec_normalizer(o["name"], o["retailer"], o["condition"]))
+        o.update(price_normalizer(o["price"], None))
+        offers.append(o)
+    intent, _ = parse_intent_locally("ايفون 13 مستعمل")
+    intent["condition"] = wanted
+    state = {"query": "ايفون 13 مستعمل", "offers": offers, "intent": intent, "trusted_only": True}
+    final = graph.finish_with(state, local_rank_offers, enrich=False)
+    assert sorted(it["link"] for it in final["result"]["items"]) == ["https://shop.test/used", "https://shop.test/used-en"]
+
+    w = {"trusted_only": True, "condition": wanted, "must_have": []}
+    assert [o["link"] for o in offers if matches(w, o)] == ["https://shop.test/used", "https://shop.test/used-en"]
@@ -0,0 +1,89 @@
+import sqlite3
+import time
+
+import pytest
+
+import Agent.jobs as jobs
+from Agent.jobs import DONE, FAILED, QUEUED, RUNNING, JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"), max_attempts=2)
+
+
+def age_running(queue, job_id, seconds):
+    with sqlite3.connect(queue.path) as conn:
+        conn.execute("UPDATE jobs SET started_at = ? WHERE id = ?", (time.time() - seconds, job_id))
+
+
+def test_claim_takes_oldest_queued_job_once(queue):
+    first = queue.enqueue({"query": "a"})
+    queue.enqueue({"query": "b"})
+    job = queue.claim()
+    assert job == {"id": first, "payload": {"query": "a"}}
+    assert queue.get(first)["status"] == RUNNING
+    assert queue.claim()["payload"] == {"query": "b"}
+    assert queue.claim() is None
+
+
+def test_stale_running_job_is_requeued(queue):
+    job_id = queue.enqueue({"query": "a"})
+    queue.claim()
+    age_running(queue, job_id, jobs.STALE_AFTER_SEC + 1)
+    assert queue.claim()["id"] == job_id
+    assert queue.get(job_id)["attempts"] == 2
+
+
+def test_job_that_keeps_killing_workers_fails(queue):
+    job_id = queue.enqueue({"query": "a"})
+    for _ in range(2):
+        assert queue.claim()["id"] == job_id
+        age_running(queue, job_id, jobs.STALE_AFTER_SEC + 1)
+    assert queue.claim() is None
+    job = queue.get(job_id)
+    assert job["status"] == FAILED and "2 times" in job["error"]
+
+
+def test_sweep_deletes_old_finished_jobs_only(queue):
+    old, recent, waiting = (queue.enqueue({"query": q}) for q in "abc")
+    queue.complete(old, {})
+    queue.fail(recent, "boom")
+    with sqlite3.connect(queue.path) as conn:
+        conn.execute("UPDATE jobs SET finished_at = ? WHERE id = ?", (time.time() - 7200, old))
+    assert queue.sweep(retention=3600) == 1
+    assert queue.get(old) is None
+    assert queue.get(recent)["status"] == FAILED
+    assert queue.get(waiting)["status"] == QUEUED
+
+
+def test_old_database_gets_attempts_column(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT NOT NULL, "
+                     "result TEXT, error TEXT, created_at REAL NOT NULL, started_at REAL, finished_at REAL)")
+    queue = JobQueue(path)
+    queue.enqueue({"query": "a"})
+    assert queue.claim() is not None
+
+
+def test_worker_failure_is_recorded(queue, monkeypatch):
+    def crash(app, query, trusted_only):
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(jobs, "run_agent", crash)
+    job_id = queue.enqueue({"query": "a"})
+    jobs.run_job(queue, app=None, job=queue.claim())
+    job = queue.get(job_id)
+    assert job["status"] == FAILED and job["error"] == "upstream down"
+
+
+def test_done_job_result_has_pool_id(queue, monkeypatch):
+    final = {"query": "a", "steps": 3, "errors": [], "offers": [{"link": "https://x/1", "price": 1.0}],
+             "result": {"items": [], "notes": None}, "intent": {}}
+    monkeypatch.setattr(jobs, "run_agent", lambda app, query, trusted_only: final)
+    job_id = queue.enqueue({"query": "a"})
+    jobs.run_job(queue, app=None, job=queue.claim())
+    job = queue.get(job_id)
+    assert job["status"] == DONE
+    assert job["result"]["pool_id"]
@@ -0,0 +1,98 @@
+import gzip
+
+import brotli
+import msgpack
+import pytest
+from starlette.requests import Request
+
+from API import negotiation
+from API.negotiation import choose_encoding, negotiated, qvalues, wants_msgpack
+from API.schemas import RankResponse, RankResult, OfferItem
+
+
+def make_request(**headers):
+    raw = [(k.replace("_", "-").lower().encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "headers": raw})
+
+
+def make_response(items=8):
+    offers = [
+        OfferItem(name=f"iPhone 15 Pro Max 256GB #{i}", price=4599.0 + i, currency="SAR", retailer="Jarir",
+                  link=f"https://example.com/p/{i}", reason="متجر موثوق وأقل سعر")
+        for i in range(items)
+    ]
+    return RankResponse(query="iphone 15", steps=3, errors=[], result=RankResult(items=offers, notes=None))
+
+
+def test_qvalues():
+    assert qvalues("gzip;q=0.5, br, *;q=0") == {"gzip": 0.5, "br": 1.0, "*": 0.0}
+    assert qvalues("") == {}
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("br;q=0.1, gzip;q=1", "gzip"),
+    ("gzip, br", "br"),  # tie: server preference
+    ("gzip;q=0.8, br;q=0.9", "br"),
+    ("gzip", "gzip"),
+    ("*", "br"),
+    ("*;q=0.5, gzip;q=0.7", "gzip"),
+    ("br;q=0, gzip;q=0", None),
+    ("identity", None),
+    ("gzip;q=0.5, identity", None),  # identity preferred
+    ("deflate", None),
+    ("", None),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header) == expected
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("application/msgpack", True),
+    ("application/x-msgpack, application/json;q=0.5", True),
+    ("application/json, application/msgpack;q=0.5", False),
+    ("*/*", False),
+    ("", False),
+])
+def test_wants_msgpack(accept, expected):
+    assert wants_msgpack(accept) is expected
+
+
+def test_compressed_body_round_trips():
+    model = make_response()
+    r = negotiated(make_request(accept_encoding="gzip;q=1, br;q=0.2"), model)
+    assert r.headers["content-encoding"] == "gzip"
+    assert RankResponse.model_validate_json(gzip.decompress(r.body)) == model
+
+    r = negotiated(make_request(accept="application/msgpack", accept_encoding="br"), model)
+    assert r.headers["content-encoding"] == "br"
+    assert r.media_type == "application/msgpack"
+    assert RankResponse.model_validate(msgpack.unpackb(brotli.decompress(r.body))) == model
+
+
+def test_small_bodies_are_not_compressed():
+    r = negotiated(make_request(accept_encoding="br"), make_response(items=0))
+    assert "content-encoding" not in r.headers
+    assert r.headers["vary"] == "Accept, Accept-Encoding"
+
+
+def test_matching_etag_is_answered_before_encoding(monkeypatch):
+    model = make_response()
+    first = negotiated(make_request(accept_encoding="br"), model, etag="abc")
+    assert first.headers["etag"] == '"abc-json+br"'
+
+    def fail(*args, **kwargs):
+        raise AssertionError("encoded a 304")
+
+    monkeypatch.setattr(negotiation, "encode_json", fail)
+    monkeypatch.setattr(negotiation.brotli, "compress", fail)
+    r = negotiated(make_request(accept_encoding="br", if_none_match='"abc-json+br"'), model, etag="abc")
+    assert r.status_code == 304 and r.headers["etag"] == '"abc-json+br"'
+
+
+def test_etag_names_the_negotiated_coding_for_small_bodies():
+    small = make_response(items=0)
+    r = negotiated(make_request(accept_encoding="gzip"), small, etag="abc")
+    assert "content-encoding" not in r.headers
+    assert r.headers["etag"] == '"abc-json+gzip"'
+    # Another coding is another representation
+    assert negotiated(make_request(), small, etag="abc").headers["etag"] == '"abc-json"'
@@ -0,0 +1,87 @@
+import pytest
+
+import Agent.intent as intent
+import Agent.prewarm as prewarm
+from Agent import tools
+from Core.cache import TTLCache
+from Core.heavy_hitters import SpaceSaving
+
+QUERY = "iPhone 15 Pro Max 256GB"
+
+
+@pytest.fixture(autouse=True)
+def empty_search_cache(monkeypatch):
+    monkeypatch.setattr(tools, "_search_cache", TTLCache(10, 1800))
+
+
+def make_prewarmer(monkeypatch, runs):
+    monkeypatch.setattr(prewarm, "stream_final", lambda app, query, trusted_only: runs.append(query))
+    tracker = SpaceSaving(10)
+    tracker.offer(prewarm.query_key(QUERY, True), {"query": QUERY, "trusted_only": True})
+    return prewarm.Prewarmer(app=None, tracker=tracker, interval=60, credits_per_hour=10, lead=120)
+
+
+def cache_search_result(ttl):
+    params = {"engine": "google_shopping", "q": QUERY, "gl": "sa", "hl": "ar",
+              "google_domain": "google.com.sa", "location": "Riyadh, Saudi Arabia"}
+    tools._search_cache.set(tools._search_cache_key(params, 40), [], ttl=ttl)
+
+
+def test_fresh_entry_is_not_refreshed(monkeypatch):
+    runs = []
+    warmer = make_prewarmer(monkeypatch, runs)
+    cache_search_result(ttl=1800)
+    assert warmer.run_once() == 0
+    assert runs == []
+
+
+def test_entry_close_to_expiry_is_refreshed(monkeypatch):
+    runs = []
+    warmer = make_prewarmer(monkeypatch, runs)
+    cache_search_result(ttl=30)
+    assert warmer.run_once() == 1
+    assert runs == [QUERY]
+
+
+def test_missing_entry_is_warmed(monkeypatch):
+    runs = []
+    warmer = make_prewarmer(monkeypatch, runs)
+    assert warmer.run_once() == 1
+
+
+def test_due_check_never_calls_the_llm(monkeypatch, upstream):
+    query = "افضل جوال للتصوير"  # too vague for the local parser
+    monkeypatch.setattr(prewarm, "stream_final", lambda app, q, trusted_only: None)
+    tracker = SpaceSaving(10)
+    tracker.offer(prewarm.query_key(query, True), {"query": query, "trusted_only": True})
+    warmer = prewarm.Prewarmer(app=None, tracker=tracker, interval=60, credits_per_hour=10, lead=120)
+
+    # No cached intent: due, without asking the LLM
+    assert warmer.is_due({"query": query, "trusted_only": True}) is True
+    assert upstream.calls["llm"] == 0
+    # A cached follow-up-question intent is used as-is
+    monkeypatch.setattr(intent, "_analyze_with_llm", lambda q: {"ready": False, "search_query": q})
+    intent.analyze_intent(query)
+    assert warmer.is_due({"query": query, "trusted_only": True}) is False
+
+
+class Log:
+    def __init__(self):
+        self.events = []
+
+    def info(self, record):
+        self.events.append(record["event"])
+
+    warning = info
+
+
+def test_failed_run_is_not_reported_as_prewarmed(monkeypatch):
+    def fail(app, query, trusted_only):
+        raise RuntimeError("upstream down")
+
+    warmer = make_prewarmer(monkeypatch, [])
+    monkeypatch.setattr(prewarm, "stream_final", fail)
+    log = Log()
+    monkeypatch.setattr(prewarm, "logger", log)
+    assert warmer.run_once() == 0
+    assert log.events == ["prewarm_failed"]
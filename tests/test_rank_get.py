@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import API.routes_rank as routes_rank
+from API.schemas import OfferItem, RankResponse, RankResult
+from Core.cache import TTLCache
+from main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def agent_runs(monkeypatch):
+    """Replace the agent with a slow fake; returns the list of queries it ran."""
+    runs = []
+    lock = threading.Lock()
+
+    def fake_run(query, trusted_only):
+        with lock:
+            runs.append(query)
+        time.sleep(0.2)
+        item = OfferItem(name="iPhone 15", price=3999.0, currency="SAR", retailer="Jarir", link="https://x/1")
+        response = RankResponse(query=query, steps=3, errors=[], result=RankResult(items=[item]), pool_id="p1")
+        return {"query": query}, response
+
+    monkeypatch.setattr(routes_rank, "run_and_respond", fake_run)
+    monkeypatch.setattr(routes_rank, "_responses", TTLCache(10, 300))
+    return runs
+
+
+def test_etag_and_304(agent_runs):
+    r = client.get("/rank", params={"q": "iphone 15"})
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+    assert r.headers["cache-control"].startswith("public, max-age=")
+    assert "Accept-Encoding" in r.headers["vary"]
+
+    again = client.get("/rank", params={"q": "iphone 15"}, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+    # Weak comparison, lists, other representations
+    assert client.get("/rank", params={"q": "iphone 15"},
+                      headers={"If-None-Match": f'"nope", W/{etag}'}).status_code == 304
+    msgpack = client.get("/rank", params={"q": "iphone 15"},
+                         headers={"If-None-Match": etag, "Accept": "application/msgpack"})
+    assert msgpack.status_code == 200 and msgpack.headers["etag"] != etag
+    assert agent_runs == ["iphone 15"]
+
+
+def test_spelling_variants_share_the_cached_run(agent_runs):
+    client.get("/rank", params={"q": "iPhone15 ProMax 256 gb"})
+    r = client.get("/rank", params={"q": "ايفون ١٥ برو ماكس ٢٥٦"})
+    assert r.json()["query"] == "ايفون ١٥ برو ماكس ٢٥٦"
+    assert len(agent_runs) == 1
+
+
+def test_concurrent_misses_share_one_run(agent_runs):
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            return await asyncio.gather(*[ac.get("/rank", params={"q": "galaxy s24"}) for _ in range(5)])
+
+    responses = asyncio.run(burst())
+    assert [r.status_code for r in responses] == [200] * 5
+    assert len({r.headers["etag"] for r in responses}) == 1
+    assert agent_runs == ["galaxy s24"]
+
+
+def test_cache_hits_and_304s_skip_admission(agent_runs, monkeypatch):
+    r = client.get("/rank", params={"q": "iphone 15"})
+    etag = r.headers["etag"]
+
+    async def reject(request):
+        raise AssertionError("rate-limited a cache hit")
+
+    async def no_slot():
+        raise AssertionError("took a slot for a cache hit")
+
+    monkeypatch.setattr(routes_rank, "rate_limit", reject)
+    monkeypatch.setattr(routes_rank.admission, "acquire", no_slot)
+    assert client.get("/rank", params={"q": "iphone 15"}).status_code == 200
+    assert client.get("/rank", params={"q": "iphone 15"}, headers={"If-None-Match": etag}).status_code == 304
+    assert agent_runs == ["iphone 15"]
+
+
+def test_misses_are_rate_limited(agent_runs, monkeypatch):
+    async def reject(request):
+        raise HTTPException(status_code=429, detail="Rate limit exceeded.", headers={"Retry-After": "3"})
+
+    monkeypatch.setattr(routes_rank, "rate_limit", reject)
+    r = client.get("/rank", params={"q": "pixel 8"})
+    assert r.status_code == 429 and r.headers["retry-after"] == "3"
+    assert agent_runs == []
+
+
+def test_run_releases_its_slot(agent_runs):
+    running = routes_rank.admission.running
+    client.get("/rank", params={"q": "pixel 8"})
+    assert routes_rank.admission.running == running
+
+
+def test_follow_up_questions_are_not_cached(monkeypatch):
+    runs = []
+
+    def ask(query, trusted_only):
+        runs.append(query)
+        question = "كم ميزانيتك؟" if any("؀" <= ch <= "ۿ" for ch in query) else "What is your budget?"
+        return {"query": query}, RankResponse(query=query, steps=1, errors=[], result=RankResult(items=[]),
+                                               needs_more_info=True, follow_up_question=question)
+
+    monkeypatch.setattr(routes_rank, "run_and_respond", ask)
+    monkeypatch.setattr(routes_rank, "_responses", TTLCache(10, 300))
+    english = client.get("/rank", params={"q": "iphone"})
+    arabic = client.get("/rank", params={"q": "ايفون"})
+    assert english.json()["follow_up_question"] == "What is your budget?"
+    assert arabic.json()["follow_up_question"] == "كم ميزانيتك؟"
+    assert arabic.headers["cache-control"] == "no-store"
+    assert runs == ["iphone", "ايفون"]
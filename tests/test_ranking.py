@@ -0,0 +1,54 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import Agent.graph as graph
+import Agent.ranking as ranking
+from Agent import shadow
+from Core.cache import TTLCache
+
+OFFERS = [
+    {"name": f"iPhone 15 {i}", "price": 4000 + i, "retailer": "Jarir", "link": f"https://x/{i}", "condition": "New"}
+    for i in range(3)
+]
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        content = json.dumps({"items": [dict(o, reason="ok") for o in OFFERS]})
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=100, completion_tokens=50),
+        )
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    completions = FakeCompletions()
+    monkeypatch.setattr(ranking, "client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    monkeypatch.setattr(ranking, "_rank_cache", TTLCache(10, 60))
+    return completions
+
+
+def test_cache_hit_reports_no_usage(llm):
+    first = ranking.llm_rank_offers(OFFERS, "iphone 15", intent={})
+    second = ranking.llm_rank_offers(OFFERS, "iphone 15", intent={})
+    assert llm.calls == 1
+    assert first["usage"]["prompt_tokens"] == 100 and first["usage"]["cached"] is False
+    assert second["usage"] == {"prompt_tokens": 0, "completion_tokens": 0, "latency_ms": 0.0, "cached": True}
+    assert [it["link"] for it in second["items"]] == [it["link"] for it in first["items"]]
+
+
+def test_cache_hits_are_left_out_of_shadow_metrics(llm, monkeypatch):
+    monkeypatch.setattr(graph, "enrich_finalists", lambda base, *args, **kwargs: (base, 0))
+    state = {"query": "iphone 15", "offers": [dict(o) for o in OFFERS], "intent": {}, "trusted_only": False}
+    with shadow.forced():
+        first = graph.finisher(json.loads(json.dumps(state)))
+        second = graph.finisher(json.loads(json.dumps(state)))
+    assert first["shadow"]["prompt_tokens"] == 100
+    assert "shadow" not in second
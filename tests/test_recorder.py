@@ -0,0 +1,64 @@
+import pytest
+
+from Agent import recorder
+from Agent.graph import build_app
+from Agent.replay import replay_node, replay_run
+from Agent.runner import stream_final
+
+
+def test_save_load_round_trip(tmp_path):
+    rec = recorder.Recording("iphone 15", trusted_only=False)
+    rec.upstream.append({"kind": "searchapi", "key": "k", "response": {"shopping_results": []}})
+    rec.nodes.append({"node": "plan", "input": {"query": "iphone 15"}, "output": {"steps": 1}, "duration_ms": 1.0})
+    rec.final = {"result": {"items": [{"link": "https://x/1"}]}}
+
+    loaded = recorder.load(str(recorder.save(rec, str(tmp_path))))
+    assert loaded.to_dict() == rec.to_dict()
+    assert loaded.replaying is True
+
+
+def test_save_keeps_only_the_newest_runs(tmp_path):
+    recs = [recorder.Recording(f"q{i}", True) for i in range(4)]
+    for i, rec in enumerate(recs):
+        rec.created_at = 1000 + i
+        recorder.save(rec, str(tmp_path), max_runs=2)
+    kept = sorted(p.name for p in tmp_path.glob("*.json.gz"))
+    assert kept == sorted(f"{1000 + i}000-{recs[i].id}.json.gz" for i in (2, 3))
+
+
+def test_upstream_records_then_replays_in_call_order():
+    rec = recorder.Recording("q", True)
+    answers = iter(["first", "second"])
+    with recorder.session(rec):
+        assert recorder.upstream("page", "u", lambda: next(answers)) == "first"
+        assert recorder.upstream("page", "u", lambda: next(answers)) == "second"
+
+    replay = recorder.Recording.from_dict(rec.to_dict())
+
+    def offline():
+        raise AssertionError("fetch must not run during replay")
+
+    with recorder.session(replay):
+        got = [recorder.upstream("page", "u", offline) for _ in range(3)]
+        with pytest.raises(recorder.ReplayMiss):
+            recorder.upstream("page", "other", offline)
+    # The last response is reused once the recorded ones run out
+    assert got == ["first", "second", "second"]
+
+
+def test_recorded_agent_run_replays_offline(upstream):
+    rec = recorder.Recording("iPhone 15 Pro Max 256GB", trusted_only=True)
+    with recorder.session(rec):
+        rec.final = stream_final(build_app(), rec.query, rec.trusted_only)
+    assert rec.final["result"]["items"]
+    assert {c["kind"] for c in rec.upstream} >= {"searchapi", "openai"}
+    assert [n["node"] for n in rec.nodes][0] == "plan"
+
+    calls = dict(upstream.calls)
+    replay = recorder.Recording.from_dict(rec.to_dict())
+    report = replay_run(replay)
+    assert report["same_items"] is True
+    assert report["replayed_items"] == report["recorded_items"]
+    assert upstream.calls == calls  # nothing went to the network
+
+    assert all(r["same_output"] for r in replay_node(recorder.Recording.from_dict(rec.to_dict()), "finish"))
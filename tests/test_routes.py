@@ -0,0 +1,22 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from API import admission
+from main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def no_free_slots(monkeypatch):
+    monkeypatch.setattr(admission, "admission", admission.AdmissionController(0, 0, 0.01))
+
+
+def test_refine_is_subject_to_admission(no_free_slots):
+    r = client.post("/rank/refine", json={"pool_id": "missing", "use_llm": True})
+    assert r.status_code == 503
+    assert "Retry-After" in r.headers
+
+
+def test_refine_unknown_pool_is_404():
+    assert client.post("/rank/refine", json={"pool_id": "missing"}).status_code == 404
@@ -0,0 +1,150 @@
+import json
+import sqlite3
+import time
+
+from Agent.watch import (
+    NEW_OFFER,
+    PRICE_DROP,
+    PRICE_INCREASE,
+    REMOVED,
+    TARGET_REACHED,
+    WatchStore,
+    diff_snapshots,
+    events_for_watch,
+    refresh_due,
+    watch_key,
+)
+
+
+def old_key(query):
+    return " ".join(query.lower().split())
+
+
+def legacy_store(path):
+    """A database written before watch keys were canonical."""
+    WatchStore(path)
+    with sqlite3.connect(path) as conn:
+        conn.execute("PRAGMA user_version = 0")
+        for watch_id, query in (("w1", "ايفون ١٥ برو ماكس"), ("w2", "iPhone15 ProMax")):
+            conn.execute("INSERT INTO watches VALUES (?, ?, ?, 1, 4000, '[]', NULL, ?)",
+                         (watch_id, query, old_key(query), time.time()))
+        conn.execute("INSERT INTO snapshots VALUES (?, ?, ?, ?)",
+                     (old_key("ايفون ١٥ برو ماكس"), json.dumps({"a": {"price_sar": 1}}), 100.0, 500.0))
+        conn.execute("INSERT INTO snapshots VALUES (?, ?, ?, ?)",
+                     (old_key("iPhone15 ProMax"), json.dumps({"b": {"price_sar": 2}}), 200.0, 900.0))
+
+
+def test_legacy_keys_are_migrated(tmp_path):
+    path = str(tmp_path / "watches.sqlite3")
+    legacy_store(path)
+    store = WatchStore(path)
+
+    key = watch_key("iPhone 15 Pro Max")
+    assert store.get("w1")["query_key"] == key
+    assert store.get("w2")["query_key"] == key
+    with sqlite3.connect(path) as conn:
+        snapshots = conn.execute("SELECT query_key, offers, refreshed_at, next_refresh_at FROM snapshots").fetchall()
+    # Merged into one snapshot: the most recently refreshed offers, the earliest refresh time
+    assert snapshots == [(key, json.dumps({"b": {"price_sar": 2}}), 200.0, 500.0)]
+
+
+def test_new_watch_shares_migrated_key(tmp_path):
+    path = str(tmp_path / "watches.sqlite3")
+    legacy_store(path)
+    store = WatchStore(path)
+    store.add("آيفون 15 pro max", target_price=3500)
+    due = store.claim_due(interval=60)
+    assert len(due) == 1 and due[0]["query_key"] == watch_key("iPhone 15 Pro Max")
+
+
+def test_migration_runs_once(tmp_path):
+    path = str(tmp_path / "watches.sqlite3")
+    WatchStore(path)
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == 1
+
+
+def offer(link, price, retailer="Jarir", name="Apple iPhone 15 Pro Max 256GB", condition="New"):
+    return {"name": name, "price_sar": price, "retailer": retailer, "condition": condition, "link": link}
+
+
+def watch(**overrides):
+    return {"id": "w", "trusted_only": True, "target_price": 4500.0, "must_have": [], "condition": None, **overrides}
+
+
+def test_diff_snapshots():
+    old = {"a": offer("a", 5000), "b": offer("b", 4000), "c": offer("c", 3000), "d": offer("d", 2000)}
+    new = {"a": offer("a", 4800), "b": offer("b", 4100), "c": offer("c", 3000), "e": offer("e", 1000)}
+    changes = {(ch["type"], ch["offer"]["link"], ch["old_price"]) for ch in diff_snapshots(old, new)}
+    assert changes == {
+        (PRICE_DROP, "a", 5000), (PRICE_INCREASE, "b", 4000), (REMOVED, "d", 2000), (NEW_OFFER, "e", None),
+    }
+
+
+def test_events_for_watch_filters_and_reports_target_crossings():
+    changes = diff_snapshots(
+        {"a": offer("a", 5000), "b": offer("b", 4400), "x": offer("x", 5000, retailer="eBay")},
+        {"a": offer("a", 4400), "b": offer("b", 4300), "x": offer("x", 4000, retailer="eBay")},
+    )
+    events = [(ev["type"], ev["offer"]["link"]) for ev in events_for_watch(watch(), changes)]
+    # "a" crossed the target; "b" was already below it; "x" is not a trusted retailer
+    assert events == [(PRICE_DROP, "a"), (TARGET_REACHED, "a"), (PRICE_DROP, "b")]
+
+    assert events_for_watch(watch(must_have=["512GB"]), changes) == []
+    assert events_for_watch(watch(condition="used"), changes) == []
+    assert len(events_for_watch(watch(trusted_only=False), changes)) == 5
+
+
+def test_claim_due_groups_watches_and_reschedules(tmp_path):
+    store = WatchStore(str(tmp_path / "watches.sqlite3"))
+    store.add("iPhone 15 Pro Max", target_price=4000)
+    store.add("ايفون ١٥ برو ماكس", target_price=3500)
+    store.add("Galaxy S24", target_price=3000)
+
+    due = store.claim_due(interval=60)
+    assert sorted(d["query_key"] for d in due) == sorted([watch_key("iPhone 15 Pro Max"), watch_key("Galaxy S24")])
+    assert all(d["offers"] is None for d in due)
+    assert store.claim_due(interval=60) == []
+    # A newly watched spelling variant keeps the existing schedule
+    store.add("iphone15 promax", target_price=3000)
+    assert store.claim_due(interval=60) == []
+
+
+def test_first_snapshot_only_reports_met_targets(tmp_path):
+    store = WatchStore(str(tmp_path / "watches.sqlite3"))
+    w = store.add("iPhone 15 Pro Max", target_price=4500)
+    key = w["query_key"]
+
+    assert store.apply_snapshot(key, None, {"a": offer("a", 5000), "b": offer("b", 4400)}) == 1
+    assert [(e["type"], e["offer"]["link"]) for e in store.events(w["id"])] == [(TARGET_REACHED, "b")]
+
+    previous = {"a": offer("a", 5000), "b": offer("b", 4400)}
+    store.apply_snapshot(key, previous, {"a": offer("a", 4450)})
+    assert [(e["type"], e["offer"]["link"]) for e in store.events(w["id"], since_id=1)] == [
+        (PRICE_DROP, "a"), (TARGET_REACHED, "a"), (REMOVED, "b"),
+    ]
+
+
+def test_refresh_due_searches_each_query_once(tmp_path, upstream):
+    store = WatchStore(str(tmp_path / "watches.sqlite3"))
+    for query in ("iPhone 15 Pro Max", "ايفون ١٥ برو ماكس", "iphone 15 pro max"):
+        store.add(query, target_price=1)
+    assert refresh_due(store, interval=60) == 1
+    assert upstream.calls["search"] == 1
+    assert refresh_due(store, interval=60) == 0
+
+
+def test_refresh_ignores_cached_search_results(tmp_path, upstream):
+    from Agent import tools
+
+    store = WatchStore(str(tmp_path / "watches.sqlite3"))
+    store.add("iPhone 15 Pro Max", target_price=1)
+    stale = [{"name": "old", "price": 1.0, "currency": "SAR", "retailer": "Jarir", "link": "https://old", "condition": ""}]
+    tools._search_cache.set(tools._search_cache_key({
+        "engine": "google_shopping", "q": "iPhone 15 Pro Max", "gl": "sa", "hl": "ar",
+        "google_domain": "google.com.sa", "location": "Riyadh, Saudi Arabia"}, 40), stale)
+
+    refresh_due(store, interval=60)
+    assert upstream.calls["search"] == 1
+    # The fresh result replaced the stale one for regular searches too
+    assert "https://old" not in {o["link"] for o in tools.shopping_search("iPhone 15 Pro Max")}